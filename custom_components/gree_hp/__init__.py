@@ -1,18 +1,154 @@
 """The Gree Heat Pump integration."""
-import logging
 from datetime import timedelta
+import logging
+import os
+from typing import Any, Dict
 
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_HOST, Platform
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.config_entries import ConfigEntry, SOURCE_INTEGRATION_DISCOVERY
+from homeassistant.const import CONF_HOST, EVENT_HOMEASSISTANT_STOP, Platform
+from homeassistant.core import HomeAssistant, callback
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+from homeassistant.helpers import discovery_flow
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.start import async_at_started
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN, CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL
+from .const import (
+    DOMAIN,
+    CONF_POLLING_INTERVAL,
+    DEFAULT_POLLING_INTERVAL,
+    CONF_KEEPALIVE_INTERVAL,
+    DEFAULT_KEEPALIVE_INTERVAL,
+    CONF_QUEUE_COMMANDS,
+    DEFAULT_QUEUE_COMMANDS,
+    HEATER_POWER_OPTIONS,
+    DEFAULT_HEATER_POWER,
+    CONF_HISTORY,
+    DEFAULT_HISTORY,
+    CONF_HISTORY_RAW_RETENTION,
+    DEFAULT_HISTORY_RAW_RETENTION,
+    CONF_HISTORY_MINUTE_RETENTION,
+    DEFAULT_HISTORY_MINUTE_RETENTION,
+    CONF_HISTORY_HOUR_RETENTION,
+    DEFAULT_HISTORY_HOUR_RETENTION,
+    DATA_HISTORY,
+    HISTORY_DATABASE,
+    DATA_SCHEDULER,
+    DATA_LISTENER,
+    DATA_CAPABILITIES,
+    CONF_LOCAL_API,
+    DATA_LOCAL_API,
+    LOCAL_API_SOCKET,
+    CONF_MAC,
+    MAX_POLLS_IN_FLIGHT,
+    STORAGE_VERSION,
+    SCAN_TIMEOUT,
+    DISCOVERY_INTERVAL,
+)
+from .coordinator import GreeHeatPumpCoordinator
+from .discovery import async_discover
 from .gree_hp import GreeHeatPump
+from .history import GreeHistory
+from .listener import GreeListener
+from .local_api import GreeLocalApi
+from .scheduler import GreePollScheduler
+from .services import WRITABLE_VALUES_SCHEMA, async_setup_services
+from .websocket import async_setup_websocket
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = [Platform.SWITCH, Platform.NUMBER, Platform.SELECT, Platform.SENSOR]
+PLATFORMS = [
+    Platform.SWITCH,
+    Platform.NUMBER,
+    Platform.SELECT,
+    Platform.SENSOR,
+    Platform.BINARY_SENSOR,
+]
+
+# Heat pumps are set up from config entries, configuration.yaml only enables the local API
+CONFIG_SCHEMA = vol.Schema(
+    {DOMAIN: vol.Schema({vol.Optional(CONF_LOCAL_API, default=False): cv.boolean})},
+    extra=vol.ALLOW_EXTRA,
+)
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Gree Heat Pump services and background discovery."""
+    async_setup_services(hass)
+    async_setup_websocket(hass)
+    if config.get(DOMAIN, {}).get(CONF_LOCAL_API):
+        await _async_start_local_api(hass)
+
+    async def _async_discover(_now=None) -> None:
+        """Offer every device answering a broadcast scan as a discovered flow."""
+        devices = await async_discover(async_get_listener(hass), [], SCAN_TIMEOUT)
+        for device in devices.values():
+            discovery_flow.async_create_flow(
+                hass,
+                DOMAIN,
+                context={"source": SOURCE_INTEGRATION_DISCOVERY},
+                data=device,
+            )
+
+    async_at_started(hass, _async_discover)
+    async_track_time_interval(
+        hass, _async_discover, timedelta(seconds=DISCOVERY_INTERVAL), cancel_on_shutdown=True
+    )
+    return True
+
+
+@callback
+def async_get_listener(hass: HomeAssistant) -> GreeListener:
+    """Return the shared listener, creating it on first use."""
+    hass.data.setdefault(DOMAIN, {})
+    if DATA_LISTENER not in hass.data[DOMAIN]:
+        listener = hass.data[DOMAIN][DATA_LISTENER] = GreeListener()
+
+        @callback
+        def _close_listener(_event) -> None:
+            listener.close()
+
+        # Discovery keeps using the port between entries, release it on shutdown only
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _close_listener)
+    return hass.data[DOMAIN][DATA_LISTENER]
+
+
+async def _async_start_local_api(hass: HomeAssistant) -> None:
+    """Serve the sessions to local tools, so they need not bind the UDP port themselves."""
+
+    def _served() -> Dict[str, Dict[str, Any]]:
+        # Entry data by device address, skipping the shared objects stored alongside
+        return {
+            entry_data["heat_pump"].host: entry_data
+            for entry_data in hass.data[DOMAIN].values()
+            if isinstance(entry_data, dict) and "heat_pump" in entry_data
+        }
+
+    @callback
+    def _publish(host: str) -> None:
+        if entry_data := _served().get(host):
+            entry_data["coordinator"].async_publish_confirmed()
+
+    api = GreeLocalApi(
+        lambda: {host: entry_data["heat_pump"] for host, entry_data in _served().items()},
+        _publish,
+        # Clients may only write what the entities and group_set can
+        WRITABLE_VALUES_SCHEMA,
+    )
+    try:
+        await api.async_start(hass.config.path(LOCAL_API_SOCKET))
+    except (OSError, NotImplementedError) as err:
+        # Not fatal, the tools fall back to binding the port themselves
+        _LOGGER.warning("Failed to start the local API: %s", err)
+        return
+    hass.data.setdefault(DOMAIN, {})[DATA_LOCAL_API] = api
+
+    async def _async_close_api(_event) -> None:
+        await api.async_close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close_api)
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Gree Heat Pump from a config entry."""
@@ -21,41 +157,138 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Get polling interval from options, defaulting to 10 seconds
     polling_interval = entry.options.get(CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL)
 
-    # Create heat pump instance
-    heat_pump = GreeHeatPump(host)
+    hass.data.setdefault(DOMAIN, {})
+    if DATA_SCHEDULER not in hass.data[DOMAIN]:
+        hass.data[DOMAIN][DATA_SCHEDULER] = GreePollScheduler(hass, MAX_POLLS_IN_FLIGHT)
+    hass.data[DOMAIN].setdefault(DATA_CAPABILITIES, {})
 
-    # Create data update coordinator
-    coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name=f"gree_hp_{host}",
-        update_method=heat_pump.async_update,
-        update_interval=timedelta(seconds=polling_interval),
+    # Create heat pump instance, all devices share the listener's UDP port and the
+    # per-model capability map
+    heat_pump = GreeHeatPump(
+        host,
+        async_get_listener(hass),
+        hass.data[DOMAIN][DATA_CAPABILITIES],
+        entry.data.get(CONF_MAC),
     )
+    heat_pump.queue_commands = entry.options.get(CONF_QUEUE_COMMANDS, DEFAULT_QUEUE_COMMANDS)
 
-    # Fetch initial data
-    await coordinator.async_config_entry_first_refresh()
+    # Create data update coordinator, seeded from the last saved snapshot
+    coordinator = GreeHeatPumpCoordinator(hass, entry, heat_pump)
+    coordinator.energy.rated_power = _heater_powers(entry)
+    await coordinator.async_restore()
+    await _async_apply_history(hass, entry, coordinator)
 
-    hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {
         "coordinator": coordinator,
         "heat_pump": heat_pump,
+        "options": dict(entry.options),
     }
 
     # Set up options update listener
     entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    # Binding and the first poll can take a while, don't hold up startup for them
+    entry.async_create_background_task(
+        hass, coordinator.async_refresh(), f"gree_hp first refresh {host}"
+    )
+
+    # Later polls share one loop with every other configured device
+    hass.data[DOMAIN][DATA_SCHEDULER].async_add(entry.entry_id, coordinator, polling_interval)
+    coordinator.async_set_keepalive(
+        entry.options.get(CONF_KEEPALIVE_INTERVAL, DEFAULT_KEEPALIVE_INTERVAL)
+    )
     return True
 
 
 async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Update options."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    """Apply changed options to the running entry."""
+    # Data-only updates (the stored MAC or a new address) are applied by the coordinator
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    if entry.options == entry_data["options"]:
+        return
+    entry_data["options"] = dict(entry.options)
+
+    # The session, binding and entities are kept, only the poll slots are moved
+    polling_interval = entry.options.get(CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL)
+    hass.data[DOMAIN][DATA_SCHEDULER].async_set_interval(entry.entry_id, polling_interval)
+    entry_data["coordinator"].async_set_keepalive(
+        entry.options.get(CONF_KEEPALIVE_INTERVAL, DEFAULT_KEEPALIVE_INTERVAL)
+    )
+    entry_data["heat_pump"].queue_commands = entry.options.get(
+        CONF_QUEUE_COMMANDS, DEFAULT_QUEUE_COMMANDS
+    )
+    # New ratings apply to on-time from now on, accumulated energy is kept
+    entry_data["coordinator"].energy.rated_power = _heater_powers(entry)
+    await _async_apply_history(hass, entry, entry_data["coordinator"])
+
+
+async def _async_apply_history(
+    hass: HomeAssistant, entry: ConfigEntry, coordinator: GreeHeatPumpCoordinator
+) -> None:
+    """Start or stop recording an entry in the shared history store."""
+    if not entry.options.get(CONF_HISTORY, DEFAULT_HISTORY):
+        if coordinator.history:
+            coordinator.history.async_remove_entry(entry.entry_id)
+        coordinator.history = None
+        return
+
+    if DATA_HISTORY not in hass.data[DOMAIN]:
+        history = GreeHistory(hass, hass.config.path(HISTORY_DATABASE))
+        await history.async_setup()
+        hass.data[DOMAIN][DATA_HISTORY] = history
+
+        async def _async_close_history(_event) -> None:
+            await history.async_close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close_history)
+
+    coordinator.history = hass.data[DOMAIN][DATA_HISTORY]
+    coordinator.history.async_set_retention(entry.entry_id, {
+        "raw": entry.options.get(CONF_HISTORY_RAW_RETENTION, DEFAULT_HISTORY_RAW_RETENTION) * 3600,
+        "minute": entry.options.get(
+            CONF_HISTORY_MINUTE_RETENTION, DEFAULT_HISTORY_MINUTE_RETENTION
+        ) * 86400,
+        "hour": entry.options.get(CONF_HISTORY_HOUR_RETENTION, DEFAULT_HISTORY_HOUR_RETENTION) * 86400,
+    })
+
+
+def _heater_powers(entry: ConfigEntry) -> Dict[str, int]:
+    """Return the rated power in watts of each heater, keyed by its run-state field."""
+    return {
+        field: entry.options.get(option, DEFAULT_HEATER_POWER)
+        for field, option in HEATER_POWER_OPTIONS.items()
+    }
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        hass.data[DOMAIN][DATA_SCHEDULER].async_remove(entry.entry_id)
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        entry_data["heat_pump"].close()
+        if entry_data["coordinator"].history:
+            entry_data["coordinator"].history.async_remove_entry(entry.entry_id)
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted snapshot and recorded history when a config entry is deleted."""
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}").async_remove()
+
+    history = hass.data.get(DOMAIN, {}).get(DATA_HISTORY)
+    if history is not None:
+        await history.async_delete_entry(entry.entry_id)
+        return
+
+    # No entry records any more, open the database just to delete the rows
+    path = hass.config.path(HISTORY_DATABASE)
+    if not await hass.async_add_executor_job(os.path.exists, path):
+        return
+    history = GreeHistory(hass, path)
+    await history.async_setup()
+    try:
+        await history.async_delete_entry(entry.entry_id)
+    finally:
+        await history.async_close()
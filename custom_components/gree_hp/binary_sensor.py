@@ -0,0 +1,95 @@
+"""Support for Gree Heat Pump binary sensors."""
+import logging
+from typing import Optional
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorEntity,
+    BinarySensorEntityDescription,
+    BinarySensorDeviceClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .entity import GreeHeatPumpEntity
+
+_LOGGER = logging.getLogger(__name__)
+
+# Keyed by the run-state field each sensor reads
+BINARY_SENSOR_DESCRIPTIONS = [
+    BinarySensorEntityDescription(
+        key="WatBoxElcHeRunSta",
+        name="Water Tank Heater",
+        device_class=BinarySensorDeviceClass.RUNNING,
+        icon="mdi:water-boiler",
+    ),
+    BinarySensorEntityDescription(
+        key="ElcHe1RunSta",
+        name="Backup Heater 1",
+        device_class=BinarySensorDeviceClass.RUNNING,
+        icon="mdi:heating-coil",
+    ),
+    BinarySensorEntityDescription(
+        key="ElcHe2RunSta",
+        name="Backup Heater 2",
+        device_class=BinarySensorDeviceClass.RUNNING,
+        icon="mdi:heating-coil",
+    ),
+    BinarySensorEntityDescription(
+        key="AnFrzzRunSta",
+        name="Antifreeze",
+        device_class=BinarySensorDeviceClass.RUNNING,
+        icon="mdi:snowflake-thermometer",
+    ),
+    BinarySensorEntityDescription(
+        key="SyAnFroRunSta",
+        name="Defrost",
+        device_class=BinarySensorDeviceClass.RUNNING,
+        icon="mdi:snowflake-melt",
+    ),
+]
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up Gree Heat Pump binary sensors."""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    heat_pump = hass.data[DOMAIN][config_entry.entry_id]["heat_pump"]
+    host = config_entry.data[CONF_HOST]
+
+    async_add_entities(
+        GreeHeatPumpBinarySensor(coordinator, heat_pump, description, host)
+        for description in BINARY_SENSOR_DESCRIPTIONS
+        if heat_pump.supports(description.key)
+    )
+
+class GreeHeatPumpBinarySensor(GreeHeatPumpEntity, BinarySensorEntity):
+    """Run state of a Gree Heat Pump heater or defrost cycle."""
+
+    def __init__(self, coordinator, heat_pump, description: BinarySensorEntityDescription, host: str):
+        """Initialize the binary sensor."""
+        super().__init__(coordinator, host, (description.key,))
+        self._heat_pump = heat_pump
+        self.entity_description = description
+        self._attr_unique_id = f"gree_hp_{host}_{description.key}"
+        self._attr_name = f"Gree Heat Pump {host} {description.name}"
+
+    @property
+    def is_on(self) -> Optional[bool]:
+        """Return true while the heater or cycle is running."""
+        data = self.coordinator.data
+        if data and data.get(self.entity_description.key) is not None:
+            return bool(data[self.entity_description.key])
+        return None
+
+    @property
+    def available(self) -> bool:
+        """Return True if entity is available."""
+        if self._heat_pump.is_rebinding and self._heat_pump.retry_count < self._heat_pump.max_retries:
+            return self.is_on is not None
+
+        return self.coordinator.last_update_success and self.is_on is not None
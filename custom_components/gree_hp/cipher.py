@@ -0,0 +1,104 @@
+"""Pack encryption for the Gree Heat Pump protocol versions."""
+import base64
+import json
+from typing import Any, Dict, Optional
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+
+from .const import AES_KEY, BLOCK_SIZE, GCM_KEY, GCM_NONCE, GCM_AAD
+
+class EcbCipher:
+    """AES-ECB with PKCS#7 padding, used by most firmware."""
+
+    version = 'ecb'
+    # Bytes a reply carries beyond its padded pack
+    overhead = 0
+
+    def __init__(self, key: str):
+        """Initialize the cipher, ECB keeps no state between messages so it is reused."""
+        self._aes = AES.new(key.encode('utf-8'), AES.MODE_ECB)
+
+    def encrypt(self, pack: Dict[str, Any]) -> Dict[str, str]:
+        """Return the message fields carrying pack."""
+        encrypted = self._aes.encrypt(pad(json.dumps(pack).encode('utf-8'), BLOCK_SIZE))
+        return {'pack': base64.b64encode(encrypted).decode()}
+
+    def decrypt(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """Decrypt the pack of a device message."""
+        return json.loads(unpad(self._aes.decrypt(base64.b64decode(msg['pack'])), BLOCK_SIZE))
+
+
+class GcmCipher:
+    """AES-GCM with a fixed nonce and an authentication tag, used by newer firmware."""
+
+    version = 'gcm'
+    # The base64 tag field of every reply
+    overhead = 33
+
+    def __init__(self, key: str):
+        """Initialize the cipher."""
+        self._key = key.encode('utf-8')
+
+    def _aes(self):
+        """Return a fresh GCM object, each one can only process a single message."""
+        aes = AES.new(self._key, AES.MODE_GCM, nonce=GCM_NONCE)
+        aes.update(GCM_AAD)
+        return aes
+
+    def encrypt(self, pack: Dict[str, Any]) -> Dict[str, str]:
+        """Return the message fields carrying pack and its tag."""
+        encrypted, tag = self._aes().encrypt_and_digest(json.dumps(pack).encode('utf-8'))
+        return {
+            'pack': base64.b64encode(encrypted).decode(),
+            'tag': base64.b64encode(tag).decode(),
+        }
+
+    def decrypt(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """Decrypt the pack of a device message, raising ValueError if its tag does not verify."""
+        return json.loads(self._aes().decrypt_and_verify(
+            base64.b64decode(msg['pack']), base64.b64decode(msg['tag'])
+        ))
+
+
+CIPHERS = {
+    EcbCipher.version: EcbCipher,
+    GcmCipher.version: GcmCipher,
+}
+
+GENERIC_KEYS = {
+    EcbCipher.version: AES_KEY,
+    GcmCipher.version: GCM_KEY,
+}
+
+_generic_ciphers: Dict[str, Any] = {}
+
+
+def message_version(msg: Dict[str, Any]) -> str:
+    """Return the protocol version a message was encrypted with."""
+    return GcmCipher.version if 'tag' in msg else EcbCipher.version
+
+
+def generic_cipher(version: str):
+    """Return the shared cipher of a protocol version's generic key."""
+    if version not in _generic_ciphers:
+        _generic_ciphers[version] = CIPHERS[version](GENERIC_KEYS[version])
+    return _generic_ciphers[version]
+
+
+def device_cipher(version: str, key: str):
+    """Return a cipher for the key a device handed out when binding."""
+    return CIPHERS[version](key)
+
+
+class GenericCipher:
+    """Decrypt messages of any version with its generic key, such as scan replies."""
+
+    def __init__(self):
+        """Initialize the cipher."""
+        self.version: Optional[str] = None
+
+    def decrypt(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """Decrypt msg and remember which version it used."""
+        self.version = message_version(msg)
+        return generic_cipher(self.version).decrypt(msg)
@@ -1,18 +1,57 @@
 """Config flow for Gree Heat Pump integration."""
 import logging
+from typing import Any, Dict, Optional
 import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_HOST
 from homeassistant.core import callback
 import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import discovery_flow
 
-from .const import DOMAIN, CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL
+from . import async_get_listener
+from .const import (
+    DOMAIN,
+    CONF_POLLING_INTERVAL,
+    DEFAULT_POLLING_INTERVAL,
+    MIN_POLLING_INTERVAL,
+    MAX_POLLING_INTERVAL,
+    CONF_KEEPALIVE_INTERVAL,
+    DEFAULT_KEEPALIVE_INTERVAL,
+    MAX_KEEPALIVE_INTERVAL,
+    CONF_QUEUE_COMMANDS,
+    DEFAULT_QUEUE_COMMANDS,
+    HEATER_POWER_OPTIONS,
+    DEFAULT_HEATER_POWER,
+    MAX_HEATER_POWER,
+    CONF_HISTORY,
+    DEFAULT_HISTORY,
+    CONF_HISTORY_RAW_RETENTION,
+    DEFAULT_HISTORY_RAW_RETENTION,
+    CONF_HISTORY_MINUTE_RETENTION,
+    DEFAULT_HISTORY_MINUTE_RETENTION,
+    CONF_HISTORY_HOUR_RETENTION,
+    DEFAULT_HISTORY_HOUR_RETENTION,
+    CONF_MAC,
+    CONF_SUBNET,
+    DATA_CAPABILITIES,
+    SCAN_TIMEOUT,
+)
+from .discovery import async_discover, sweep_addresses
+from .gree_hp import GreeHeatPump
 
 _LOGGER = logging.getLogger(__name__)
 
+# History retention options with their defaults, raw in hours and rollups in days
+HISTORY_RETENTION_OPTIONS = {
+    CONF_HISTORY_RAW_RETENTION: DEFAULT_HISTORY_RAW_RETENTION,
+    CONF_HISTORY_MINUTE_RETENTION: DEFAULT_HISTORY_MINUTE_RETENTION,
+    CONF_HISTORY_HOUR_RETENTION: DEFAULT_HISTORY_HOUR_RETENTION,
+}
+
 STEP_USER_DATA_SCHEMA = vol.Schema({
-    vol.Required(CONF_HOST): cv.string,
+    vol.Optional(CONF_HOST): cv.string,
+    vol.Optional(CONF_SUBNET): cv.string,
 })
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -20,6 +59,10 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    def __init__(self):
+        """Initialize the flow."""
+        self._discovered: Dict[str, Any] = {}
+
     @staticmethod
     @callback
     def async_get_options_flow(config_entry: config_entries.ConfigEntry):
@@ -27,16 +70,108 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         return OptionsFlowHandler()
 
     async def async_step_user(self, user_input=None):
-        """Handle the initial step."""
-        if user_input is None:
-            return self.async_show_form(
-                step_id="user",
-                data_schema=STEP_USER_DATA_SCHEMA,
+        """Handle the initial step, either a single address or a network scan."""
+        errors = {}
+        if user_input is not None:
+            if host := user_input.get(CONF_HOST):
+                self._async_abort_entries_match({CONF_HOST: host})
+                if mac := await self._async_verify(host):
+                    return await self._async_create_device_entry(host, mac)
+                errors["base"] = "cannot_connect"
+            else:
+                subnets = [user_input[CONF_SUBNET]] if user_input.get(CONF_SUBNET) else []
+                try:
+                    for subnet in subnets:
+                        sweep_addresses(subnet)
+                except ValueError:
+                    errors[CONF_SUBNET] = "invalid_subnet"
+                else:
+                    return await self._async_scan(subnets)
+
+        return self.async_show_form(
+            step_id="user",
+            data_schema=STEP_USER_DATA_SCHEMA,
+            errors=errors,
+        )
+
+    async def async_step_integration_discovery(self, discovery_info: Dict[str, Any]):
+        """Handle a device found by a scan."""
+        host = discovery_info[CONF_HOST]
+        mac = discovery_info[CONF_MAC]
+        await self.async_set_unique_id(mac)
+        self._abort_if_unique_id_configured()
+        # Entries created before MACs were stored are matched on their data instead
+        for entry in self._async_current_entries(include_ignore=False):
+            if mac == entry.data.get(CONF_MAC) or host == entry.data.get(CONF_HOST):
+                return self.async_abort(reason="already_configured")
+
+        self._discovered = discovery_info
+        self.context["title_placeholders"] = {"name": discovery_info.get("name") or host}
+        return await self.async_step_discovery_confirm()
+
+    async def async_step_discovery_confirm(self, user_input=None):
+        """Confirm a discovered device, binding to it before creating the entry."""
+        host = self._discovered[CONF_HOST]
+        errors = {}
+        if user_input is not None:
+            if mac := await self._async_verify(host):
+                return await self._async_create_device_entry(host, mac)
+            errors["base"] = "cannot_connect"
+
+        return self.async_show_form(
+            step_id="discovery_confirm",
+            description_placeholders={
+                "host": host,
+                "mac": self._discovered[CONF_MAC],
+                "model": self._discovered.get("model") or "unknown",
+            },
+            errors=errors,
+        )
+
+    async def _async_scan(self, subnets):
+        """Scan the network and start a discovery flow for every new device found."""
+        devices = await async_discover(async_get_listener(self.hass), subnets, SCAN_TIMEOUT)
+        configured = {
+            value
+            for entry in self._async_current_entries(include_ignore=False)
+            for value in (entry.unique_id, entry.data.get(CONF_MAC), entry.data.get(CONF_HOST))
+        }
+        new_devices = [
+            device for device in devices.values()
+            if device[CONF_MAC] not in configured and device[CONF_HOST] not in configured
+        ]
+        if not new_devices:
+            return self.async_abort(reason="no_devices_found")
+
+        for device in new_devices:
+            discovery_flow.async_create_flow(
+                self.hass,
+                DOMAIN,
+                context={"source": config_entries.SOURCE_INTEGRATION_DISCOVERY},
+                data=device,
             )
+        return self.async_abort(
+            reason="discovery_started",
+            description_placeholders={"count": str(len(new_devices))},
+        )
+
+    async def _async_verify(self, host: str) -> Optional[str]:
+        """Bind to a device once and return its MAC, or None if it did not answer."""
+        # Share the capability map so the probe done while binding is reused by the entry
+        capabilities = self.hass.data[DOMAIN].setdefault(DATA_CAPABILITIES, {})
+        heat_pump = GreeHeatPump(host, async_get_listener(self.hass), capabilities)
+        try:
+            return await heat_pump.async_verify()
+        finally:
+            heat_pump.close()
 
+    async def _async_create_device_entry(self, host: str, mac: str):
+        """Create the entry for a verified device, keyed by its MAC."""
+        await self.async_set_unique_id(mac, raise_on_progress=False)
+        self._abort_if_unique_id_configured()
         return self.async_create_entry(
-            title=f"Gree Heat Pump ({user_input[CONF_HOST]})",
-            data=user_input,
+            title=f"Gree Heat Pump ({host})",
+            data={CONF_HOST: host, CONF_MAC: mac},
         )
 
 
@@ -51,19 +186,77 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
     async def async_step_init(self, user_input=None):
         """Handle options flow."""
         if user_input is not None:
-            # Validate polling interval is between 1 and 10, default to 10 if invalid
+            # Validate polling interval is within range, default to 10 if invalid
             polling_interval = user_input.get(CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL)
-            if not isinstance(polling_interval, int) or polling_interval < 1 or polling_interval > 10:
+            if (not isinstance(polling_interval, int)
+                    or polling_interval < MIN_POLLING_INTERVAL
+                    or polling_interval > MAX_POLLING_INTERVAL):
                 polling_interval = DEFAULT_POLLING_INTERVAL
 
+            keepalive_interval = user_input.get(CONF_KEEPALIVE_INTERVAL, DEFAULT_KEEPALIVE_INTERVAL)
+            if (not isinstance(keepalive_interval, int)
+                    or keepalive_interval < 0
+                    or keepalive_interval > MAX_KEEPALIVE_INTERVAL):
+                keepalive_interval = DEFAULT_KEEPALIVE_INTERVAL
+
+            heater_powers = {}
+            for option in HEATER_POWER_OPTIONS.values():
+                power = user_input.get(option, DEFAULT_HEATER_POWER)
+                if not isinstance(power, int) or power < 0 or power > MAX_HEATER_POWER:
+                    power = DEFAULT_HEATER_POWER
+                heater_powers[option] = power
+
+            history_retention = {}
+            for option, default in HISTORY_RETENTION_OPTIONS.items():
+                retention = user_input.get(option, default)
+                if not isinstance(retention, int) or retention < 1:
+                    retention = default
+                history_retention[option] = retention
+
             return self.async_create_entry(
                 title="",
-                data={CONF_POLLING_INTERVAL: polling_interval}
+                data={
+                    CONF_POLLING_INTERVAL: polling_interval,
+                    CONF_KEEPALIVE_INTERVAL: keepalive_interval,
+                    CONF_QUEUE_COMMANDS: bool(
+                        user_input.get(CONF_QUEUE_COMMANDS, DEFAULT_QUEUE_COMMANDS)
+                    ),
+                    **heater_powers,
+                    CONF_HISTORY: bool(user_input.get(CONF_HISTORY, DEFAULT_HISTORY)),
+                    **history_retention,
+                }
             )
 
         current_polling_interval = self.config_entry.options.get(
             CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL
         )
+        current_keepalive_interval = self.config_entry.options.get(
+            CONF_KEEPALIVE_INTERVAL, DEFAULT_KEEPALIVE_INTERVAL
+        )
+        current_queue_commands = self.config_entry.options.get(
+            CONF_QUEUE_COMMANDS, DEFAULT_QUEUE_COMMANDS
+        )
+
+        heater_power_schema = {
+            vol.Optional(
+                option,
+                default=self.config_entry.options.get(option, DEFAULT_HEATER_POWER)
+            ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_HEATER_POWER))
+            for option in HEATER_POWER_OPTIONS.values()
+        }
+        history_schema = {
+            vol.Optional(
+                CONF_HISTORY,
+                default=self.config_entry.options.get(CONF_HISTORY, DEFAULT_HISTORY)
+            ): cv.boolean,
+            **{
+                vol.Optional(
+                    option,
+                    default=self.config_entry.options.get(option, default)
+                ): vol.All(vol.Coerce(int), vol.Range(min=1))
+                for option, default in HISTORY_RETENTION_OPTIONS.items()
+            },
+        }
 
         return self.async_show_form(
             step_id="init",
@@ -71,6 +264,16 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 vol.Optional(
                     CONF_POLLING_INTERVAL,
                     default=current_polling_interval
-                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=10))
+                ): vol.All(vol.Coerce(int), vol.Range(min=MIN_POLLING_INTERVAL, max=MAX_POLLING_INTERVAL)),
+                vol.Optional(
+                    CONF_KEEPALIVE_INTERVAL,
+                    default=current_keepalive_interval
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_KEEPALIVE_INTERVAL)),
+                vol.Optional(
+                    CONF_QUEUE_COMMANDS,
+                    default=current_queue_commands
+                ): cv.boolean,
+                **heater_power_schema,
+                **history_schema,
             })
         )
@@ -5,9 +5,147 @@ DEFAULT_PORT = 7000
 AES_KEY = "a3K8Bx%2r8Y7#xDh"
 BLOCK_SIZE = 16
 
+# Generic key, fixed nonce and associated data of the AES-GCM protocol used by newer firmware
+GCM_KEY = "{yxAHAY_Lm6pbC/<"
+GCM_NONCE = b"\x54\x40\x78\x44\x49\x67\x5a\x51\x6c\x5e\x63\x13"
+GCM_AAD = b"qualcomm-test"
+
+# Adaptive timeout constants (seconds)
+INITIAL_RTO = 1.0
+MIN_RTO = 0.2
+MAX_RTO = 5.0
+MAX_RETRANSMITS = 2
+
+# Writes matching a value confirmed within this many seconds are not sent
+WRITE_CACHE_WINDOW = 60
+
+# Status requests are split so that each reply datagram stays within this many bytes
+MAX_REPLY_SIZE = 1024
+
+# Seconds a queried column is served from cache, measurements age faster than settings
+DEFAULT_QUERY_TTL = 60
+QUERY_TTL = {
+    'AllInWatTemHi': 10,
+    'AllInWatTemLo': 10,
+    'AllOutWatTemHi': 10,
+    'AllOutWatTemLo': 10,
+    'HepOutWatTemHi': 10,
+    'HepOutWatTemLo': 10,
+    'WatBoxTemHi': 10,
+    'WatBoxTemLo': 10,
+    'RmoHomTemHi': 10,
+    'RmoHomTemLo': 10,
+    'AllErr': 10,
+}
+
 # Configuration constants
 CONF_POLLING_INTERVAL = "polling_interval"
 DEFAULT_POLLING_INTERVAL = 10
+MIN_POLLING_INTERVAL = 1
+# Pushed datagrams keep data fresh between polls, so long intervals are allowed
+MAX_POLLING_INTERVAL = 300
+
+# Seconds a command may take, including recovery, before it is given up
+COMMAND_DEADLINE = 5.0
+# Commands issued within this many seconds of each other share one cmd packet
+COMMAND_BATCH_WINDOW = 0.05
+# Devices a group command is sent to at the same time
+GROUP_SET_CONCURRENCY = 16
+# Commands refused while the device is offline are kept and sent once it is back
+CONF_QUEUE_COMMANDS = "queue_commands"
+DEFAULT_QUEUE_COMMANDS = False
+
+# Keepalive probes the session after this many idle seconds, 0 disables it
+CONF_KEEPALIVE_INTERVAL = "keepalive_interval"
+DEFAULT_KEEPALIVE_INTERVAL = 0
+MAX_KEEPALIVE_INTERVAL = 600
+
+# Optional local history store, retention of raw samples in hours and of rollups in days
+CONF_HISTORY = "history"
+DEFAULT_HISTORY = False
+CONF_HISTORY_RAW_RETENTION = "history_raw_retention"
+DEFAULT_HISTORY_RAW_RETENTION = 48
+CONF_HISTORY_MINUTE_RETENTION = "history_minute_retention"
+DEFAULT_HISTORY_MINUTE_RETENTION = 30
+CONF_HISTORY_HOUR_RETENTION = "history_hour_retention"
+DEFAULT_HISTORY_HOUR_RETENTION = 730
+DATA_HISTORY = "history"
+HISTORY_DATABASE = "gree_hp_history.db"
+
+# Profiling, run on demand by the profile service
+DATA_PROFILING = "profiling"
+DEFAULT_PROFILE_DURATION = 30
+MAX_PROFILE_DURATION = 600
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_TOP_FUNCTIONS = 30
+
+# Scheduler constants
+DATA_SCHEDULER = "scheduler"
+DATA_LISTENER = "listener"
+DATA_CAPABILITIES = "capabilities"
+MAX_POLLS_IN_FLIGHT = 4
+# Exchanges of any kind in flight at once across every device sharing the port
+MAX_EXCHANGES_IN_FLIGHT = 16
+
+# Local API sharing the sessions with tools on the same host, a Unix socket in the config directory,
+# served only if enabled in configuration.yaml
+CONF_LOCAL_API = "local_api"
+DATA_LOCAL_API = "local_api"
+LOCAL_API_SOCKET = "gree_hp.sock"
+
+# Rediscovery constants
+CONF_MAC = "mac"
+BROADCAST_ADDRESS = "255.255.255.255"
+SCAN_TIMEOUT = 2.0
+RELOCATE_AFTER_FAILURES = 2
+
+# Discovery constants
+CONF_SUBNET = "subnet"
+DISCOVERY_INTERVAL = 900
+# Scans are sent in bursts of this size, yielding to the event loop in between
+SCAN_BURST = 64
+# Largest subnet swept host by host (a /22)
+MAX_SWEEP_HOSTS = 1024
+
+# Persistence constants
+STORAGE_VERSION = 1
+SNAPSHOT_SAVE_DELAY = 30
+
+# On/off control flags exposed as switches
+CONTROL_FLAGS = [
+    'Quiet',
+    'FastHtWter',
+    'Emegcy',
+    'HetHtWter',
+    'ColHtWter',
+    'LefHom',
+]
+
+# Run-state fields of the backup heaters and defrost, non-zero while running
+RUN_STATE_FIELDS = [
+    'WatBoxElcHeRunSta',
+    'ElcHe1RunSta',
+    'ElcHe2RunSta',
+    'AnFrzzRunSta',
+    'SyAnFroRunSta',
+]
+# Electric heaters among them, with the option holding each one's rated power in watts
+HEATER_POWER_OPTIONS = {
+    'WatBoxElcHeRunSta': "tank_heater_power",
+    'ElcHe1RunSta': "backup_heater_1_power",
+    'ElcHe2RunSta': "backup_heater_2_power",
+}
+DEFAULT_HEATER_POWER = 3000
+MAX_HEATER_POWER = 12000
+# Event fired when a run-state field switches on or off
+EVENT_RUN_STATE_CHANGED = "gree_hp_run_state_changed"
+
+# Writable temperature setpoints and the range each one accepts, in °C
+SETPOINT_LIMITS = {
+    'CoWatOutTemSet': (5, 30),
+    'HeWatOutTemSet': (30, 60),
+    'WatBoxTemSet': (30, 60),
+}
 
 # Mode mapping
 MODE_MAPPING = {
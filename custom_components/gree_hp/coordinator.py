@@ -0,0 +1,227 @@
+"""Data update coordinator for the Gree Heat Pump integration."""
+from datetime import datetime, timedelta
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from .const import (
+    DOMAIN,
+    CONF_MAC,
+    DATA_LISTENER,
+    BROADCAST_ADDRESS,
+    SCAN_TIMEOUT,
+    RELOCATE_AFTER_FAILURES,
+    STORAGE_VERSION,
+    SNAPSHOT_SAVE_DELAY,
+    RUN_STATE_FIELDS,
+    EVENT_RUN_STATE_CHANGED,
+    HEATER_POWER_OPTIONS,
+)
+from .discovery import async_scan
+from .energy import HeaterEnergy
+from .history import GreeHistory
+from .gree_hp import GreeHeatPump
+
+_LOGGER = logging.getLogger(__name__)
+
+class GreeHeatPumpCoordinator(DataUpdateCoordinator[Dict[str, Any]]):
+    """Coordinate polling of a single heat pump and persist its last snapshot."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, heat_pump: GreeHeatPump):
+        """Initialize the coordinator."""
+        # Polls are dispatched by the shared GreePollScheduler, not by a per-entry timer
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"gree_hp_{entry.data[CONF_HOST]}",
+            update_interval=None,
+        )
+        self.config_entry = entry
+        self.heat_pump = heat_pump
+        self.is_stale = False
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+        self._keepalive_interval = 0
+        self._cancel_keepalive: Optional[Callable[[], None]] = None
+        self._run_states: Dict[str, bool] = {}
+        self.energy = HeaterEnergy(HEATER_POWER_OPTIONS)
+        self.history: Optional[GreeHistory] = None
+        entry.async_on_unload(heat_pump.add_update_listener(self._handle_push))
+        entry.async_on_unload(self.async_add_listener(self._async_fire_transitions))
+        entry.async_on_unload(self.async_add_listener(self._async_sample_energy))
+        entry.async_on_unload(self.async_add_listener(self._async_record_history))
+        entry.async_on_unload(lambda: self.async_set_keepalive(0))
+
+    async def async_restore(self) -> None:
+        """Seed the coordinator with the snapshot saved on the last run."""
+        stored = await self._store.async_load()
+        if stored and stored.get("binding"):
+            self.heat_pump.restore_binding(stored["binding"])
+        if stored and stored.get("energy"):
+            self.energy.restore(stored["energy"])
+        if stored and stored.get("data"):
+            self.data = stored["data"]
+            self.is_stale = True
+            self._run_states = self._current_run_states()
+            _LOGGER.debug("Restored %d fields for %s from last snapshot",
+                          len(self.data), self.name)
+
+    @callback
+    def async_set_keepalive(self, interval: int) -> None:
+        """Probe the session whenever it was idle for interval seconds, 0 disables probing."""
+        if self._cancel_keepalive:
+            self._cancel_keepalive()
+            self._cancel_keepalive = None
+        self._keepalive_interval = interval
+        if interval:
+            self._cancel_keepalive = async_track_time_interval(
+                self.hass, self._async_keepalive, timedelta(seconds=interval),
+                name=f"{self.name} keepalive",
+            )
+
+    @callback
+    def _async_keepalive(self, _now: datetime) -> None:
+        """Run a keepalive probe in the background so it never delays the timer."""
+        self.config_entry.async_create_background_task(
+            self.hass,
+            self.heat_pump.async_keepalive(self._keepalive_interval),
+            f"{self.name} keepalive probe",
+        )
+
+    async def _async_update_data(self) -> Dict[str, Any]:
+        """Fetch data from the heat pump and schedule a snapshot save."""
+        data = await self.heat_pump.async_update()
+        failures = self.heat_pump.consecutive_failures
+        if failures and failures % RELOCATE_AFTER_FAILURES == 0 and await self._async_relocate():
+            data = await self.heat_pump.async_update()
+
+        if not data:
+            # Keep serving the restored snapshot until the first live poll succeeds
+            if self.is_stale:
+                return self.data
+            return data
+
+        self.is_stale = False
+        self._async_store_mac()
+        self._store.async_delay_save(self._snapshot, SNAPSHOT_SAVE_DELAY)
+        return data
+
+    @callback
+    def _async_store_mac(self) -> None:
+        """Remember the device MAC in the config entry so it can be found again."""
+        mac = self.heat_pump.mac
+        if mac and self.config_entry.data.get(CONF_MAC) != mac:
+            self.hass.config_entries.async_update_entry(
+                self.config_entry, data={**self.config_entry.data, CONF_MAC: mac}
+            )
+
+    async def _async_relocate(self) -> bool:
+        """Look for the device's MAC with one broadcast scan, return True if it moved."""
+        mac = self.heat_pump.mac
+        if not mac:
+            return False
+
+        found = await async_scan(self.hass.data[DOMAIN][DATA_LISTENER], [BROADCAST_ADDRESS], SCAN_TIMEOUT)
+        device = found.get(mac)
+        if device is None or device['host'] == self.heat_pump.host:
+            _LOGGER.debug("Device %s not found at a new address", mac)
+            return False
+
+        old_host = self.heat_pump.host
+        new_host = device['host']
+        self.heat_pump.relocate(new_host)
+        self._async_migrate_host(old_host, new_host)
+        return True
+
+    @callback
+    def _async_migrate_host(self, old_host: str, new_host: str) -> None:
+        """Move the config entry, device and entity ids over to the new address."""
+        self.hass.config_entries.async_update_entry(
+            self.config_entry,
+            title=f"Gree Heat Pump ({new_host})",
+            data={**self.config_entry.data, CONF_HOST: new_host},
+        )
+
+        device_registry = dr.async_get(self.hass)
+        device = device_registry.async_get_device(identifiers={(DOMAIN, old_host)})
+        if device:
+            device_registry.async_update_device(device.id, new_identifiers={(DOMAIN, new_host)})
+
+        entity_registry = er.async_get(self.hass)
+        old_prefix = f"gree_hp_{old_host}_"
+        for entity_entry in er.async_entries_for_config_entry(entity_registry, self.config_entry.entry_id):
+            if entity_entry.unique_id.startswith(old_prefix):
+                entity_registry.async_update_entity(
+                    entity_entry.entity_id,
+                    new_unique_id=f"gree_hp_{new_host}_{entity_entry.unique_id[len(old_prefix):]}",
+                )
+
+    @callback
+    def _handle_push(self, data: Dict[str, Any]) -> None:
+        """Publish values the device sent without being polled."""
+        self.is_stale = False
+        self.async_set_updated_data(data)
+        self._store.async_delay_save(self._snapshot, SNAPSHOT_SAVE_DELAY)
+
+    @callback
+    def async_publish_confirmed(self) -> None:
+        """Publish values confirmed by a command response without polling again."""
+        self.async_set_updated_data({**(self.data or {}), **self.heat_pump.data})
+
+    def _current_run_states(self) -> Dict[str, bool]:
+        """Return whether each run-state field present in the data is on."""
+        return {
+            field: bool(self.data[field])
+            for field in RUN_STATE_FIELDS
+            if self.data and self.data.get(field) is not None
+        }
+
+    @callback
+    def _async_fire_transitions(self) -> None:
+        """Fire an event for every run-state field that changed since the last snapshot."""
+        run_states = self._current_run_states()
+        changed = {
+            field: state for field, state in run_states.items()
+            if field in self._run_states and self._run_states[field] != state
+        }
+        self._run_states = {**self._run_states, **run_states}
+        if not changed:
+            return
+
+        host = self.config_entry.data[CONF_HOST]
+        device = dr.async_get(self.hass).async_get_device(identifiers={(DOMAIN, host)})
+        for field, state in changed.items():
+            _LOGGER.debug("%s of %s switched %s", field, host, "on" if state else "off")
+            self.hass.bus.async_fire(EVENT_RUN_STATE_CHANGED, {
+                "device_id": device.id if device else None,
+                "host": host,
+                "field": field,
+                "state": state,
+            })
+
+    @callback
+    def _async_sample_energy(self) -> None:
+        """Integrate heater on-time up to this update, before entities read the totals."""
+        if self.data and not self.is_stale and self.last_update_success:
+            self.energy.sample(self.data, time.time())
+
+    @callback
+    def _async_record_history(self) -> None:
+        """Hand every live sample to the history store when it is enabled."""
+        if self.history and self.data and not self.is_stale and self.last_update_success:
+            self.history.async_append(self.config_entry.entry_id, time.time(), self.data)
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """Return the data to persist."""
+        return {
+            "data": self.data,
+            "binding": self.heat_pump.binding,
+            "energy": self.energy.as_dict(),
+        }
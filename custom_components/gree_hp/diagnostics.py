@@ -0,0 +1,28 @@
+"""Diagnostics support for the Gree Heat Pump integration."""
+from typing import Any, Dict
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, DATA_SCHEDULER
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    heat_pump = hass.data[DOMAIN][entry.entry_id]["heat_pump"]
+
+    return {
+        "options": dict(entry.options),
+        "data": coordinator.data,
+        "stale": coordinator.is_stale,
+        "schedule": hass.data[DOMAIN][DATA_SCHEDULER].stats(entry.entry_id),
+        "cipher": heat_pump.binding["cipher"],
+        "rtt": heat_pump.rtt_stats,
+        "commands": heat_pump.command_stats,
+        "recovery": heat_pump.recovery_stats,
+        "keepalive": heat_pump.keepalive_stats,
+        "offline": heat_pump.is_offline,
+        "pending_commands": heat_pump.pending_commands,
+    }
@@ -0,0 +1,71 @@
+"""Discovery of Gree Heat Pump devices on the local network."""
+import asyncio
+import ipaddress
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+
+from .cipher import GenericCipher
+from .const import BROADCAST_ADDRESS, MAX_SWEEP_HOSTS, SCAN_BURST
+from .listener import GreeListener
+
+_LOGGER = logging.getLogger(__name__)
+
+async def async_scan(listener: GreeListener, addresses: List[str], timeout: float) -> Dict[str, Dict[str, Any]]:
+    """Send a scan to every address and return the devices that answered, keyed by MAC."""
+    cipher = GenericCipher()
+    found: Dict[str, Dict[str, Any]] = {}
+
+    def handle_reply(msg: Dict[str, Any], addr: Tuple[str, int]) -> bool:
+        if 'pack' not in msg:
+            return False
+        try:
+            pack = cipher.decrypt(msg)
+        except Exception: # pylint: disable=broad-except
+            return False
+        if pack.get('t') != 'dev' or 'mac' not in pack:
+            return False
+
+        found[pack['mac']] = {
+            'host': addr[0],
+            'mac': pack['mac'],
+            'name': pack.get('name'),
+            'model': pack.get('mid') or pack.get('model'),
+        }
+        return True
+
+    await listener.async_start()
+    # A whole scan counts as one exchange against the port's limit
+    async with listener.exchange_slots:
+        remove_handler = listener.add_scan_handler(handle_reply)
+        try:
+            scan_msg = json.dumps({'t': 'scan'}).encode('utf-8')
+            # All probes are in flight at once, the deadline starts after the last send
+            for index, address in enumerate(addresses):
+                listener.sendto(scan_msg, address)
+                if (index + 1) % SCAN_BURST == 0:
+                    await asyncio.sleep(0)
+            await asyncio.sleep(timeout)
+        finally:
+            remove_handler()
+
+    _LOGGER.debug("Scan of %d addresses found %d devices", len(addresses), len(found))
+    return found
+
+
+def sweep_addresses(subnet: str) -> List[str]:
+    """Return every host address of a subnet, raising ValueError if it is invalid or too large."""
+    network = ipaddress.ip_network(subnet, strict=False)
+    if network.version != 4:
+        raise ValueError(f"{subnet} is not an IPv4 subnet")
+    if network.num_addresses > MAX_SWEEP_HOSTS:
+        raise ValueError(f"{subnet} has more than {MAX_SWEEP_HOSTS} addresses")
+    return [str(address) for address in network.hosts()]
+
+
+async def async_discover(listener: GreeListener, subnets: List[str], timeout: float) -> Dict[str, Dict[str, Any]]:
+    """Broadcast a scan and sweep every host of the given subnets within one deadline."""
+    addresses = [BROADCAST_ADDRESS]
+    for subnet in subnets:
+        addresses.extend(sweep_addresses(subnet))
+    return await async_scan(listener, addresses, timeout)
@@ -0,0 +1,78 @@
+"""Backup heater on-time and energy accounting for Gree Heat Pump devices."""
+import math
+from typing import Any, Dict, Optional
+
+# Time constant in seconds of the running duty cycle average
+DUTY_CYCLE_WINDOW = 3600
+# Gaps between samples longer than this (downtime, restarts) are not integrated
+MAX_SAMPLE_GAP = 600
+
+class HeaterMeter:
+    """Integrate the on-time and energy of one heater, in constant time per sample."""
+
+    def __init__(self):
+        """Initialize the meter."""
+        self.on_time = 0.0
+        self.energy = 0.0
+        self.duty_cycle = 0.0
+        self._state: Optional[bool] = None
+        self._sampled_at: Optional[float] = None
+
+    def sample(self, state: bool, now: float, rated_power: float) -> None:
+        """Account for the time since the last sample, during which the last state held.
+
+        rated_power is in watts, energy is kept in kWh.
+        """
+        if self._state is not None and self._sampled_at is not None:
+            elapsed = now - self._sampled_at
+            if 0 < elapsed <= MAX_SAMPLE_GAP:
+                running = 1.0 if self._state else 0.0
+                self.on_time += running * elapsed
+                self.energy += running * elapsed * rated_power / 3_600_000
+                decay = math.exp(-elapsed / DUTY_CYCLE_WINDOW)
+                self.duty_cycle = self.duty_cycle * decay + running * (1 - decay)
+        self._state = state
+        self._sampled_at = now
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the meter state to persist."""
+        return {
+            "on_time": self.on_time,
+            "energy": self.energy,
+            "duty_cycle": self.duty_cycle,
+            "state": self._state,
+            "sampled_at": self._sampled_at,
+        }
+
+    def restore(self, stored: Dict[str, Any]) -> None:
+        """Continue from a persisted meter state."""
+        self.on_time = stored.get("on_time", 0.0)
+        self.energy = stored.get("energy", 0.0)
+        self.duty_cycle = stored.get("duty_cycle", 0.0)
+        self._state = stored.get("state")
+        self._sampled_at = stored.get("sampled_at")
+
+
+class HeaterEnergy:
+    """Meters for every heater run-state field of a device."""
+
+    def __init__(self, fields):
+        """Initialize one meter per field, all rated at 0 W until configured."""
+        self.meters: Dict[str, HeaterMeter] = {field: HeaterMeter() for field in fields}
+        self.rated_power: Dict[str, float] = {field: 0.0 for field in fields}
+
+    def sample(self, data: Dict[str, Any], now: float) -> None:
+        """Feed the run state of every heater present in data."""
+        for field, meter in self.meters.items():
+            if data.get(field) is not None:
+                meter.sample(bool(data[field]), now, self.rated_power[field])
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the state of every meter to persist."""
+        return {field: meter.as_dict() for field, meter in self.meters.items()}
+
+    def restore(self, stored: Dict[str, Any]) -> None:
+        """Continue every meter from its persisted state."""
+        for field, meter in self.meters.items():
+            if field in stored:
+                meter.restore(stored[field])
@@ -0,0 +1,64 @@
+"""Base entity for the Gree Heat Pump integration."""
+from typing import Awaitable, Iterable
+
+from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+from .gree_hp import DeviceOfflineError
+
+class GreeHeatPumpEntity(CoordinatorEntity):
+    """Common device info and state attributes for Gree Heat Pump entities."""
+
+    def __init__(self, coordinator, host: str, columns: Iterable[str] = ()):
+        """Initialize the entity, backed by the device columns it reads or writes."""
+        super().__init__(coordinator)
+        self._host = host
+        self._columns = tuple(columns)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Disable the entity once the capability probe finds one of its columns unsupported.
+
+        The first setup adds entities before the device was ever bound and probed.
+        Disabling rather than removing keeps the user's customizations, and the
+        user can enable the entity again if the probe was wrong.
+        """
+        heat_pump = self.coordinator.heat_pump
+        if not all(heat_pump.supports(col) for col in self._columns):
+            registry = er.async_get(self.hass)
+            # Updates keep arriving until the entity is removed after being disabled
+            registry_entry = registry.async_get(self.entity_id)
+            if registry_entry is not None and not registry_entry.disabled:
+                registry.async_update_entity(
+                    self.entity_id, disabled_by=er.RegistryEntryDisabler.INTEGRATION
+                )
+            return
+        super()._handle_coordinator_update()
+
+    @property
+    def device_info(self):
+        """Return device info."""
+        return {
+            "identifiers": {(DOMAIN, self._host)},
+            "name": f"Gree Heat Pump {self._host}",
+            "manufacturer": "Gree",
+            "model": "Heat Pump",
+        }
+
+    async def _async_send(self, command: Awaitable[bool]) -> None:
+        """Await a set command and publish what the device confirmed."""
+        try:
+            success = await command
+        except DeviceOfflineError as err:
+            raise HomeAssistantError(str(err)) from err
+        if success:
+            # The command response already confirmed the value
+            self.coordinator.async_publish_confirmed()
+
+    @property
+    def extra_state_attributes(self):
+        """Flag values restored from the last snapshot until a live poll succeeds."""
+        return {"stale": self.coordinator.is_stale}
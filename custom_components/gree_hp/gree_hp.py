@@ -1,118 +1,312 @@
 """Gree Heat Pump communication handler."""
 import asyncio
-import base64
 import json
 import logging
-import socket
-from typing import Dict, Any, Optional
+import time
+from typing import Awaitable, Callable, Dict, Any, List, Optional
+
+from .cipher import CIPHERS, GenericCipher, device_cipher, generic_cipher
+from .const import (
+    BLOCK_SIZE,
+    INITIAL_RTO,
+    MIN_RTO,
+    MAX_RTO,
+    MAX_RETRANSMITS,
+    COMMAND_DEADLINE,
+    COMMAND_BATCH_WINDOW,
+    CONTROL_FLAGS,
+    WRITE_CACHE_WINDOW,
+    MAX_REPLY_SIZE,
+    DEFAULT_QUERY_TTL,
+    QUERY_TTL,
+    RUN_STATE_FIELDS,
+)
+from .listener import GreeListener
+from .rtt import RttEstimator
 
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad, unpad
+_LOGGER = logging.getLogger(__name__)
 
-from .const import DEFAULT_PORT, AES_KEY, BLOCK_SIZE
+# Columns requested on every poll
+STATUS_COLS = [
+    'Pow', 'Mod', 'CoWatOutTemSet', 'HeWatOutTemSet', 'WatBoxTemSet',
+    'AllInWatTemHi', 'AllInWatTemLo', 'AllOutWatTemHi', 'AllOutWatTemLo',
+    'WatBoxTemHi', 'WatBoxTemLo',
+    *CONTROL_FLAGS,
+    *RUN_STATE_FIELDS,
+]
+
+# Every column known from the protocol, probed once per model to find the supported ones
+KNOWN_COLS = [
+    'Pow', 'Mod', 'CoWatOutTemSet', 'HeWatOutTemSet', 'WatBoxTemSet', 'TemUn', 'AllErr',
+    'TemRec', 'ColHtWter', 'HetHtWter', 'TemRecB', 'CoHomTemSet', 'HeHomTemSet', 'FastHtWter',
+    'Quiet', 'Emegcy', 'LefHom', 'SwDisFct', 'SvSt', 'VersatiSeries', 'RomHomTemExt',
+    'WatBoxExt', 'FocModSwh', 'HanFroSwh', 'WatSyExhSwh', 'BordTest', 'ColColetSwh',
+    'EndTemCotSwh', 'AllInWatTemHi', 'AllInWatTemLo', 'AllOutWatTemHi', 'AllOutWatTemLo',
+    'HepOutWatTemHi', 'HepOutWatTemLo', 'WatBoxTemHi', 'WatBoxTemLo', 'RmoHomTemHi',
+    'RmoHomTemLo', 'WatBoxElcHeRunSta', 'SyAnFroRunSta', 'ElcHe1RunSta', 'ElcHe2RunSta',
+    'AnFrzzRunSta',
+]
+
+# Pack type the device answers each operation with
+REPLY_TYPES = {
+    'scan': 'dev',
+    'bind': 'bindok',
+    'status': 'dat',
+    'cmd': 'res',
+}
+
+# Operations whose replies are encrypted with the device key
+DEVICE_KEY_OPERATIONS = ('status', 'cmd')
+
+# Column asked for by keepalive probes, the smallest useful status request
+KEEPALIVE_COLS = ['Pow']
+
+# Recovery steps tried in order when an exchange fails: the exchange's own retransmits,
+# a bind with the known MAC on a new session, then a scan of the address and a bind
+RECOVERY_STEPS = ('retransmit', 'rebind', 'scan')
+
+class DeviceOfflineError(Exception):
+    """Raised when a command cannot reach a device known or found to be unreachable."""
 
-_LOGGER = logging.getLogger(__name__)
 
 class GreeHeatPump:
     """Handle communication with Gree Heat Pump."""
 
-    def __init__(self, host: str):
+    def __init__(self, host: str, listener: Optional[GreeListener] = None,
+                 capabilities: Optional[Dict[str, List[str]]] = None, mac: Optional[str] = None):
         """Initialize the heat pump connection."""
         self._host = host
+        self._mac_hint = mac
+        self._consecutive_failures = 0
+        self._capabilities = capabilities if capabilities is not None else {}
+        self._model: Optional[str] = None
+        self._supported_cols: Optional[List[str]] = None
         self._data: Dict[str, Any] = {}
-        self._sock: Optional[socket.socket] = None
+        self._listener = listener
+        self._owns_listener = listener is None
+        self._inbox: Optional[asyncio.Queue] = None
+        self._exchange_lock = asyncio.Lock()
+        self._bind_lock = asyncio.Lock()
+        self._update_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._sample_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._field_cache: Dict[str, Any] = {}
+        self._confirmed_at: Dict[str, float] = {}
+        self._query_cols: set = set()
+        self._query_future: Optional[asyncio.Future] = None
+        self._commands_sent = 0
+        self._commands_skipped = 0
+        self._fields_sent = 0
+        self._batch_values: Dict[str, int] = {}
+        self._batch_deadline = COMMAND_DEADLINE
+        self._batch_future: Optional[asyncio.Future] = None
+        self._recoveries: Dict[str, int] = {step: 0 for step in (*RECOVERY_STEPS, 'failed')}
+        self._retransmitted = False
+        self._last_heard = 0.0
+        self._keepalives = 0
+        self._keepalive_failures = 0
+        self._rtt: Dict[str, RttEstimator] = {
+            operation: RttEstimator(INITIAL_RTO, MIN_RTO, MAX_RTO) for operation in REPLY_TYPES
+        }
         self._device_mac: Optional[str] = None
         self._device_key: Optional[str] = None
         self._device_cipher = None
+        # Protocol version detected on the first bind, kept across sessions
+        self._cipher_version: Optional[str] = None
         self._is_bound = False
         self._last_successful_data: Dict[str, Any] = {}
         self._retry_count = 0
-        self._max_retries = 3
+        self._max_retries = len(RECOVERY_STEPS)
         self._is_rebinding = False
+        self._is_offline = False
+        self._pending_commands: Dict[str, int] = {}
+        self.queue_commands = False
 
     def __del__(self):
-        """Clean up socket on destruction."""
+        """Clean up socket on destruction, for users that never called close."""
+        self._close_connection()
+
+    def close(self) -> None:
+        """Detach from the listener, releasing it if this device owns it."""
         self._close_connection()
 
     def _close_connection(self):
-        """Close socket connection and reset state."""
-        if self._sock:
-            try:
-                self._sock.close()
-            except Exception: # pylint: disable=broad-except
-                pass
-            self._sock = None
+        """Detach from the listener and reset state."""
+        if self._listener:
+            self._listener.unregister(self)
+            if self._owns_listener:
+                self._listener.close()
+                self._listener = None
         self._device_mac = None
         self._device_key = None
         self._device_cipher = None
         self._is_bound = False
 
-    async def _ensure_connection(self) -> bool:
+    async def _ensure_connection(self, rescan: bool = False) -> bool:
         """Ensure we have a valid connection and binding."""
         try:
-            if not self._is_bound:
-                await self._setup_connection()
+            async with self._bind_lock:
+                if not self._is_bound:
+                    await self._setup_connection(rescan)
             return self._is_bound
         except Exception as e: # pylint: disable=broad-except
             _LOGGER.error("Failed to ensure connection: %s", e)
             self._close_connection()
             return False
 
-    async def _setup_connection(self) -> None:
-        """Setup socket connection and perform discovery/binding."""
-        loop = asyncio.get_event_loop()
+    async def async_verify(self) -> Optional[str]:
+        """Bind to the device and return its MAC, or None if it could not be bound."""
+        if await self._ensure_connection():
+            return self._device_mac
+        return None
+
+    async def _setup_connection(self, rescan: bool = False) -> None:
+        """Attach to the listener and perform discovery/binding."""
+        # A session lost during this run is bound again with the MAC and protocol it had
+        known_mac = None if rescan else self._device_mac
+        known_version = None if rescan else self._cipher_version
+        previous = (self._device_mac, self._cipher_version)
 
         # Close any existing connection
         self._close_connection()
 
-        # Create new socket
-        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self._sock.settimeout(5.0)
-        self._sock.bind(('0.0.0.0', DEFAULT_PORT))
-
         try:
-            cipher = AES.new(AES_KEY.encode('utf-8'), AES.MODE_ECB)
+            # Standalone instances get a listener of their own
+            if self._listener is None:
+                self._listener = GreeListener()
+            await self._listener.async_start()
+            self._listener.register(self)
 
-            # Step 1: Discovery
-            find_msg = {'t': 'scan'}
-            await loop.run_in_executor(None, self._send_msg, self._sock, find_msg)
-            response = await loop.run_in_executor(None, self._receive_msg, self._sock)
-            pack = self._parse_msg(response['pack'], cipher)
-            self._device_mac = pack['mac']
+            scan_version = None
 
-            # Step 2: Binding
-            bind_pack = {'t': 'bind', 'uid': 0, 'mac': self._device_mac}
-            bind_msg = {
-                'cid': 'app', 'i': 1, 't': 'pack', 'uid': 0,
-                'tcid': self._device_mac,
-                'pack': self._enc_msg(bind_pack, cipher)
-            }
-            await loop.run_in_executor(None, self._send_msg, self._sock, bind_msg)
-            response = await loop.run_in_executor(None, self._receive_msg, self._sock)
-            pack = self._parse_msg(response['pack'], cipher)
+            # Step 1: Discovery, skipped when rebinding a known device
+            if known_mac:
+                self._device_mac = known_mac
+            else:
+                find_msg = {'t': 'scan'}
+                scan_cipher = GenericCipher()
+                pack = await self._exchange(find_msg, 'scan', scan_cipher)
+                self._device_mac = pack['mac']
+                self._mac_hint = self._device_mac
+                self._model = pack.get('mid') or pack.get('model') or self._model
+                scan_version = scan_cipher.version
+
+            # Step 2: Binding, detecting the protocol version unless it is known
+            if known_version:
+                versions = [known_version]
+            else:
+                # Starting with the version the scan reply used
+                versions = sorted(CIPHERS, key=lambda version: version != scan_version)
+            pack = await self._bind(versions)
             self._device_key = pack['key']
-            self._device_cipher = AES.new(self._device_key.encode('utf-8'), AES.MODE_ECB)
+            self._device_cipher = device_cipher(self._cipher_version, self._device_key)
+
+            # The session only counts as bound once the probe is done too
+            if self._supported_cols is None:
+                await self._probe_capabilities()
             self._is_bound = True
 
-            _LOGGER.debug("Successfully established connection and binding to device %s",
-                          self._device_mac)
+            _LOGGER.debug("Successfully established connection and binding to device %s (%s)",
+                          self._device_mac, self._cipher_version)
 
+        except asyncio.CancelledError:
+            # Cut short by a caller's deadline, leave no half-bound session behind and
+            # keep the MAC and protocol known before this attempt for the next one
+            self._close_connection()
+            self._device_mac, self._cipher_version = previous
+            raise
         except Exception as e:
             _LOGGER.error("Failed to setup connection: %s", e)
             self._close_connection()
             raise
 
+    async def _bind(self, versions: List[str]) -> Dict[str, Any]:
+        """Bind with the first protocol version in versions the device answers."""
+        bind_pack = {'t': 'bind', 'uid': 0, 'mac': self._device_mac}
+        for attempt in versions:
+            cipher = generic_cipher(attempt)
+            bind_msg = {
+                'cid': 'app', 'i': 1, 't': 'pack', 'uid': 0,
+                'tcid': self._device_mac,
+                **cipher.encrypt(bind_pack)
+            }
+            try:
+                pack = await self._exchange(bind_msg, 'bind', cipher)
+            except Exception as e: # pylint: disable=broad-except
+                if attempt == versions[-1]:
+                    raise
+                _LOGGER.debug("No %s bind reply from %s (%s), trying the next protocol",
+                              attempt, self._device_mac, e)
+                continue
+            self._cipher_version = attempt
+            return pack
+
+    async def _probe_capabilities(self) -> None:
+        """Find out once which columns this model answers with meaningful values."""
+        if self._model and self._model in self._capabilities:
+            self._supported_cols = list(self._capabilities[self._model])
+            _LOGGER.debug("Using cached capabilities of model %s", self._model)
+            return
+
+        try:
+            values = await self._status_exchange(KNOWN_COLS)
+            supported = [col for col in KNOWN_COLS if values.get(col) not in (None, '')]
+        except Exception as e: # pylint: disable=broad-except
+            # Not fatal, every column is requested until a later bind probes successfully
+            _LOGGER.warning("Failed to probe capabilities of device %s: %s", self._device_mac, e)
+            return
+
+        self._supported_cols = supported
+        if self._model:
+            self._capabilities[self._model] = supported
+        _LOGGER.debug("Device %s supports columns: %s", self._device_mac, supported)
+
+    def supports(self, col: str) -> bool:
+        """Return False only for columns the capability probe found unsupported.
+
+        The probe only asks for KNOWN_COLS, any other column is passed through.
+        """
+        return self._supported_cols is None or col in self._supported_cols or col not in KNOWN_COLS
+
+    def _supported(self, cols: List[str]) -> List[str]:
+        """Filter cols down to the supported ones."""
+        return [col for col in cols if self.supports(col)]
+
+    @property
+    def binding(self) -> Dict[str, Any]:
+        """Return the binding data worth persisting across restarts."""
+        return {
+            "mac": self.mac,
+            "model": self._model,
+            "columns": self._supported_cols,
+            "cipher": self._cipher_version,
+        }
+
+    def restore_binding(self, binding: Dict[str, Any]) -> None:
+        """Seed binding data persisted by a previous run."""
+        self._mac_hint = self._mac_hint or binding.get("mac")
+        self._model = binding.get("model")
+        self._supported_cols = binding.get("columns")
+        if binding.get("cipher") in CIPHERS:
+            self._cipher_version = binding["cipher"]
+        if self._model and self._supported_cols is not None:
+            self._capabilities.setdefault(self._model, self._supported_cols)
+
     async def async_update(self) -> Dict[str, Any]:
         """Update data from heat pump with graceful rebinding."""
         try:
             data = await self._get_status()
             if data:
+                self._consecutive_failures = 0
                 self._data = data
                 self._last_successful_data = data.copy()
+                self._mark_confirmed(data)
                 self._retry_count = 0
                 self._is_rebinding = False
+                if self._pending_commands:
+                    await self._flush_pending_commands()
                 return self._data
             else:
+                self._consecutive_failures += 1
                 if self._is_rebinding and self._retry_count < self._max_retries:
                     _LOGGER.warning("Rebinding in progress, using cached data")
                     return self._last_successful_data
@@ -121,81 +315,185 @@ class GreeHeatPump:
                     return self._data
         except Exception as e: # pylint: disable=broad-except
             _LOGGER.error("Failed to update heat pump data: %s", e)
+            self._consecutive_failures += 1
             if self._is_rebinding and self._retry_count < self._max_retries:
                 return self._last_successful_data
             return self._data
 
-    async def _get_status(self) -> Optional[Dict[str, Any]]:
-        """Get current status with graceful rebinding."""
-        for attempt in range(self._max_retries):
-            try:
-                if not await self._ensure_connection():
-                    self._is_rebinding = True
-                    self._retry_count = attempt + 1
-                    if attempt < self._max_retries - 1:
-                        backoff_time = min(2 ** attempt, 10)
-                        _LOGGER.debug("Waiting %d seconds before retry", backoff_time)
-                        await asyncio.sleep(backoff_time)
-                    continue
-
-                loop = asyncio.get_event_loop()
-
-                # Get status using cached connection
-                status_pack = {
-                    'mac': self._device_mac, 't': 'status',
-                    'cols': ['Pow', 'Mod', 'CoWatOutTemSet', 'HeWatOutTemSet', 'WatBoxTemSet',
-                            'AllInWatTemHi', 'AllInWatTemLo', 'AllOutWatTemHi', 'AllOutWatTemLo',
-                            'WatBoxTemHi', 'WatBoxTemLo']
-                }
-                status_msg = {
-                    'cid': 'app', 'i': 0, 't': 'pack', 'uid': 0,
-                    'tcid': self._device_mac,
-                    'pack': self._enc_msg(status_pack, self._device_cipher)
-                }
-                await loop.run_in_executor(None, self._send_msg, self._sock, status_msg)
-                response = await loop.run_in_executor(None, self._receive_msg, self._sock)
-                pack = self._parse_msg(response['pack'], self._device_cipher)
-
-                # Convert list response to dict
-                if isinstance(pack.get('dat'), list):
-                    cols = ['Pow', 'Mod', 'CoWatOutTemSet', 'HeWatOutTemSet', 'WatBoxTemSet',
-                           'AllInWatTemHi', 'AllInWatTemLo', 'AllOutWatTemHi', 'AllOutWatTemLo',
-                           'WatBoxTemHi', 'WatBoxTemLo']
-                    dat_dict = {}
-                    for i, col in enumerate(cols):
-                        if i < len(pack['dat']):
-                            dat_dict[col] = pack['dat'][i]
-                    self._is_rebinding = False
-                    self._retry_count = 0
-                    return dat_dict
+    async def async_keepalive(self, idle: float) -> bool:
+        """Probe the session with a minimal status request once nothing was heard for idle seconds.
 
-                self._is_rebinding = False
-                self._retry_count = 0
-                return pack.get('dat', {})
+        A failed probe climbs the recovery ladder, so an expired key or a rebooted
+        device is bound again before the next command needs the session.
+        """
+        if self._is_bound and time.monotonic() - self._last_heard < idle:
+            return True
+
+        self._keepalives += 1
+        values = await self._with_recovery('status', lambda: self._status_exchange(KEEPALIVE_COLS))
+        if values is None:
+            self._keepalive_failures += 1
+            return False
+        self._mark_confirmed(values)
+        if self._pending_commands:
+            await self._flush_pending_commands()
+        return True
+
+    async def async_query(self, cols: List[str], max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Return the values of arbitrary columns, served from cache while within their TTL.
+
+        max_age replaces the TTLs, 0 always asks the device. Raises DeviceOfflineError
+        if expired columns could not be fetched, instead of serving them stale.
+        """
+        now = time.monotonic()
+
+        def expired(col: str) -> bool:
+            ttl = QUERY_TTL.get(col, DEFAULT_QUERY_TTL) if max_age is None else max_age
+            return col not in self._field_cache or now - self._confirmed_at[col] >= ttl
+
+        missing = [col for col in self._supported(cols) if expired(col)]
+        if missing:
+            await self._fetch_coalesced(missing)
+
+        return {col: self._field_cache[col] for col in cols if col in self._field_cache}
+
+    async def _fetch_coalesced(self, cols: List[str]) -> None:
+        """Fetch cols in the status exchange shared by every query issued in the same loop turn."""
+        self._query_cols.update(cols)
+        if self._query_future is None:
+            self._query_future = asyncio.get_running_loop().create_future()
+            asyncio.get_running_loop().create_task(self._run_query_batch(self._query_future))
+        await asyncio.shield(self._query_future)
+
+    async def _run_query_batch(self, future: asyncio.Future) -> None:
+        """Run one status exchange for all columns queued so far."""
+        # Let every query issued alongside this one join the batch
+        await asyncio.sleep(0)
+        cols = sorted(self._query_cols)
+        self._query_cols = set()
+        self._query_future = None
+
+        data = None
+        try:
+            data = await self._get_status(cols)
+        finally:
+            # Every query waiting on the batch fails with it
+            if data is None:
+                future.set_exception(DeviceOfflineError(
+                    f"Heat pump {self._host} did not answer the status request for {', '.join(cols)}"
+                ))
+            else:
+                self._mark_confirmed(data)
+                future.set_result(None)
 
+    async def _get_status(self, cols: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Get current status with graceful rebinding."""
+        # Supported columns are only known once bound, so they are resolved per attempt
+        return await self._with_recovery(
+            'status', lambda: self._status_exchange(self._supported(cols or STATUS_COLS))
+        )
+
+    async def _with_recovery(self, operation: str, run: Callable[[], Awaitable[Any]]) -> Any:
+        """Run an exchange on the session, climbing the recovery ladder while it fails.
+
+        Lost datagrams are retransmitted within the exchange. If the device still does
+        not answer, or its reply fails to decrypt, the next attempt binds again with the
+        known MAC, and only the last one scans the address first. Returns None if every
+        step failed.
+        """
+        for attempt, step in enumerate(RECOVERY_STEPS):
+            self._retransmitted = False
+            try:
+                if not await self._ensure_connection(rescan=step == 'scan'):
+                    raise ConnectionError("binding failed")
+                result = await run()
             except Exception as e: # pylint: disable=broad-except
-                _LOGGER.error("Failed to get status (attempt %d/%d): %s",
+                _LOGGER.error("Failed %s exchange (attempt %d/%d): %s",
+                              operation,
                               attempt + 1,
                               self._max_retries, e)
                 self._is_rebinding = True
                 self._retry_count = attempt + 1
-
-                if attempt == self._max_retries - 1:
-                    self._close_connection()
-                    return None
-                else:
-                    self._partial_reset()
-                    backoff_time = min(2 ** attempt, 10)
-                    _LOGGER.debug("Waiting %d seconds before retry", backoff_time)
-                    await asyncio.sleep(backoff_time)
-
+                self._partial_reset()
+                if attempt < self._max_retries - 1:
+                    await self._backoff(operation, attempt)
+                continue
+
+            if attempt or self._retransmitted:
+                self._recoveries[step] += 1
+                _LOGGER.debug("Recovered %s exchange by %s", operation, step)
+            self._is_rebinding = False
+            self._retry_count = 0
+            self._is_offline = False
+            return result
+
+        self._recoveries['failed'] += 1
+        self._is_offline = True
+        self._close_connection()
         return None
 
-    async def async_set_power(self, power_on: bool) -> bool:
+    async def _status_exchange(self, cols: List[str]) -> Dict[str, Any]:
+        """Request cols in as many pipelined status requests as their replies need and merge them."""
+        chunks = {tuple(chunk): chunk for chunk in self._split_cols(cols)}
+        msgs = {}
+        for key, chunk in chunks.items():
+            status_pack = {
+                'mac': self._device_mac, 't': 'status',
+                'cols': chunk
+            }
+            msgs[key] = {
+                'cid': 'app', 'i': 0, 't': 'pack', 'uid': 0,
+                'tcid': self._device_mac,
+                **self._device_cipher.encrypt(status_pack)
+            }
+
+        def reply_key(pack: Dict[str, Any], outstanding: List[Any]) -> Any:
+            # Replies echo their columns, possibly reordered or only some of them, so the
+            # request sharing the most columns wins, falling back to request order
+            echoed = set(pack.get('cols') or ())
+            key = max(chunks, key=lambda chunk: (len(echoed.intersection(chunk)), chunk in outstanding))
+            if echoed.intersection(key):
+                return key
+            return outstanding[0]
+
+        packs = await self._exchange_pipelined(msgs, 'status', self._device_cipher, reply_key)
+
+        # Only merge once every chunk has answered
+        values = {}
+        for key, pack in packs.items():
+            # Values follow the echoed columns when there is one for each
+            echoed = pack.get('cols')
+            cols = echoed if echoed and len(echoed) == len(pack.get('dat') or ()) else chunks[key]
+            values.update(self._pack_values(pack, cols))
+        return values
+
+    @staticmethod
+    def _estimate_reply_size(cols: List[str], overhead: int = 0) -> int:
+        """Estimate the datagram size of a status reply carrying cols and overhead extra bytes."""
+        # {"t": "dat", "mac": "...", "r": 200, "cols": [...], "dat": [...]}, erring on the
+        # large side with separators and values of up to 5 characters
+        inner = 80 + sum(len(col) + 4 + 7 for col in cols)
+        encrypted = (inner // BLOCK_SIZE + 1) * BLOCK_SIZE
+        # Base64 of the encrypted pack inside the outer envelope
+        return 96 + overhead + 4 * ((encrypted + 2) // 3)
+
+    def _split_cols(self, cols: List[str]) -> List[List[str]]:
+        """Split cols so that every status reply fits in MAX_REPLY_SIZE."""
+        chunks: List[List[str]] = [[]]
+        overhead = self._device_cipher.overhead if self._device_cipher else 0
+        for col in cols:
+            if chunks[-1] and self._estimate_reply_size(chunks[-1] + [col], overhead) > MAX_REPLY_SIZE:
+                chunks.append([])
+            chunks[-1].append(col)
+        return chunks
+
+    async def async_set_power(self, power_on: bool, force: bool = False,
+                              deadline: float = COMMAND_DEADLINE) -> bool:
         """Set power state."""
-        return await self._send_command('Pow', 1 if power_on else 0)
+        return await self._send_command('Pow', 1 if power_on else 0, force, deadline)
 
-    async def async_set_temperature(self, temp_type: str, temperature: int) -> bool:
+    async def async_set_temperature(self, temp_type: str, temperature: int, force: bool = False,
+                                    deadline: float = COMMAND_DEADLINE) -> bool:
         """Set temperature for specified type."""
         temp_mapping = {
             'cold': 'CoWatOutTemSet',
@@ -207,117 +505,395 @@ class GreeHeatPump:
             _LOGGER.error("Invalid temperature type: %s", temp_type)
             return False
 
-        return await self._send_command(temp_mapping[temp_type], temperature)
+        return await self._send_command(temp_mapping[temp_type], temperature, force, deadline)
 
-    async def async_set_mode(self, mode: int) -> bool:
+    async def async_set_mode(self, mode: int, force: bool = False,
+                             deadline: float = COMMAND_DEADLINE) -> bool:
         """Set operating mode."""
-        return await self._send_command('Mod', mode)
-
-    async def _send_command(self, param: str, value: int) -> bool:
-        """Send command to heat pump with graceful rebinding."""
-        for attempt in range(self._max_retries):
-            try:
-                if not await self._ensure_connection():
-                    self._is_rebinding = True
-                    self._retry_count = attempt + 1
-                    if attempt < self._max_retries - 1:
-                        backoff_time = min(2 ** attempt, 10)
-                        _LOGGER.debug("Waiting %d seconds before retry", backoff_time)
-                        await asyncio.sleep(backoff_time)
-                    continue
-
-                loop = asyncio.get_event_loop()
-
-                # Send command using cached connection
-                cmd_pack = {
-                    'mac': self._device_mac, 't': 'cmd',
-                    'opt': [param], 'p': [value]
-                }
-                cmd_msg = {
-                    'cid': 'app', 'i': 0, 't': 'pack', 'uid': 0,
-                    'tcid': self._device_mac,
-                    'pack': self._enc_msg(cmd_pack, self._device_cipher)
-                }
-                await loop.run_in_executor(None, self._send_msg, self._sock, cmd_msg)
-                response = await loop.run_in_executor(None, self._receive_msg, self._sock)
-
-                # Parse response and update data immediately
-                pack = self._parse_msg(response['pack'], self._device_cipher)
-                if pack.get('t') in ('res', 'dat') and pack.get('r') == 200:
-                    # Update data with actual values returned by heat pump
-                    if 'opt' in pack and 'val' in pack:
-                        for i, opt in enumerate(pack['opt']):
-                            if i < len(pack['val']):
-                                self._data[opt] = pack['val'][i]
-                                # Also update last successful data cache
-                                self._last_successful_data[opt] = pack['val'][i]
-                                _LOGGER.debug("Updated %s to %s from command response", opt, pack['val'][i])
-                    _LOGGER.debug("Command %s=%s sent successfully, response: %s", param, value, pack)
-                else:
-                    _LOGGER.warning("Unexpected response format: %s", pack)
+        return await self._send_command('Mod', mode, force, deadline)
 
-                self._is_rebinding = False
-                self._retry_count = 0
-                return True
+    async def async_set_flag(self, flag: str, enabled: bool, force: bool = False,
+                             deadline: float = COMMAND_DEADLINE) -> bool:
+        """Turn one of the on/off control flags, such as Quiet or LefHom, on or off."""
+        if flag not in CONTROL_FLAGS:
+            _LOGGER.error("Invalid control flag: %s", flag)
+            return False
 
-            except Exception as e: # pylint: disable=broad-except
-                _LOGGER.error("Failed to send command %s=%s (attempt %d/%d): %s",
-                              param,
-                              value,
-                              attempt + 1,
-                              self._max_retries, e)
-                self._is_rebinding = True
-                self._retry_count = attempt + 1
+        return await self._send_command(flag, 1 if enabled else 0, force, deadline)
+
+    async def async_set_values(self, values: Dict[str, int], force: bool = False,
+                               deadline: float = COMMAND_DEADLINE) -> bool:
+        """Set several columns at once in a single multi-parameter cmd packet."""
+        if not force:
+            confirmed = self.recently_confirmed(values)
+            self._commands_skipped += len(confirmed)
+            values = {param: value for param, value in values.items() if param not in confirmed}
+        if not values:
+            return True
+
+        return await self._send_commands(values, deadline)
+
+    def recently_confirmed(self, values: Dict[str, int]) -> Dict[str, int]:
+        """Return the values the device recently confirmed it already holds, which are not sent again."""
+        return {param: value for param, value in values.items() if self._is_confirmed(param, value)}
+
+    def confirmed_since(self, cols: List[str], since: float) -> Dict[str, Any]:
+        """Return the values of cols the device reported at or after the monotonic time since."""
+        return {
+            col: self._field_cache[col] for col in cols
+            if self._confirmed_at.get(col, float('-inf')) >= since
+        }
 
-                if attempt == self._max_retries - 1:
-                    self._close_connection()
-                    return False
-                else:
-                    self._partial_reset()
-                    backoff_time = min(2 ** attempt, 10)
-                    _LOGGER.debug("Waiting %d seconds before retry", backoff_time)
-                    await asyncio.sleep(backoff_time)
+    def _is_confirmed(self, param: str, value: int) -> bool:
+        """Return True if the device recently confirmed param already holds value."""
+        confirmed_at = self._confirmed_at.get(param)
+        return (confirmed_at is not None
+                and self._field_cache.get(param) == value
+                and time.monotonic() - confirmed_at <= WRITE_CACHE_WINDOW)
+
+    def _mark_confirmed(self, values: Dict[str, Any]) -> None:
+        """Record that the device just reported values."""
+        now = time.monotonic()
+        for param, value in values.items():
+            self._field_cache[param] = value
+            self._confirmed_at[param] = now
+        for sample_listener in self._sample_listeners:
+            sample_listener(values)
+
+    async def _send_command(self, param: str, value: int, force: bool = False,
+                            deadline: float = COMMAND_DEADLINE) -> bool:
+        """Send a command in the packet shared by every command issued within the batch window.
+
+        Raises DeviceOfflineError if the device is known to be down or does not confirm
+        in time, unless queue_commands is set, in which case the command is kept for
+        when the device is back and False is returned.
+        """
+        if not force and self._is_confirmed(param, value):
+            self._commands_skipped += 1
+            _LOGGER.debug("Skipping command %s=%s, device already confirmed it", param, value)
+            return True
+
+        self._batch_values[param] = value
+        self._batch_deadline = min(self._batch_deadline, deadline)
+        if self._batch_future is None:
+            self._batch_future = asyncio.get_running_loop().create_future()
+            asyncio.get_running_loop().create_task(self._run_command_batch(self._batch_future))
+        return await asyncio.shield(self._batch_future)
+
+    async def _run_command_batch(self, future: asyncio.Future) -> None:
+        """Send every command queued during the batch window in one multi-parameter packet."""
+        # Let commands issued alongside this one, such as a scene's, join the packet
+        await asyncio.sleep(COMMAND_BATCH_WINDOW)
+        values, self._batch_values = self._batch_values, {}
+        deadline, self._batch_deadline = self._batch_deadline, COMMAND_DEADLINE
+        self._batch_future = None
 
-        return False
+        try:
+            future.set_result(await self._send_commands(values, deadline))
+        except Exception as e: # pylint: disable=broad-except
+            future.set_exception(e)
 
-    def _parse_msg(self, msg: str, cipher) -> Dict[str, Any]:
-        """Parse encrypted message from device."""
-        decoded_pack64 = base64.b64decode(msg)
-        decrypted_pack = unpad(cipher.decrypt(decoded_pack64), BLOCK_SIZE)
-        return json.loads(decrypted_pack)
+    async def _send_commands(self, values: Dict[str, int], deadline: float = COMMAND_DEADLINE) -> bool:
+        """Send values in one cmd packet with graceful rebinding, giving up after deadline seconds."""
+        # Don't wait on a recovery the last poll already saw fail
+        if self._is_offline:
+            return self._refuse_commands(values, "is offline")
 
-    def _enc_msg(self, msg: Dict[str, Any], cipher) -> str:
-        """Encrypt message to send to device."""
-        b_msg = json.dumps(msg).encode('utf-8')
-        encoded_pack = cipher.encrypt(pad(b_msg, BLOCK_SIZE))
-        return base64.b64encode(encoded_pack).decode()
+        self._commands_sent += 1
+        self._fields_sent += len(values)
+        try:
+            result = await asyncio.wait_for(
+                self._with_recovery('cmd', lambda: self._command_exchange(values)), deadline
+            )
+        except asyncio.TimeoutError:
+            return self._refuse_commands(values, f"did not answer within {deadline:g} seconds")
+        if result is None:
+            return self._refuse_commands(values, "did not answer")
+        return True
+
+    def _refuse_commands(self, values: Dict[str, int], reason: str) -> bool:
+        """Queue commands that could not be delivered, or raise if queueing is off."""
+        described = ", ".join(f"{param}={value}" for param, value in values.items())
+        if not self.queue_commands:
+            raise DeviceOfflineError(f"Heat pump {self._host} {reason}, {described} was not applied")
+        self._pending_commands.update(values)
+        _LOGGER.info("Heat pump %s %s, %s will be applied once it is back",
+                     self._host, reason, described)
+        return False
 
-    def _send_msg(self, sock, msg: Dict[str, Any]) -> None:
+    async def _flush_pending_commands(self) -> None:
+        """Send the last value requested for each field while the device was offline."""
+        pending, self._pending_commands = self._pending_commands, {}
+        _LOGGER.info("Applying %s queued while heat pump %s was offline", pending, self._host)
+        try:
+            await self._send_commands(pending)
+        except DeviceOfflineError as e:
+            _LOGGER.warning("Dropping queued commands: %s", e)
+
+    async def _command_exchange(self, values: Dict[str, int]) -> bool:
+        """Send one cmd packet on the bound session and apply the values it confirms."""
+        cmd_pack = {
+            'mac': self._device_mac, 't': 'cmd',
+            'opt': list(values), 'p': list(values.values())
+        }
+        cmd_msg = {
+            'cid': 'app', 'i': 0, 't': 'pack', 'uid': 0,
+            'tcid': self._device_mac,
+            **self._device_cipher.encrypt(cmd_pack)
+        }
+        pack = await self._exchange(cmd_msg, 'cmd', self._device_cipher)
+
+        # Update data immediately from the response
+        if pack.get('t') in ('res', 'dat') and pack.get('r') == 200:
+            # Update data with actual values returned by heat pump
+            if 'opt' in pack and 'val' in pack:
+                for i, opt in enumerate(pack['opt']):
+                    if i < len(pack['val']):
+                        self._data[opt] = pack['val'][i]
+                        # Also update last successful data cache
+                        self._last_successful_data[opt] = pack['val'][i]
+                        self._mark_confirmed({opt: pack['val'][i]})
+                        _LOGGER.debug("Updated %s to %s from command response", opt, pack['val'][i])
+            _LOGGER.debug("Command %s sent successfully, response: %s", values, pack)
+        else:
+            _LOGGER.warning("Unexpected response format: %s", pack)
+        return True
+
+    def _pack_values(self, pack: Dict[str, Any], cols: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Extract field values from a decrypted 'dat' or 'res' pack."""
+        dat = pack.get('dat')
+        if isinstance(dat, list):
+            # Convert list response to dict, preferring the columns we asked for
+            cols = cols or pack.get('cols', [])
+            dat_dict = {}
+            for i, col in enumerate(cols):
+                if i < len(dat):
+                    dat_dict[col] = dat[i]
+            return dat_dict
+        if isinstance(dat, dict):
+            return dat
+
+        values = {}
+        if 'opt' in pack and 'val' in pack:
+            for i, opt in enumerate(pack['opt']):
+                if i < len(pack['val']):
+                    values[opt] = pack['val'][i]
+        return values
+
+    async def _exchange(self, msg: Dict[str, Any], operation: str, cipher) -> Dict[str, Any]:
+        """Send message to device, retransmitting on the adaptive timeout, and return the reply pack."""
+        packs = await self._exchange_pipelined({None: msg}, operation, cipher, lambda pack, outstanding: None)
+        return packs[None]
+
+    async def _exchange_pipelined(self, msgs: Dict[Any, Dict[str, Any]], operation: str, cipher,
+                                  reply_key: Callable[[Dict[str, Any], List[Any]], Any]) -> Dict[Any, Dict[str, Any]]:
+        """Send several messages back to back and collect the reply pack of each one.
+
+        reply_key maps a reply pack to the key of the message it answers. Unanswered
+        messages are retransmitted on the adaptive timeout.
+        """
+        estimator = self._rtt[operation]
+        loop = asyncio.get_running_loop()
+        replies: Dict[Any, Dict[str, Any]] = {}
+
+        # The device's own lock first, so waiting for it does not hold a global slot
+        async with self._exchange_lock, self._listener.exchange_slots:
+            self._inbox = asyncio.Queue()
+            try:
+                for transmission in range(MAX_RETRANSMITS + 1):
+                    outstanding = [key for key in msgs if key not in replies]
+                    sent_at = loop.time()
+                    for key in outstanding:
+                        self._send_msg(msgs[key])
+                    try:
+                        while outstanding:
+                            pack = await self._receive_reply(operation, cipher, sent_at + estimator.rto)
+                            key = reply_key(pack, outstanding)
+                            if key not in outstanding:
+                                self._apply_pack(pack)
+                                continue
+                            # Karn's algorithm: only replies to a first transmission give
+                            # unambiguous samples, and only the first of a burst is not queued
+                            if transmission == 0 and not replies:
+                                estimator.sample(loop.time() - sent_at)
+                            outstanding.remove(key)
+                            replies[key] = pack
+                        if transmission:
+                            self._retransmitted = True
+                        self._last_heard = time.monotonic()
+                        return replies
+                    except asyncio.TimeoutError:
+                        estimator.backoff()
+                        _LOGGER.debug("%d %s replies missing (transmission %d/%d), next timeout %.3fs",
+                                      len(outstanding), operation, transmission + 1,
+                                      MAX_RETRANSMITS + 1, estimator.rto)
+            finally:
+                inbox, self._inbox = self._inbox, None
+                # Whatever arrived after the last reply is handled as unsolicited
+                while not inbox.empty():
+                    self._ingest(inbox.get_nowait())
+
+        raise asyncio.TimeoutError(f"No {operation} reply after {MAX_RETRANSMITS + 1} transmissions")
+
+    async def _receive_reply(self, operation: str, cipher, deadline: float) -> Dict[str, Any]:
+        """Wait until deadline for the reply pack matching operation."""
+        loop = asyncio.get_running_loop()
+        while True:
+            msg = await self._receive_msg(max(deadline - loop.time(), 0))
+            if msg.get('i') == 1 and operation in DEVICE_KEY_OPERATIONS:
+                # Under the generic key, such as the answer to another client's scan
+                _LOGGER.debug("Ignoring generic pack while waiting for %s reply", operation)
+                continue
+            pack = cipher.decrypt(msg)
+            if pack.get('t') == REPLY_TYPES[operation]:
+                return pack
+
+            # Late duplicates of earlier replies must not answer this exchange
+            _LOGGER.debug("Ignoring %s pack while waiting for %s reply", pack.get('t'), operation)
+            self._apply_pack(pack)
+
+    async def _backoff(self, operation: str, attempt: int) -> None:
+        """Wait before a retry, scaled from the operation's measured timeout."""
+        backoff_time = min(self._rtt[operation].rto * 2 ** attempt, MAX_RTO)
+        _LOGGER.debug("Waiting %.3f seconds before retry", backoff_time)
+        await asyncio.sleep(backoff_time)
+
+    def _send_msg(self, msg: Dict[str, Any]) -> None:
         """Send message to device."""
         b_msg = json.dumps(msg).encode('utf-8')
-        sock.sendto(b_msg, (self._host, DEFAULT_PORT))
+        self._listener.sendto(b_msg, self._host)
+
+    async def _receive_msg(self, timeout: float) -> Dict[str, Any]:
+        """Wait for the next message from device."""
+        return await asyncio.wait_for(self._inbox.get(), timeout)
+
+    def handle_datagram(self, msg: Dict[str, Any]) -> None:
+        """Handle a datagram routed here by the listener."""
+        # A running exchange takes every datagram from this device
+        if self._inbox is not None:
+            self._inbox.put_nowait(msg)
+            return
+
+        self._ingest(msg)
+
+    def _ingest(self, msg: Dict[str, Any]) -> None:
+        """Update state from an unsolicited datagram sent by the device."""
+        if not self._is_bound or msg.get('cid') != self._device_mac or 'pack' not in msg:
+            _LOGGER.debug("Ignoring unsolicited datagram not addressed from %s", self._device_mac)
+            return
+
+        try:
+            pack = self._device_cipher.decrypt(msg)
+        except Exception: # pylint: disable=broad-except
+            _LOGGER.debug("Ignoring unsolicited datagram that failed to decrypt")
+            return
+
+        self._last_heard = time.monotonic()
+        self._apply_pack(pack)
+
+    def _apply_pack(self, pack: Dict[str, Any]) -> None:
+        """Merge the values of a decrypted pack that did not answer an exchange."""
+        if pack.get('t') not in ('dat', 'res') or pack.get('mac', self._device_mac) != self._device_mac:
+            return
+
+        values = self._pack_values(pack)
+        if not values:
+            return
 
-    def _receive_msg(self, sock) -> Dict[str, Any]:
-        """Receive message from device."""
-        data = sock.recvfrom(1024)[0]
-        return json.loads(data)
+        _LOGGER.debug("Ingested unsolicited %s pack: %s", pack['t'], values)
+        self._data = {**self._data, **values}
+        self._last_successful_data.update(values)
+        self._mark_confirmed(values)
+        for update_listener in self._update_listeners:
+            update_listener(self._data)
+
+    def add_update_listener(self, update_listener: Callable[[Dict[str, Any]], None]) -> Callable[[], None]:
+        """Call update_listener with the merged data whenever the device pushes values."""
+        self._update_listeners.append(update_listener)
+
+        def remove_listener() -> None:
+            self._update_listeners.remove(update_listener)
+
+        return remove_listener
+
+    def add_sample_listener(self, sample_listener: Callable[[Dict[str, Any]], None]) -> Callable[[], None]:
+        """Call sample_listener with the values of every decoded poll, reply or push."""
+        self._sample_listeners.append(sample_listener)
+
+        def remove_listener() -> None:
+            self._sample_listeners.remove(sample_listener)
+
+        return remove_listener
 
     def _partial_reset(self):
         """Reset connection state but preserve data for rebinding."""
-        if self._sock:
-            try:
-                self._sock.close()
-            except Exception: # pylint: disable=broad-except
-                pass
-            self._sock = None
         self._device_cipher = None
         self._is_bound = False
 
+    def relocate(self, host: str) -> None:
+        """Point the connection at the device's new address."""
+        _LOGGER.info("Device %s moved from %s to %s", self.mac, self._host, host)
+        if self._listener:
+            self._listener.unregister(self)
+        self._host = host
+        if self._listener:
+            self._listener.register(self)
+        self._consecutive_failures = 0
+
+    @property
+    def host(self) -> str:
+        """Return the device address."""
+        return self._host
+
+    @property
+    def mac(self) -> Optional[str]:
+        """Return the device MAC, known from binding or configuration."""
+        return self._device_mac or self._mac_hint
+
+    @property
+    def consecutive_failures(self) -> int:
+        """Return the number of polls that failed in a row."""
+        return self._consecutive_failures
+
     @property
     def data(self) -> Dict[str, Any]:
         """Get current data."""
         return self._data
 
+    @property
+    def rtt_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return round-trip statistics per operation."""
+        return {operation: estimator.stats() for operation, estimator in self._rtt.items()}
+
+    @property
+    def command_stats(self) -> Dict[str, int]:
+        """Return how many cmd packets and fields were sent, and how many writes were skipped as redundant."""
+        return {
+            "sent": self._commands_sent,
+            "fields": self._fields_sent,
+            "skipped": self._commands_skipped,
+        }
+
+    @property
+    def is_offline(self) -> bool:
+        """Return True if the last exchange failed every recovery step."""
+        return self._is_offline
+
+    @property
+    def pending_commands(self) -> Dict[str, int]:
+        """Return the commands queued until the device is back."""
+        return dict(self._pending_commands)
+
+    @property
+    def keepalive_stats(self) -> Dict[str, int]:
+        """Return how many keepalive probes were sent and how many failed."""
+        return {"probes": self._keepalives, "failed": self._keepalive_failures}
+
+    @property
+    def recovery_stats(self) -> Dict[str, int]:
+        """Return how many failed exchanges each recovery step fixed, and how many none did."""
+        return dict(self._recoveries)
+
     @property
     def is_rebinding(self) -> bool:
         """Return True if currently rebinding."""
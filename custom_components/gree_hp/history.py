@@ -0,0 +1,250 @@
+"""Local high-resolution history store for Gree Heat Pump telemetry."""
+import asyncio
+from datetime import datetime, timedelta
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import (
+    DEFAULT_HISTORY_HOUR_RETENTION,
+    DEFAULT_HISTORY_MINUTE_RETENTION,
+    DEFAULT_HISTORY_RAW_RETENTION,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Rollup resolutions in seconds
+RESOLUTIONS = {"minute": 60, "hour": 3600}
+# Seconds between batch writes of buffered samples
+FLUSH_INTERVAL = 10
+# Seconds between retention sweeps
+PRUNE_INTERVAL = 3600
+# Seconds of data kept for entries no longer recording, such as ones with history turned off
+DEFAULT_RETENTION = {
+    "raw": DEFAULT_HISTORY_RAW_RETENTION * 3600,
+    "minute": DEFAULT_HISTORY_MINUTE_RETENTION * 86400,
+    "hour": DEFAULT_HISTORY_HOUR_RETENTION * 86400,
+}
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS raw (
+        entry_id TEXT NOT NULL,
+        ts REAL NOT NULL,
+        field TEXT NOT NULL,
+        value REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS raw_lookup ON raw (entry_id, ts)",
+    """CREATE TABLE IF NOT EXISTS rollup (
+        entry_id TEXT NOT NULL,
+        resolution INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        field TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        sum REAL NOT NULL,
+        min REAL NOT NULL,
+        max REAL NOT NULL,
+        PRIMARY KEY (entry_id, resolution, bucket, field)
+    )""",
+]
+
+# Merge a batch aggregate into the stored one, so rollups never rescan raw samples
+UPSERT_ROLLUP = """
+    INSERT INTO rollup (entry_id, resolution, bucket, field, count, sum, min, max)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (entry_id, resolution, bucket, field) DO UPDATE SET
+        count = count + excluded.count,
+        sum = sum + excluded.sum,
+        min = MIN(min, excluded.min),
+        max = MAX(max, excluded.max)
+"""
+
+class GreeHistory:
+    """Buffer samples in memory and write them to SQLite in append-only batches.
+
+    Every batch also updates the 1-minute and 1-hour rollups, and each table is
+    pruned to the retention configured for its entry, or to the default retention
+    for data of entries no longer recording.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str):
+        """Initialize the store."""
+        self._hass = hass
+        self._path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._buffer: List[Tuple[str, float, str, float]] = []
+        self._retention: Dict[str, Dict[str, float]] = {}
+        self._lock = asyncio.Lock()
+        self._cancel_flush = None
+        self._last_prune = 0.0
+
+    async def async_setup(self) -> None:
+        """Open the database and start the batch writer."""
+        self._connection = await self._hass.async_add_executor_job(self._open)
+        self._cancel_flush = async_track_time_interval(
+            self._hass, self._async_flush_timer, timedelta(seconds=FLUSH_INTERVAL),
+            name="gree_hp history flush",
+        )
+
+    def _open(self) -> sqlite3.Connection:
+        """Create the database and its tables."""
+        connection = sqlite3.connect(self._path, check_same_thread=False)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.commit()
+        return connection
+
+    async def async_close(self) -> None:
+        """Write what is buffered and close the database."""
+        if self._cancel_flush:
+            self._cancel_flush()
+            self._cancel_flush = None
+        await self.async_flush()
+        async with self._lock:
+            if self._connection is not None:
+                await self._hass.async_add_executor_job(self._connection.close)
+                self._connection = None
+
+    @callback
+    def async_set_retention(self, entry_id: str, retention: Dict[str, float]) -> None:
+        """Set how many seconds of raw, minute and hour data to keep for an entry."""
+        self._retention[entry_id] = retention
+
+    @callback
+    def async_remove_entry(self, entry_id: str) -> None:
+        """Stop recording an entry, its stored data is kept until pruned by the default retention."""
+        self._retention.pop(entry_id, None)
+
+    async def async_delete_entry(self, entry_id: str) -> None:
+        """Stop recording an entry and delete everything stored for it."""
+        self.async_remove_entry(entry_id)
+        async with self._lock:
+            self._buffer = [sample for sample in self._buffer if sample[0] != entry_id]
+            if self._connection is not None:
+                await self._hass.async_add_executor_job(self._delete, entry_id)
+
+    def _delete(self, entry_id: str) -> None:
+        """Delete the raw samples and rollups of an entry, in the executor."""
+        with self._connection:
+            self._connection.execute("DELETE FROM raw WHERE entry_id = ?", (entry_id,))
+            self._connection.execute("DELETE FROM rollup WHERE entry_id = ?", (entry_id,))
+
+    @callback
+    def async_append(self, entry_id: str, timestamp: float, data: Dict[str, Any]) -> None:
+        """Buffer the numeric fields of one sample."""
+        self._buffer.extend(
+            (entry_id, timestamp, field, float(value))
+            for field, value in data.items()
+            if isinstance(value, (int, float))
+        )
+
+    @callback
+    def _async_flush_timer(self, _now: datetime) -> None:
+        """Flush in the background on every timer tick."""
+        self._hass.async_create_background_task(self.async_flush(), "gree_hp history flush")
+
+    async def async_flush(self) -> None:
+        """Write buffered samples and fold them into the rollups in one transaction."""
+        async with self._lock:
+            if self._connection is None:
+                return
+            batch, self._buffer = self._buffer, []
+            now = self._hass.loop.time()
+            prune = now - self._last_prune >= PRUNE_INTERVAL
+            if prune:
+                self._last_prune = now
+            if batch or prune:
+                retention = dict(self._retention) if prune else None
+                await self._hass.async_add_executor_job(self._write, batch, retention)
+
+    def _write(self, batch: List[Tuple[str, float, str, float]],
+               retention: Optional[Dict[str, Dict[str, float]]]) -> None:
+        """Append a batch, update rollups and optionally prune, in the executor."""
+        rollups: Dict[Tuple[str, int, int, str], List[float]] = {}
+        for entry_id, timestamp, field, value in batch:
+            for resolution in RESOLUTIONS.values():
+                key = (entry_id, resolution, int(timestamp // resolution) * resolution, field)
+                aggregate = rollups.get(key)
+                if aggregate is None:
+                    rollups[key] = [1, value, value, value]
+                else:
+                    aggregate[0] += 1
+                    aggregate[1] += value
+                    aggregate[2] = min(aggregate[2], value)
+                    aggregate[3] = max(aggregate[3], value)
+
+        with self._connection:
+            self._connection.executemany("INSERT INTO raw VALUES (?, ?, ?, ?)", batch)
+            self._connection.executemany(
+                UPSERT_ROLLUP, [(*key, *aggregate) for key, aggregate in rollups.items()]
+            )
+            if retention is not None:
+                self._prune(retention)
+
+    def _prune(self, retention: Dict[str, Dict[str, float]]) -> None:
+        """Delete data older than each entry's retention, or the default one if it is not recording."""
+        now = time.time()
+        recording = ", ".join("?" for _ in retention)
+        self._connection.execute(
+            f"DELETE FROM raw WHERE entry_id NOT IN ({recording}) AND ts < ?",
+            (*retention, now - DEFAULT_RETENTION["raw"]),
+        )
+        for name, resolution in RESOLUTIONS.items():
+            self._connection.execute(
+                f"DELETE FROM rollup WHERE entry_id NOT IN ({recording}) AND resolution = ? AND bucket < ?",
+                (*retention, resolution, now - DEFAULT_RETENTION[name]),
+            )
+        for entry_id, keep in retention.items():
+            self._connection.execute(
+                "DELETE FROM raw WHERE entry_id = ? AND ts < ?", (entry_id, now - keep["raw"])
+            )
+            for name, resolution in RESOLUTIONS.items():
+                self._connection.execute(
+                    "DELETE FROM rollup WHERE entry_id = ? AND resolution = ? AND bucket < ?",
+                    (entry_id, resolution, now - keep[name]),
+                )
+
+    async def async_query(self, entry_id: str, start: float, end: float,
+                          resolution: str = "raw", fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Return the samples or rollups of an entry between two timestamps, oldest first."""
+        await self.async_flush()
+        async with self._lock:
+            if self._connection is None:
+                return []
+            return await self._hass.async_add_executor_job(
+                self._query, entry_id, start, end, resolution, fields
+            )
+
+    def _query(self, entry_id: str, start: float, end: float, resolution: str,
+               fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+        """Run a query in the executor."""
+        field_filter = ""
+        params: List[Any] = [entry_id, start, end]
+        if fields:
+            field_filter = f" AND field IN ({', '.join('?' for _ in fields)})"
+            params.extend(fields)
+
+        if resolution == "raw":
+            rows = self._connection.execute(
+                "SELECT ts, field, value FROM raw WHERE entry_id = ? AND ts >= ? AND ts < ?"
+                f"{field_filter} ORDER BY ts, field",
+                params,
+            )
+            return [{"time": ts, "field": field, "value": value} for ts, field, value in rows]
+
+        rows = self._connection.execute(
+            "SELECT bucket, field, count, sum, min, max FROM rollup"
+            " WHERE entry_id = ? AND bucket >= ? AND bucket < ? AND resolution = ?"
+            f"{field_filter} ORDER BY bucket, field",
+            # Include the bucket start falls into
+            [entry_id, start // RESOLUTIONS[resolution] * RESOLUTIONS[resolution], end,
+             RESOLUTIONS[resolution], *params[3:]],
+        )
+        return [
+            {"time": bucket, "field": field, "count": count,
+             "mean": total / count, "min": low, "max": high}
+            for bucket, field, count, total, low, high in rows
+        ]
@@ -0,0 +1,106 @@
+"""Shared UDP endpoint for Gree Heat Pump devices."""
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from .const import DEFAULT_PORT, MAX_EXCHANGES_IN_FLIGHT
+
+if TYPE_CHECKING:
+    from .gree_hp import GreeHeatPump
+
+_LOGGER = logging.getLogger(__name__)
+
+class GreeListener(asyncio.DatagramProtocol):
+    """Own the local UDP port and route every incoming datagram to its device."""
+
+    def __init__(self, max_exchanges: int = MAX_EXCHANGES_IN_FLIGHT):
+        """Initialize the listener."""
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._devices: Dict[str, "GreeHeatPump"] = {}
+        self._scan_handlers: List[Callable[[Dict[str, Any], Tuple[str, int]], bool]] = []
+        self._start_lock = asyncio.Lock()
+        # Held by every exchange and scan on the port, whatever started it
+        self.exchange_slots = asyncio.Semaphore(max_exchanges)
+
+    async def async_start(self) -> None:
+        """Bind the local port if not bound yet."""
+        # Devices setting up in parallel must not each try to bind the port
+        async with self._start_lock:
+            if self._transport is not None:
+                return
+            loop = asyncio.get_running_loop()
+            await loop.create_datagram_endpoint(
+                lambda: self, local_addr=('0.0.0.0', DEFAULT_PORT), allow_broadcast=True
+            )
+
+    def close(self) -> None:
+        """Release the local port."""
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+
+    def register(self, device: "GreeHeatPump") -> None:
+        """Route datagrams coming from the device's address to it."""
+        self._devices[device.host] = device
+
+    def unregister(self, device: "GreeHeatPump") -> None:
+        """Stop routing datagrams to the device."""
+        if self._devices.get(device.host) is device:
+            del self._devices[device.host]
+
+    def add_scan_handler(
+        self, handler: Callable[[Dict[str, Any], Tuple[str, int]], bool]
+    ) -> Callable[[], None]:
+        """Offer every datagram to handler, it returns True for the ones it consumed.
+
+        Datagrams from a registered device are only observed, they still reach the
+        device, so a scan never swallows the replies of a device's own exchange.
+        """
+        self._scan_handlers.append(handler)
+
+        def remove_handler() -> None:
+            self._scan_handlers.remove(handler)
+
+        return remove_handler
+
+    def sendto(self, data: bytes, host: str) -> None:
+        """Send a datagram to a device."""
+        if self._transport is None:
+            raise ConnectionError("Listener is not running")
+        self._transport.sendto(data, (host, DEFAULT_PORT))
+
+    def connection_made(self, transport) -> None:
+        """Store the transport once the port is bound."""
+        self._transport = transport
+
+    def connection_lost(self, exc) -> None:
+        """Forget the transport when the port is closed."""
+        self._transport = None
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        """Hand a datagram to a running scan or to the device it came from."""
+        device = self._devices.get(addr[0])
+        if device is None and not self._scan_handlers:
+            _LOGGER.debug("Ignoring datagram from unknown source %s", addr[0])
+            return
+
+        try:
+            msg = json.loads(data)
+        except ValueError:
+            msg = None
+        if not isinstance(msg, dict):
+            _LOGGER.debug("Ignoring malformed datagram from %s", addr[0])
+            return
+
+        for handler in self._scan_handlers:
+            if handler(msg, addr):
+                break
+
+        # Scans only observe a registered device's datagrams, its exchange needs them too
+        if device is not None:
+            device.handle_datagram(msg)
+
+    def error_received(self, exc) -> None:
+        """Log socket errors, pending exchanges time out on their own."""
+        _LOGGER.debug("Socket error: %s", exc)
@@ -0,0 +1,151 @@
+"""Local API sharing the device sessions of one process with tools on the same host.
+
+Clients send one JSON request per line and get one JSON reply per line:
+
+    {"id": 1, "op": "devices"}
+    {"id": 2, "op": "status", "device": "192.168.5.204", "cols": ["Pow", "AllErr"], "max_age": 0}
+    {"id": 3, "op": "set", "device": "192.168.5.204", "values": {"Pow": 1, "WatBoxTemSet": 50}}
+    {"id": 4, "op": "watch", "device": "192.168.5.204", "cols": ["WatBoxTemHi"]}
+
+Replies are {"id": ..., "ok": true, "result": ...} or {"id": ..., "ok": false,
+"error": "..."}. A watch is acknowledged, then streams {"id": ..., "event":
+{"time": ..., "values": {...}}} lines until the client disconnects.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .gree_hp import GreeHeatPump, STATUS_COLS
+
+_LOGGER = logging.getLogger(__name__)
+
+class GreeLocalApi:
+    """Serve status, set and watch requests for the heat pumps of the running process."""
+
+    def __init__(self, heat_pumps: Callable[[], Dict[str, GreeHeatPump]],
+                 on_set: Optional[Callable[[str], None]] = None,
+                 validate_values: Optional[Callable[[Dict[str, Any]], Dict[str, int]]] = None):
+        """Initialize with a callable returning the served heat pumps keyed by address.
+
+        on_set is called with the address of every device a client changed.
+        validate_values checks the values of set requests and returns them converted,
+        raising if any cannot be written. Without it any column takes any integer.
+        """
+        self._heat_pumps = heat_pumps
+        self._on_set = on_set
+        self._validate_values = validate_values
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._path: Optional[str] = None
+
+    async def async_start(self, path: Optional[str] = None, port: Optional[int] = None) -> None:
+        """Serve on a Unix socket only the owner can use, or on a localhost TCP port."""
+        if port:
+            self._server = await asyncio.start_server(self.handle_client, '127.0.0.1', port)
+            _LOGGER.debug("Serving the local API on 127.0.0.1:%d", port)
+            return
+
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = await asyncio.start_unix_server(self.handle_client, path)
+        os.chmod(path, 0o600)
+        self._path = path
+        _LOGGER.debug("Serving the local API on %s", path)
+
+    async def async_close(self) -> None:
+        """Stop serving and remove the socket."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._path and os.path.exists(self._path):
+            os.unlink(self._path)
+        self._path = None
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer the requests of one client until it disconnects."""
+        watches: List[Callable[[], None]] = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                reply = await self._handle_request(line, writer, watches)
+                writer.write(json.dumps(reply).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for remove_listener in watches:
+                remove_listener()
+            writer.close()
+
+    async def _handle_request(self, line: bytes, writer: asyncio.StreamWriter,
+                              watches: List[Callable[[], None]]) -> Dict[str, Any]:
+        """Run one request and return its reply, failures included."""
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            result = await self._run(request, writer, watches)
+            return {'id': request_id, 'ok': True, 'result': result}
+        except asyncio.TimeoutError:
+            return {'id': request_id, 'ok': False, 'error': "The device did not answer in time"}
+        except Exception as e: # pylint: disable=broad-except
+            # A failed request must not end the client's connection
+            _LOGGER.debug("Local API request failed: %s", e)
+            return {'id': request_id, 'ok': False, 'error': str(e) or repr(e)}
+
+    async def _run(self, request: Dict[str, Any], writer: asyncio.StreamWriter,
+                   watches: List[Callable[[], None]]) -> Any:
+        """Dispatch a request to its operation."""
+        heat_pumps = self._heat_pumps()
+        op = request.get('op')
+        if op == 'devices':
+            return {
+                host: {
+                    'mac': heat_pump.mac,
+                    'offline': heat_pump.is_offline,
+                    'pending_commands': heat_pump.pending_commands,
+                    'commands': heat_pump.command_stats,
+                    'rtt': heat_pump.rtt_stats,
+                }
+                for host, heat_pump in heat_pumps.items()
+            }
+
+        heat_pump = heat_pumps.get(request.get('device'))
+        if heat_pump is None:
+            raise ValueError(f"Unknown device {request.get('device')}, serving {', '.join(heat_pumps)}")
+
+        if op == 'status':
+            return await heat_pump.async_query(request.get('cols') or STATUS_COLS, request.get('max_age'))
+        if op == 'set':
+            if self._validate_values:
+                values = self._validate_values(request['values'])
+            else:
+                values = {param: int(value) for param, value in request['values'].items()}
+            await heat_pump.async_set_values(values, bool(request.get('force')))
+            if self._on_set:
+                self._on_set(heat_pump.host)
+            return await heat_pump.async_query(list(values))
+        if op == 'watch':
+            watches.append(heat_pump.add_sample_listener(
+                self._watch_listener(request.get('id'), set(request.get('cols') or []), writer)
+            ))
+            return None
+        raise ValueError(f"Unknown op {op}, expected devices, status, set or watch")
+
+    @staticmethod
+    def _watch_listener(request_id: Any, cols: set, writer: asyncio.StreamWriter) -> Callable[[Dict[str, Any]], None]:
+        """Return a sample listener that streams to a client."""
+        def send_sample(values: Dict[str, Any]) -> None:
+            if cols:
+                values = {col: value for col, value in values.items() if col in cols}
+            if values and not writer.is_closing():
+                event = {'id': request_id, 'event': {'time': time.time(), 'values': values}}
+                writer.write(json.dumps(event).encode('utf-8') + b'\n')
+        return send_sample
@@ -6,9 +6,9 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, UnitOfTemperature
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
+from .const import DOMAIN, SETPOINT_LIMITS
+from .entity import GreeHeatPumpEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -22,34 +22,28 @@ async def async_setup_entry(
     heat_pump = hass.data[DOMAIN][config_entry.entry_id]["heat_pump"]
     host = config_entry.data[CONF_HOST]
 
+    temperatures = [
+        ("CoWatOutTemSet", "Cold Water Temperature"),
+        ("HeWatOutTemSet", "Hot Water Temperature"),
+        ("WatBoxTemSet", "Shower Water Temperature"),
+    ]
+
+    # Skip settings the capability probe found unsupported
     entities = [
-        GreeHeatPumpTemperature(coordinator,
-                                heat_pump,
-                                host,
-                                "CoWatOutTemSet",
-                                "Cold Water Temperature", 5, 30),
-        GreeHeatPumpTemperature(coordinator,
-                                heat_pump,
-                                host,
-                                "HeWatOutTemSet",
-                                "Hot Water Temperature", 30, 60),
-        GreeHeatPumpTemperature(coordinator,
-                                heat_pump,
-                                host,
-                                "WatBoxTemSet",
-                                "Shower Water Temperature", 30, 60),
+        GreeHeatPumpTemperature(coordinator, heat_pump, host, param_key, name, *SETPOINT_LIMITS[param_key])
+        for param_key, name in temperatures
+        if heat_pump.supports(param_key)
     ]
 
     async_add_entities(entities)
 
-class GreeHeatPumpTemperature(CoordinatorEntity, NumberEntity):
+class GreeHeatPumpTemperature(GreeHeatPumpEntity, NumberEntity):
     """Number entity for Gree Heat Pump temperature control."""
 
     def __init__(self, coordinator, heat_pump, host, param_key, name, min_temp, max_temp):
         """Initialize the number entity."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, host, (param_key,))
         self._heat_pump = heat_pump
-        self._host = host
         self._param_key = param_key
         self._attr_name = f"Gree Heat Pump {host} {name}"
         self._attr_unique_id = f"gree_hp_{host}_{param_key}"
@@ -59,16 +53,6 @@ class GreeHeatPumpTemperature(CoordinatorEntity, NumberEntity):
         self._attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
         self._attr_mode = "slider"
 
-    @property
-    def device_info(self):
-        """Return device info."""
-        return {
-            "identifiers": {(DOMAIN, self._host)},
-            "name": f"Gree Heat Pump {self._host}",
-            "manufacturer": "Gree",
-            "model": "Heat Pump",
-        }
-
     @property
     def native_value(self):
         """Return the current value."""
@@ -90,10 +74,7 @@ class GreeHeatPumpTemperature(CoordinatorEntity, NumberEntity):
 
         temp_type = temp_type_mapping.get(self._param_key)
         if temp_type:
-            success = await self._heat_pump.async_set_temperature(temp_type, int(value))
-            if success:
-                # Request immediate update
-                await self.coordinator.async_request_refresh()
+            await self._async_send(self._heat_pump.async_set_temperature(temp_type, int(value)))
 
     @property
     def available(self) -> bool:
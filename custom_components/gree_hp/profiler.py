@@ -0,0 +1,136 @@
+"""On-demand profiling of the event loop for the Gree Heat Pump integration."""
+import asyncio
+from collections import Counter
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, PROFILE_SAMPLE_INTERVAL, PROFILE_TOP_FUNCTIONS
+
+MODE_DETERMINISTIC = "deterministic"
+MODE_SAMPLING = "sampling"
+PROFILE_MODES = [MODE_DETERMINISTIC, MODE_SAMPLING]
+
+Frame = Tuple[str, str, int]
+
+def _describe(frame: Frame) -> str:
+    """Return a readable name for a function."""
+    filename, name, line = frame
+    if filename == "~":
+        # Built-in functions have no source location
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class _Sampler(threading.Thread):
+    """Record the stack of one thread at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float):
+        """Initialize the sampler."""
+        super().__init__(name="gree_hp profile sampler", daemon=True)
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self.stacks: Counter = Counter()
+
+    def run(self) -> None:
+        """Sample until stopped."""
+        while not self._stop_event.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)  # pylint: disable=protected-access
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the thread to end."""
+        self._stop_event.set()
+        self.join()
+
+
+def _write_cprofile(profiler: cProfile.Profile, path: str) -> List[Dict[str, Any]]:
+    """Save a cProfile run and its summary, in the executor."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    profiler.dump_stats(f"{path}.prof")
+    with open(f"{path}.txt", "w", encoding="utf-8") as summary:
+        stats = pstats.Stats(profiler, stream=summary)
+        summary.write("Top functions by own time\n")
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(PROFILE_TOP_FUNCTIONS)
+        summary.write(f"Top {DOMAIN} functions by cumulative time\n")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(DOMAIN, PROFILE_TOP_FUNCTIONS)
+
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+    return [
+        {"function": _describe((filename, name, line)), "calls": calls,
+         "self": round(own, 6), "total": round(total, 6)}
+        for (filename, line, name), (_, calls, own, total, _) in rows[:PROFILE_TOP_FUNCTIONS]
+    ]
+
+
+def _write_samples(stacks: Counter, interval: float, path: str) -> List[Dict[str, Any]]:
+    """Save sampled stacks in collapsed format and their summary, in the executor."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    own: Counter = Counter()
+    total: Counter = Counter()
+    with open(f"{path}.collapsed", "w", encoding="utf-8") as collapsed:
+        for stack, count in stacks.items():
+            # One line per stack, the input format of flame graph tools
+            collapsed.write(f"{';'.join(_describe(frame) for frame in stack)} {count}\n")
+            own[stack[-1]] += count
+            for frame in set(stack):
+                total[frame] += count
+
+    samples = sum(stacks.values())
+    with open(f"{path}.txt", "w", encoding="utf-8") as summary:
+        summary.write(f"{samples} samples every {interval * 1000:g} ms\n\n")
+        summary.write(f"{'self %':>8} {'total %':>8}  function\n")
+        for frame, count in own.most_common(PROFILE_TOP_FUNCTIONS):
+            summary.write(f"{100 * count / samples:8.1f} {100 * total[frame] / samples:8.1f}"
+                          f"  {_describe(frame)}\n")
+
+    return [
+        {"function": _describe(frame), "samples": count,
+         "self": round(count * interval, 3), "total": round(total[frame] * interval, 3)}
+        for frame, count in own.most_common(PROFILE_TOP_FUNCTIONS)
+    ]
+
+
+async def async_profile(hass: HomeAssistant, mode: str, duration: float) -> Dict[str, Any]:
+    """Profile the event loop for duration seconds and save the result in the config directory.
+
+    Nothing is installed outside of a run, so profiling costs nothing while disabled.
+    """
+    path = hass.config.path(DOMAIN, f"profile_{time.strftime('%Y%m%d_%H%M%S')}_{mode}")
+
+    if mode == MODE_DETERMINISTIC:
+        # Only the calling thread is traced, which is the event loop running the integration
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profiler.disable()
+        top = await hass.async_add_executor_job(_write_cprofile, profiler, path)
+        profile = f"{path}.prof"
+    else:
+        sampler = _Sampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+        sampler.start()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            await hass.async_add_executor_job(sampler.stop)
+        top = await hass.async_add_executor_job(
+            _write_samples, sampler.stacks, PROFILE_SAMPLE_INTERVAL, path
+        )
+        profile = f"{path}.collapsed"
+
+    return {"profile": profile, "summary": f"{path}.txt", "top": top[:10]}
@@ -0,0 +1,53 @@
+"""Round-trip time estimation for Gree Heat Pump exchanges."""
+from typing import Any, Dict, Optional
+
+# Smoothing factors and clock granularity from RFC 6298
+RTT_ALPHA = 0.125
+RTT_BETA = 0.25
+RTT_GRANULARITY = 0.01
+
+class RttEstimator:
+    """Track smoothed RTT and its variance to derive a retransmission timeout."""
+
+    def __init__(self, initial_rto: float, min_rto: float, max_rto: float):
+        """Initialize the estimator."""
+        self._min_rto = min_rto
+        self._max_rto = max_rto
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self.rto = initial_rto
+        self.last_rtt: Optional[float] = None
+        self.samples = 0
+        self.timeouts = 0
+
+    def sample(self, rtt: float) -> None:
+        """Feed a round trip measured on a reply to a first transmission."""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - RTT_BETA) * self.rttvar + RTT_BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - RTT_ALPHA) * self.srtt + RTT_ALPHA * rtt
+        self.last_rtt = rtt
+        self.samples += 1
+        self.rto = self._bound(self.srtt + max(RTT_GRANULARITY, 4 * self.rttvar))
+
+    def backoff(self) -> None:
+        """Double the timeout after an exchange went unanswered."""
+        self.timeouts += 1
+        self.rto = self._bound(self.rto * 2)
+
+    def _bound(self, rto: float) -> float:
+        """Clamp a timeout to the configured limits."""
+        return min(max(rto, self._min_rto), self._max_rto)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the estimator state."""
+        return {
+            "srtt": None if self.srtt is None else round(self.srtt, 4),
+            "rttvar": None if self.rttvar is None else round(self.rttvar, 4),
+            "rto": round(self.rto, 4),
+            "last_rtt": None if self.last_rtt is None else round(self.last_rtt, 4),
+            "samples": self.samples,
+            "timeouts": self.timeouts,
+        }
@@ -0,0 +1,144 @@
+"""Shared polling scheduler for Gree Heat Pump devices."""
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Weight of the newest sample in the smoothed slip average
+SLIP_SMOOTHING = 0.2
+
+class _ScheduledDevice:
+    """Polling state of a single device."""
+
+    def __init__(self, coordinator: DataUpdateCoordinator, interval: float):
+        """Initialize the scheduled device."""
+        self.coordinator = coordinator
+        self.interval = interval
+        self.next_due = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self.polls = 0
+        self.overruns = 0
+        self.last_slip = 0.0
+        self.max_slip = 0.0
+        self.avg_slip = 0.0
+
+    def record_slip(self, slip: float) -> None:
+        """Record how late a poll started compared to its slot."""
+        self.polls += 1
+        self.last_slip = slip
+        self.max_slip = max(self.max_slip, slip)
+        if self.polls == 1:
+            self.avg_slip = slip
+        else:
+            self.avg_slip += SLIP_SMOOTHING * (slip - self.avg_slip)
+
+
+class GreePollScheduler:
+    """Poll all configured heat pumps from one loop with evenly spread phases."""
+
+    def __init__(self, hass: HomeAssistant, max_in_flight: int):
+        """Initialize the scheduler."""
+        self._hass = hass
+        self._devices: Dict[str, _ScheduledDevice] = {}
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def async_add(self, entry_id: str, coordinator: DataUpdateCoordinator, interval: float) -> None:
+        """Start polling a device."""
+        self._devices[entry_id] = _ScheduledDevice(coordinator, interval)
+        self._rephase()
+        if self._task is None or self._task.done():
+            self._task = self._hass.async_create_background_task(
+                self._async_run(), "gree_hp poll scheduler"
+            )
+
+    def async_remove(self, entry_id: str) -> None:
+        """Stop polling a device."""
+        device = self._devices.pop(entry_id, None)
+        if device and device.task and not device.task.done():
+            device.task.cancel()
+        if not self._devices and self._task:
+            self._task.cancel()
+            self._task = None
+            return
+        self._rephase()
+
+    def async_set_interval(self, entry_id: str, interval: float) -> None:
+        """Change the polling interval of a device without interrupting a running poll."""
+        device = self._devices.get(entry_id)
+        if device is None or device.interval == interval:
+            return
+        device.interval = interval
+        self._rephase()
+
+    def stats(self, entry_id: str) -> Dict[str, Any]:
+        """Return schedule statistics for a device."""
+        device = self._devices.get(entry_id)
+        if device is None:
+            return {}
+        return {
+            "interval": device.interval,
+            "polls": device.polls,
+            "overruns": device.overruns,
+            "last_slip": round(device.last_slip, 3),
+            "max_slip": round(device.max_slip, 3),
+            "avg_slip": round(device.avg_slip, 3),
+        }
+
+    def _rephase(self) -> None:
+        """Spread the next poll of every device evenly across its interval."""
+        now = self._hass.loop.time()
+        count = len(self._devices)
+        for index, entry_id in enumerate(sorted(self._devices)):
+            device = self._devices[entry_id]
+            device.next_due = now + device.interval * (index + 1) / count
+        self._wakeup.set()
+
+    async def _async_run(self) -> None:
+        """Dispatch polls as their slots come due."""
+        while self._devices:
+            now = self._hass.loop.time()
+            for device in self._devices.values():
+                if device.next_due > now:
+                    continue
+
+                scheduled = device.next_due
+                # Skip slots we already missed instead of bursting to catch up
+                while device.next_due <= now:
+                    device.next_due += device.interval
+
+                if device.task is not None and not device.task.done():
+                    device.overruns += 1
+                    _LOGGER.debug("Previous poll of %s still running, skipping slot",
+                                  device.coordinator.name)
+                    continue
+
+                device.task = self._hass.async_create_background_task(
+                    self._async_poll(device, scheduled),
+                    f"gree_hp poll {device.coordinator.name}",
+                )
+
+            self._wakeup.clear()
+            delay = min(device.next_due for device in self._devices.values()) - now
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(delay, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _async_poll(self, device: _ScheduledDevice, scheduled: float) -> None:
+        """Refresh a device once one of the poll slots is free.
+
+        Exchanges of every kind, polls included, are also bounded by the listener.
+        """
+        async with self._semaphore:
+            slip = self._hass.loop.time() - scheduled
+            device.record_slip(slip)
+            if slip > device.interval / 2:
+                _LOGGER.warning("Poll of %s started %.2f seconds late",
+                                device.coordinator.name, slip)
+            await device.coordinator.async_refresh()
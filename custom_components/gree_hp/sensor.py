@@ -9,12 +9,12 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_HOST, UnitOfTemperature
+from homeassistant.const import CONF_HOST, PERCENTAGE, UnitOfEnergy, UnitOfTemperature
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
+from .entity import GreeHeatPumpEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -52,6 +52,35 @@ SENSOR_FIELD_MAPPING = {
     "water_tank": ("WatBoxTemHi", "WatBoxTemLo"),
 }
 
+# Heaters metered by the coordinator, keyed by run-state field
+HEATER_NAMES = {
+    "WatBoxElcHeRunSta": "Water Tank Heater",
+    "ElcHe1RunSta": "Backup Heater 1",
+    "ElcHe2RunSta": "Backup Heater 2",
+}
+
+def _heater_descriptions(field: str):
+    """Return the energy and duty cycle descriptions of a heater."""
+    name = HEATER_NAMES[field]
+    return [
+        SensorEntityDescription(
+            key=f"{field}_energy",
+            name=f"{name} Energy",
+            device_class=SensorDeviceClass.ENERGY,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+            suggested_display_precision=3,
+        ),
+        SensorEntityDescription(
+            key=f"{field}_duty_cycle",
+            name=f"{name} Duty Cycle",
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=PERCENTAGE,
+            suggested_display_precision=1,
+            icon="mdi:percent",
+        ),
+    ]
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
@@ -59,35 +88,34 @@ async def async_setup_entry(
 ) -> None:
     """Set up Gree Heat Pump sensors."""
     coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    heat_pump = hass.data[DOMAIN][config_entry.entry_id]["heat_pump"]
     host = config_entry.data[CONF_HOST]
 
     entities = []
     for description in SENSOR_DESCRIPTIONS:
-        entities.append(GreeHeatPumpSensor(coordinator, description, host))
+        # Skip sensors whose fields the capability probe found unsupported
+        if all(heat_pump.supports(field) for field in SENSOR_FIELD_MAPPING[description.key]):
+            entities.append(GreeHeatPumpSensor(coordinator, description, host))
+
+    for field in HEATER_NAMES:
+        if heat_pump.supports(field):
+            entities.extend(
+                GreeHeatPumpHeaterSensor(coordinator, description, host, field)
+                for description in _heater_descriptions(field)
+            )
 
     async_add_entities(entities)
 
-class GreeHeatPumpSensor(CoordinatorEntity, SensorEntity):
+class GreeHeatPumpSensor(GreeHeatPumpEntity, SensorEntity):
     """Representation of a Gree Heat Pump sensor."""
 
     def __init__(self, coordinator, description: SensorEntityDescription, host: str):
         """Initialize the sensor."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, host, SENSOR_FIELD_MAPPING[description.key])
         self.entity_description = description
-        self._host = host
         self._attr_unique_id = f"gree_hp_{host}_{description.key}"
         self._attr_name = f"Gree Heat Pump {host} {description.name}"
 
-    @property
-    def device_info(self):
-        """Return device info."""
-        return {
-            "identifiers": {(DOMAIN, self._host)},
-            "name": f"Gree Heat Pump {self._host}",
-            "manufacturer": "Gree",
-            "model": "Heat Pump",
-        }
-
     @property
     def native_value(self) -> Optional[float]:
         """Return the state of the sensor."""
@@ -122,3 +150,22 @@ class GreeHeatPumpSensor(CoordinatorEntity, SensorEntity):
             return self.native_value is not None
 
         return self.coordinator.last_update_success and self.native_value is not None
+
+
+class GreeHeatPumpHeaterSensor(GreeHeatPumpEntity, SensorEntity):
+    """Energy or duty cycle of a heater, read from the coordinator's accumulator."""
+
+    def __init__(self, coordinator, description: SensorEntityDescription, host: str, field: str):
+        """Initialize the sensor."""
+        super().__init__(coordinator, host, (field,))
+        self.entity_description = description
+        self._meter = coordinator.energy.meters[field]
+        self._attr_unique_id = f"gree_hp_{host}_{description.key}"
+        self._attr_name = f"Gree Heat Pump {host} {description.name}"
+
+    @property
+    def native_value(self) -> float:
+        """Return the accumulated energy in kWh or the running duty cycle in percent."""
+        if self.entity_description.device_class == SensorDeviceClass.ENERGY:
+            return round(self._meter.energy, 3)
+        return round(self._meter.duty_cycle * 100, 1)
@@ -0,0 +1,273 @@
+"""Services for the Gree Heat Pump integration."""
+import asyncio
+import csv
+import os
+import time
+from typing import Any, Dict, List, Set
+
+import voluptuous as vol
+
+from homeassistant.const import ATTR_AREA_ID
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import device_registry as dr
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    DOMAIN,
+    COMMAND_DEADLINE,
+    GROUP_SET_CONCURRENCY,
+    DATA_PROFILING,
+    DEFAULT_PROFILE_DURATION,
+    MAX_PROFILE_DURATION,
+    CONTROL_FLAGS,
+    MODE_MAPPING,
+    SETPOINT_LIMITS,
+)
+from .gree_hp import GreeHeatPump, DeviceOfflineError
+from .history import RESOLUTIONS
+from .profiler import MODE_DETERMINISTIC, PROFILE_MODES, async_profile
+
+SERVICE_QUERY = "query"
+SERVICE_EXPORT_HISTORY = "export_history"
+SERVICE_GROUP_SET = "group_set"
+SERVICE_PROFILE = "profile"
+
+ATTR_DEVICE_ID = "device_id"
+ATTR_COLUMNS = "columns"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_RESOLUTION = "resolution"
+ATTR_FILENAME = "filename"
+ATTR_VALUES = "values"
+ATTR_FORCE = "force"
+ATTR_DURATION = "duration"
+ATTR_MODE = "mode"
+
+QUERY_SCHEMA = vol.Schema({
+    vol.Required(ATTR_DEVICE_ID): cv.string,
+    vol.Required(ATTR_COLUMNS): vol.All(cv.ensure_list, [cv.string]),
+})
+
+EXPORT_HISTORY_SCHEMA = vol.Schema({
+    vol.Required(ATTR_DEVICE_ID): cv.string,
+    vol.Required(ATTR_START): cv.datetime,
+    vol.Required(ATTR_END): cv.datetime,
+    vol.Optional(ATTR_RESOLUTION, default="raw"): vol.In(["raw", *RESOLUTIONS]),
+    vol.Optional(ATTR_COLUMNS): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(ATTR_FILENAME): cv.string,
+})
+
+# Columns group_set may write, with the values the entities for them accept
+WRITABLE_COLUMNS = {
+    "Pow": vol.All(vol.Coerce(int), vol.In([0, 1])),
+    "Mod": vol.All(vol.Coerce(int), vol.In(list(MODE_MAPPING))),
+    **{
+        col: vol.All(vol.Coerce(int), vol.Range(min=low, max=high))
+        for col, (low, high) in SETPOINT_LIMITS.items()
+    },
+    **{flag: vol.All(vol.Coerce(int), vol.In([0, 1])) for flag in CONTROL_FLAGS},
+}
+
+
+def _writable_values(values: Dict[str, Any]) -> Dict[str, int]:
+    """Validate values against the writable columns and their ranges."""
+    unknown = [col for col in values if col not in WRITABLE_COLUMNS]
+    if unknown:
+        raise vol.Invalid(
+            f"{', '.join(unknown)} cannot be set, writable columns are {', '.join(WRITABLE_COLUMNS)}"
+        )
+    return vol.Schema(WRITABLE_COLUMNS)(values)
+
+
+# Values to write, shared by group_set and the local API
+WRITABLE_VALUES_SCHEMA = vol.All(dict, vol.Length(min=1), _writable_values)
+
+GROUP_SET_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Optional(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_AREA_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Required(ATTR_VALUES): WRITABLE_VALUES_SCHEMA,
+        vol.Optional(ATTR_FORCE, default=False): cv.boolean,
+    }),
+    cv.has_at_least_one_key(ATTR_DEVICE_ID, ATTR_AREA_ID),
+)
+
+PROFILE_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_DURATION, default=DEFAULT_PROFILE_DURATION): vol.All(
+        vol.Coerce(float), vol.Range(min=1, max=MAX_PROFILE_DURATION)
+    ),
+    vol.Optional(ATTR_MODE, default=MODE_DETERMINISTIC): vol.In(PROFILE_MODES),
+})
+
+def _entry_id_for_device(hass: HomeAssistant, device_id: str) -> str:
+    """Return the loaded config entry behind a device registry id."""
+    device = dr.async_get(hass).async_get(device_id)
+    if device:
+        for entry_id in device.config_entries:
+            if entry_id in hass.data.get(DOMAIN, {}):
+                return entry_id
+    raise ServiceValidationError(f"Device {device_id} is not a loaded Gree heat pump")
+
+
+def _heat_pump_for_device(hass: HomeAssistant, device_id: str) -> GreeHeatPump:
+    """Return the heat pump behind a device registry id."""
+    return hass.data[DOMAIN][_entry_id_for_device(hass, device_id)]["heat_pump"]
+
+
+def _group_device_ids(hass: HomeAssistant, device_ids: List[str], area_ids: List[str]) -> List[str]:
+    """Return the given devices and the heat pumps in the given areas, without duplicates."""
+    device_registry = dr.async_get(hass)
+    seen: Set[str] = set()
+    targets = []
+    for device_id in device_ids:
+        if device_id not in seen:
+            seen.add(device_id)
+            targets.append(device_id)
+    for area_id in area_ids:
+        for device in dr.async_entries_for_area(device_registry, area_id):
+            if device.id not in seen and any(
+                entry_id in hass.data.get(DOMAIN, {}) for entry_id in device.config_entries
+            ):
+                seen.add(device.id)
+                targets.append(device.id)
+    return targets
+
+
+def _write_csv(path: str, rows: List[Dict[str, Any]]) -> None:
+    """Write exported rows to a CSV file, in the executor."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as export_file:
+        writer = csv.DictWriter(export_file, fieldnames=list(rows[0]) if rows else ["time"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+
+    async def async_query(call: ServiceCall) -> ServiceResponse:
+        """Read arbitrary columns from a heat pump."""
+        heat_pump = _heat_pump_for_device(hass, call.data[ATTR_DEVICE_ID])
+        try:
+            return {"values": await heat_pump.async_query(call.data[ATTR_COLUMNS])}
+        except DeviceOfflineError as err:
+            raise HomeAssistantError(str(err)) from err
+
+    async def async_export_history(call: ServiceCall) -> ServiceResponse:
+        """Return or save the recorded history of a heat pump for a time range."""
+        entry_id = _entry_id_for_device(hass, call.data[ATTR_DEVICE_ID])
+        history = hass.data[DOMAIN][entry_id]["coordinator"].history
+        if history is None:
+            raise ServiceValidationError("History is not enabled for this heat pump")
+
+        rows = await history.async_query(
+            entry_id,
+            dt_util.as_utc(call.data[ATTR_START]).timestamp(),
+            dt_util.as_utc(call.data[ATTR_END]).timestamp(),
+            call.data[ATTR_RESOLUTION],
+            call.data.get(ATTR_COLUMNS),
+        )
+        if ATTR_FILENAME not in call.data:
+            return {"rows": rows}
+
+        # Exports always land in the gree_hp folder of the configuration directory
+        path = hass.config.path(DOMAIN, os.path.basename(call.data[ATTR_FILENAME]))
+        await hass.async_add_executor_job(_write_csv, path, rows)
+        return {"path": path, "count": len(rows)}
+
+    async def async_group_set(call: ServiceCall) -> ServiceResponse:
+        """Send the same values to many heat pumps at once."""
+        device_ids = _group_device_ids(
+            hass, call.data.get(ATTR_DEVICE_ID, []), call.data.get(ATTR_AREA_ID, [])
+        )
+        if not device_ids:
+            raise ServiceValidationError("No Gree heat pumps found for the given devices or areas")
+        # Fail before sending anything if a target is not a heat pump
+        entry_ids = {device_id: _entry_id_for_device(hass, device_id) for device_id in device_ids}
+
+        values = call.data[ATTR_VALUES]
+        semaphore = asyncio.Semaphore(GROUP_SET_CONCURRENCY)
+
+        async def async_set(device_id: str) -> Dict[str, Any]:
+            entry_data = hass.data[DOMAIN][entry_ids[device_id]]
+            heat_pump: GreeHeatPump = entry_data["heat_pump"]
+            result: Dict[str, Any] = {"host": heat_pump.host}
+            async with semaphore:
+                # Values the device recently confirmed are not sent, so they are not confirmed again
+                skipped = {} if call.data[ATTR_FORCE] else heat_pump.recently_confirmed(values)
+                started = time.monotonic()
+                try:
+                    sent = await heat_pump.async_set_values(
+                        values, call.data[ATTR_FORCE], COMMAND_DEADLINE
+                    )
+                except DeviceOfflineError as err:
+                    result["error"] = str(err)
+                    return result
+                result["latency"] = round(time.monotonic() - started, 3)
+
+            result["skipped"] = skipped
+            if sent:
+                # Only what the command response confirmed during this call
+                entry_data["coordinator"].async_publish_confirmed()
+                result["confirmed"] = heat_pump.confirmed_since(
+                    [col for col in values if col not in skipped], started
+                )
+            else:
+                result["queued"] = True
+            return result
+
+        results = await asyncio.gather(*(async_set(device_id) for device_id in device_ids))
+        return {"results": dict(zip(device_ids, results))}
+
+    async def async_run_profile(call: ServiceCall) -> ServiceResponse:
+        """Profile the event loop for a while and save the result in the config directory."""
+        domain_data = hass.data.setdefault(DOMAIN, {})
+        if domain_data.get(DATA_PROFILING):
+            raise ServiceValidationError("A profile is already running")
+
+        domain_data[DATA_PROFILING] = True
+        try:
+            return await async_profile(hass, call.data[ATTR_MODE], call.data[ATTR_DURATION])
+        except ValueError as err:
+            # cProfile refuses to start while another profiler, such as Home Assistant's, runs
+            raise ServiceValidationError(f"Could not start profiling: {err}") from err
+        finally:
+            domain_data[DATA_PROFILING] = False
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY,
+        async_query,
+        schema=QUERY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_HISTORY,
+        async_export_history,
+        schema=EXPORT_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GROUP_SET,
+        async_group_set,
+        schema=GROUP_SET_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        async_run_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
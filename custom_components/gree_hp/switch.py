@@ -1,17 +1,57 @@
 """Switch platform for Gree Heat Pump integration."""
 import logging
 
-from homeassistant.components.switch import SwitchEntity
+from homeassistant.components.switch import SwitchEntity, SwitchEntityDescription
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_HOST
+from homeassistant.const import CONF_HOST, EntityCategory
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
+from .entity import GreeHeatPumpEntity
 
 _LOGGER = logging.getLogger(__name__)
 
+# Keyed by the control flag each switch writes
+FLAG_SWITCH_DESCRIPTIONS = [
+    SwitchEntityDescription(
+        key="Quiet",
+        name="Quiet Mode",
+        icon="mdi:volume-off",
+        entity_category=EntityCategory.CONFIG,
+    ),
+    SwitchEntityDescription(
+        key="FastHtWter",
+        name="Fast Hot Water",
+        icon="mdi:water-boiler",
+        entity_category=EntityCategory.CONFIG,
+    ),
+    SwitchEntityDescription(
+        key="Emegcy",
+        name="Emergency Mode",
+        icon="mdi:alert",
+        entity_category=EntityCategory.CONFIG,
+    ),
+    SwitchEntityDescription(
+        key="HetHtWter",
+        name="Heat Hot Water",
+        icon="mdi:water-thermometer",
+        entity_category=EntityCategory.CONFIG,
+    ),
+    SwitchEntityDescription(
+        key="ColHtWter",
+        name="Cool Hot Water",
+        icon="mdi:water-thermometer-outline",
+        entity_category=EntityCategory.CONFIG,
+    ),
+    SwitchEntityDescription(
+        key="LefHom",
+        name="Leave Home",
+        icon="mdi:home-export-outline",
+        entity_category=EntityCategory.CONFIG,
+    ),
+]
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
@@ -22,29 +62,26 @@ async def async_setup_entry(
     heat_pump = hass.data[DOMAIN][config_entry.entry_id]["heat_pump"]
     host = config_entry.data[CONF_HOST]
 
-    async_add_entities([GreeHeatPumpSwitch(coordinator, heat_pump, host)])
+    entities = []
+    if heat_pump.supports("Pow"):
+        entities.append(GreeHeatPumpSwitch(coordinator, heat_pump, host))
+    entities.extend(
+        GreeHeatPumpFlagSwitch(coordinator, heat_pump, description, host)
+        for description in FLAG_SWITCH_DESCRIPTIONS
+        if heat_pump.supports(description.key)
+    )
+    async_add_entities(entities)
 
-class GreeHeatPumpSwitch(CoordinatorEntity, SwitchEntity):
+class GreeHeatPumpSwitch(GreeHeatPumpEntity, SwitchEntity):
     """Switch for Gree Heat Pump power control."""
 
     def __init__(self, coordinator, heat_pump, host):
         """Initialize the switch."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, host, ("Pow",))
         self._heat_pump = heat_pump
-        self._host = host
         self._attr_name = f"Gree Heat Pump {host}"
         self._attr_unique_id = f"gree_hp_{host}_power"
 
-    @property
-    def device_info(self):
-        """Return device info."""
-        return {
-            "identifiers": {(DOMAIN, self._host)},
-            "name": f"Gree Heat Pump {self._host}",
-            "manufacturer": "Gree",
-            "model": "Heat Pump",
-        }
-
     @property
     def is_on(self):
         """Return true if switch is on."""
@@ -55,15 +92,47 @@ class GreeHeatPumpSwitch(CoordinatorEntity, SwitchEntity):
 
     async def async_turn_on(self, **kwargs):
         """Turn the switch on."""
-        success = await self._heat_pump.async_set_power(True)
-        if success:
-            await self.coordinator.async_request_refresh()
+        await self._async_send(self._heat_pump.async_set_power(True))
 
     async def async_turn_off(self, **kwargs):
         """Turn the switch off."""
-        success = await self._heat_pump.async_set_power(False)
-        if success:
-            await self.coordinator.async_request_refresh()
+        await self._async_send(self._heat_pump.async_set_power(False))
+
+    @property
+    def available(self) -> bool:
+        """Return True if entity is available."""
+        if self._heat_pump.is_rebinding and self._heat_pump.retry_count < self._heat_pump.max_retries:
+            return True
+        else:
+            return self.coordinator.last_update_success
+
+
+class GreeHeatPumpFlagSwitch(GreeHeatPumpEntity, SwitchEntity):
+    """Switch for one of the Gree Heat Pump on/off control flags."""
+
+    def __init__(self, coordinator, heat_pump, description: SwitchEntityDescription, host):
+        """Initialize the switch."""
+        super().__init__(coordinator, host, (description.key,))
+        self._heat_pump = heat_pump
+        self.entity_description = description
+        self._attr_name = f"Gree Heat Pump {host} {description.name}"
+        self._attr_unique_id = f"gree_hp_{host}_{description.key}"
+
+    @property
+    def is_on(self):
+        """Return true if the flag is set."""
+        data = self.coordinator.data
+        if data and self.entity_description.key in data:
+            return data[self.entity_description.key] == 1
+        return None
+
+    async def async_turn_on(self, **kwargs):
+        """Set the flag, sharing a cmd packet with writes made at the same time."""
+        await self._async_send(self._heat_pump.async_set_flag(self.entity_description.key, True))
+
+    async def async_turn_off(self, **kwargs):
+        """Clear the flag, sharing a cmd packet with writes made at the same time."""
+        await self._async_send(self._heat_pump.async_set_flag(self.entity_description.key, False))
 
     @property
     def available(self) -> bool:
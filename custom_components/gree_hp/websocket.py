@@ -0,0 +1,116 @@
+"""Websocket API streaming live Gree Heat Pump telemetry."""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+
+from .services import _heat_pump_for_device
+
+ATTR_FIELDS = "fields"
+ATTR_CHANGES_ONLY = "changes_only"
+ATTR_MIN_INTERVAL = "min_interval"
+
+class _Subscription:
+    """Filter, diff and throttle the samples sent to one subscriber."""
+
+    def __init__(self, connection: websocket_api.ActiveConnection, msg_id: int,
+                 fields: Optional[set], changes_only: bool, min_interval: float):
+        """Initialize the subscription."""
+        self._connection = connection
+        self._msg_id = msg_id
+        self._fields = fields
+        self._changes_only = changes_only
+        self._min_interval = min_interval
+        self._sent: Dict[str, Any] = {}
+        self._pending: Dict[str, Any] = {}
+        self._last_sent_at = 0.0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    @callback
+    def handle_sample(self, values: Dict[str, Any]) -> None:
+        """Queue the wanted fields of a sample and send now or once the throttle allows."""
+        for field, value in values.items():
+            if self._fields is not None and field not in self._fields:
+                continue
+            if self._changes_only and self._sent.get(field, self) == value:
+                # An unchanged value cancels a pending change back to it
+                self._pending.pop(field, None)
+                continue
+            self._pending[field] = value
+
+        if not self._pending or self._flush_handle is not None:
+            return
+
+        wait = self._last_sent_at + self._min_interval - time.monotonic()
+        if wait > 0:
+            # Later samples are merged into this one until the slot comes
+            self._flush_handle = asyncio.get_running_loop().call_later(wait, self._flush)
+        else:
+            self._flush()
+
+    @callback
+    def _flush(self) -> None:
+        """Send the queued fields as one event."""
+        self._flush_handle = None
+        if not self._pending:
+            return
+        values, self._pending = self._pending, {}
+        self._sent.update(values)
+        self._last_sent_at = time.monotonic()
+        self._connection.send_message(
+            websocket_api.event_message(self._msg_id, {"time": time.time(), "values": values})
+        )
+
+    @callback
+    def cancel(self) -> None:
+        """Drop anything still waiting for the throttle."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): "gree_hp/subscribe",
+    vol.Required("device_id"): cv.string,
+    vol.Optional(ATTR_FIELDS): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(ATTR_CHANGES_ONLY, default=False): cv.boolean,
+    vol.Optional(ATTR_MIN_INTERVAL, default=0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+})
+@callback
+def ws_subscribe(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: Dict[str, Any]
+) -> None:
+    """Stream every sample the protocol layer decodes for a heat pump."""
+    try:
+        heat_pump = _heat_pump_for_device(hass, msg["device_id"])
+    except ServiceValidationError as err:
+        connection.send_error(msg["id"], websocket_api.const.ERR_NOT_FOUND, str(err))
+        return
+    subscription = _Subscription(
+        connection,
+        msg["id"],
+        set(msg[ATTR_FIELDS]) if ATTR_FIELDS in msg else None,
+        msg[ATTR_CHANGES_ONLY],
+        msg[ATTR_MIN_INTERVAL],
+    )
+    remove_listener = heat_pump.add_sample_listener(subscription.handle_sample)
+
+    @callback
+    def unsubscribe() -> None:
+        remove_listener()
+        subscription.cancel()
+
+    connection.subscriptions[msg["id"]] = unsubscribe
+    connection.send_result(msg["id"])
+
+
+@callback
+def async_setup_websocket(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, ws_subscribe)
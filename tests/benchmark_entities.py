@@ -0,0 +1,202 @@
+"""Benchmark the entity fan-out cost of coordinator updates.
+
+Loads the integration into a minimal Home Assistant instance with N simulated
+heat pumps, which answer polls from memory instead of the network, then pushes
+a changed snapshot to every coordinator and measures:
+
+- event loop time per update, for all devices and per device
+- entity state writes per second of loop time, counted as state_changed events
+- memory allocated per device by setting up its entry and entities, measured
+  after a first device has loaded the modules and platforms
+
+Requires the homeassistant package. Nothing is sent on the network.
+
+Usage: python benchmark_entities.py [--devices 50] [--rounds 100] [--json]
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import MappingProxyType
+from unittest.mock import patch
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+from homeassistant import config_entries, loader  # noqa: E402
+from homeassistant.const import EVENT_STATE_CHANGED  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.helpers import (  # noqa: E402
+    area_registry as ar,
+    device_registry as dr,
+    entity,
+    entity_registry as er,
+    issue_registry as ir,
+)
+
+# Snapshot every simulated device starts from, as a real unit reports it
+BASE_SNAPSHOT = {
+    'Pow': 1, 'Mod': 4, 'CoWatOutTemSet': 12, 'HeWatOutTemSet': 40, 'WatBoxTemSet': 50,
+    'AllInWatTemHi': 140, 'AllInWatTemLo': 6, 'AllOutWatTemHi': 140, 'AllOutWatTemLo': 8,
+    'WatBoxTemHi': 141, 'WatBoxTemLo': 0,
+    'Quiet': 0, 'FastHtWter': 0, 'Emegcy': 0, 'HetHtWter': 1, 'ColHtWter': 0, 'LefHom': 0,
+    'WatBoxElcHeRunSta': 0, 'ElcHe1RunSta': 0, 'ElcHe2RunSta': 0, 'AnFrzzRunSta': 0, 'SyAnFroRunSta': 0,
+}
+
+
+def snapshot(update):
+    """Return the snapshot of an update, with every field changed from the previous one."""
+    step = update % 2
+    data = {field: value + step for field, value in BASE_SNAPSHOT.items()}
+    # Modes must stay valid, switch between Heat + Hot water and Hot water
+    data['Mod'] = 4 if step else 2
+    return data
+
+
+async def make_hass(config_dir):
+    """Create a Home Assistant instance with just what config entries need."""
+    # Custom integrations are imported from the config directory, as bootstrap does
+    os.symlink(os.path.join(REPO_DIR, 'custom_components'), os.path.join(config_dir, 'custom_components'))
+    sys.path.insert(0, config_dir)
+
+    hass = HomeAssistant(config_dir)
+    hass.config.skip_pip = True
+    if hasattr(loader, 'async_setup'):
+        loader.async_setup(hass)
+    entity.async_setup(hass)
+    await ar.async_load(hass)
+    await dr.async_load(hass)
+    await er.async_load(hass)
+    await ir.async_load(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    # No API is served, registering the websocket command needs no server
+    hass.config.components.update({'http', 'websocket_api'})
+    # The state stays "not running" so startup discovery never sends a scan
+    return hass
+
+
+def entry_arguments():
+    """Return the ConfigEntry arguments this Home Assistant version requires beyond the common ones."""
+    parameters = inspect.signature(config_entries.ConfigEntry).parameters
+    arguments = {}
+    # Both are required keyword arguments since 2024.10 and 2025.2
+    if 'discovery_keys' in parameters:
+        arguments['discovery_keys'] = MappingProxyType({})
+    if 'subentries_data' in parameters:
+        arguments['subentries_data'] = None
+    return arguments
+
+
+async def add_devices(hass, first, count):
+    """Set up count simulated heat pumps numbered from first and return their coordinators."""
+    from custom_components.gree_hp import GreeHeatPump
+    from custom_components.gree_hp.const import CONF_POLLING_INTERVAL, DOMAIN, MAX_POLLING_INTERVAL
+
+    class SimulatedHeatPump(GreeHeatPump):
+        """A heat pump answering every poll from memory."""
+
+        async def async_update(self):
+            self._data = snapshot(0)
+            self._mark_confirmed(self._data)
+            return self._data
+
+        async def async_keepalive(self, idle):
+            return True
+
+    entries = []
+    with patch('custom_components.gree_hp.GreeHeatPump', SimulatedHeatPump):
+        for index in range(first, first + count):
+            host = f'10.0.{index // 250}.{index % 250 + 1}'
+            entry = config_entries.ConfigEntry(
+                version=1, minor_version=1, domain=DOMAIN, title=f'Gree Heat Pump ({host})',
+                data={'host': host}, source='user', unique_id=f'{index:012x}',
+                # Keep scheduled polls out of the measurements
+                options={CONF_POLLING_INTERVAL: MAX_POLLING_INTERVAL},
+                **entry_arguments(),
+            )
+            await hass.config_entries.async_add(entry)
+            entries.append(entry)
+        await hass.async_block_till_done()
+    return [hass.data[DOMAIN][entry.entry_id]['coordinator'] for entry in entries]
+
+
+async def run(args):
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await make_hass(config_dir)
+
+        coordinators = await add_devices(hass, 0, 1)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        coordinators += await add_devices(hass, 1, args.devices - 1)
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        entities = len(hass.states.async_all())
+        writes = 0
+
+        def count_write(_event):
+            nonlocal writes
+            writes += 1
+
+        hass.bus.async_listen(EVENT_STATE_CHANGED, count_write)
+
+        update_times = []
+        settle_times = []
+        for update in range(1, args.rounds + 1):
+            data = snapshot(update)
+            started = time.perf_counter()
+            # Every entity writes its state synchronously inside these calls
+            for coordinator in coordinators:
+                coordinator.async_set_updated_data(data)
+            fanned_out = time.perf_counter()
+            await hass.async_block_till_done()
+            update_times.append(fanned_out - started)
+            settle_times.append(time.perf_counter() - fanned_out)
+
+        await hass.async_stop()
+
+    loop_time = sum(update_times) + sum(settle_times)
+    update_times.sort()
+    results = {
+        'devices': args.devices,
+        'entities': entities,
+        'rounds': args.rounds,
+        'update_ms': {
+            'mean': 1000 * statistics.mean(update_times),
+            'p50': 1000 * update_times[len(update_times) // 2],
+            'p95': 1000 * update_times[int(len(update_times) * 0.95) - 1],
+            'max': 1000 * update_times[-1],
+        },
+        'per_device_update_us': 1e6 * statistics.mean(update_times) / args.devices,
+        'settle_ms': 1000 * statistics.mean(settle_times),
+        'state_writes': writes,
+        'state_writes_per_s': writes / loop_time if loop_time else 0,
+        'memory_per_device_kib': (after - before) / max(args.devices - 1, 1) / 1024,
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['devices']} devices, {results['entities']} entities, {results['rounds']} updates")
+    print("Loop time per update of all devices: mean {mean:.2f} ms, p50 {p50:.2f} ms, "
+          "p95 {p95:.2f} ms, max {max:.2f} ms".format(**results['update_ms']))
+    print(f"Loop time per device update: {results['per_device_update_us']:.1f} us "
+          f"(+{results['settle_ms']:.2f} ms of follow-up tasks per update)")
+    print(f"State writes: {results['state_writes']}, {results['state_writes_per_s']:.0f}/s of loop time")
+    print(f"Memory per device: {results['memory_per_device_kib']:.1f} KiB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure entity fan-out per coordinator update')
+    parser.add_argument('--devices', type=int, default=50, help='simulated heat pumps, at least 2')
+    parser.add_argument('--rounds', type=int, default=100, help='updates pushed to every device')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    asyncio.run(run(parser.parse_args()))
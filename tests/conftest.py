@@ -0,0 +1,188 @@
+"""Shared helpers for the protocol tests, which run without Home Assistant or a network.
+
+A FakeListener stands in for the UDP port and routes every datagram through the
+real listener logic to FakeDevice instances answering from memory.
+"""
+import asyncio
+import json
+import os
+import sys
+import types
+
+import pytest
+
+# Load the protocol layer without the Home Assistant parts of the package, as the tools do
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'custom_components', 'gree_hp')
+if 'gree_hp_protocol' not in sys.modules:
+    package = types.ModuleType('gree_hp_protocol')
+    package.__path__ = [PACKAGE_DIR]
+    sys.modules['gree_hp_protocol'] = package
+
+from gree_hp_protocol import gree_hp  # noqa: E402
+from gree_hp_protocol.cipher import device_cipher, generic_cipher  # noqa: E402
+from gree_hp_protocol.const import DEFAULT_PORT, MAX_EXCHANGES_IN_FLIGHT  # noqa: E402
+from gree_hp_protocol.listener import GreeListener  # noqa: E402
+
+HOST = '192.0.2.10'
+MAC = 'aabbccddeeff'
+DEVICE_KEY = '8Bc1Ef4Hi7Kl0No3'
+
+# Values a real unit reported, from notes.txt
+DEVICE_VALUES = {
+    'Pow': 1, 'Mod': 2, 'CoWatOutTemSet': 12, 'HeWatOutTemSet': 40, 'WatBoxTemSet': 50,
+    'TemUn': 0, 'AllErr': 0, 'Quiet': 0, 'FastHtWter': 0, 'Emegcy': 0, 'HetHtWter': 1,
+    'ColHtWter': 0, 'LefHom': 0, 'AllInWatTemHi': 140, 'AllInWatTemLo': 6,
+    'AllOutWatTemHi': 140, 'AllOutWatTemLo': 8, 'HepOutWatTemHi': 70, 'HepOutWatTemLo': 0,
+    'WatBoxTemHi': 141, 'WatBoxTemLo': 0, 'RmoHomTemHi': 100, 'RmoHomTemLo': 0,
+    'WatBoxElcHeRunSta': 1, 'SyAnFroRunSta': 0, 'ElcHe1RunSta': 0, 'ElcHe2RunSta': 0,
+    'AnFrzzRunSta': 0,
+}
+
+
+class FakeDevice:
+    """A heat pump answering scan, bind, status and cmd packs from memory."""
+
+    def __init__(self, mac=MAC, version='ecb', values=None):
+        self.mac = mac
+        self.version = version
+        self.values = dict(DEVICE_VALUES if values is None else values)
+        # Every request received, as (operation, decrypted pack)
+        self.requests = []
+        # Number of upcoming requests to ignore, as if lost on the network
+        self.drop = 0
+        # Operations whose requests are ignored, as by a busy or half-booted unit
+        self.ignore = set()
+        # Seconds before each reply is delivered
+        self.delay = 0.0
+        # Called with each status reply pack, returns the pack to send
+        self.rewrite_status = None
+        self.key = DEVICE_KEY
+        self._generic = generic_cipher(version)
+        self._cipher = device_cipher(version, self.key)
+
+    def count(self, operation):
+        """Return how many requests of operation were received."""
+        return sum(1 for received, _ in self.requests if received == operation)
+
+    def handle(self, msg):
+        """Return the reply messages to a request, or none if it is ignored."""
+        if msg.get('t') == 'scan':
+            self.requests.append(('scan', msg))
+            if self._dropped():
+                return []
+            return [self._msg(self._generic, {'t': 'dev', 'mac': self.mac, 'mid': '10001', 'name': 'hp'}, i=1)]
+
+        # Firmware ignores packs it cannot decrypt, such as another protocol version's
+        for cipher in (self._generic, self._cipher):
+            try:
+                pack = cipher.decrypt(msg)
+                break
+            except Exception:  # pylint: disable=broad-except
+                continue
+        else:
+            return []
+
+        operation = pack['t']
+        self.requests.append((operation, pack))
+        if operation in self.ignore or self._dropped():
+            return []
+        if operation == 'bind':
+            return [self._msg(self._generic, {'t': 'bindok', 'mac': self.mac, 'key': self.key, 'r': 200}, i=1)]
+        if operation == 'status':
+            cols = pack['cols']
+            reply = {'t': 'dat', 'mac': self.mac, 'r': 200, 'cols': cols,
+                     'dat': [self.values.get(col, '') for col in cols]}
+            if self.rewrite_status:
+                reply = self.rewrite_status(reply)
+            return [self._msg(self._cipher, reply)]
+        if operation == 'cmd':
+            self.values.update(zip(pack['opt'], pack['p']))
+            reply = {'t': 'res', 'mac': self.mac, 'r': 200, 'opt': pack['opt'], 'p': pack['p'], 'val': pack['p']}
+            return [self._msg(self._cipher, reply)]
+        return []
+
+    def rekey(self, key):
+        """Switch to a new device key, as after a reboot."""
+        self.key = key
+        self._cipher = device_cipher(self.version, key)
+
+    def push(self, values):
+        """Return an unsolicited status pack carrying values."""
+        return self._msg(self._cipher, {'t': 'dat', 'mac': self.mac, 'r': 200,
+                                        'cols': list(values), 'dat': list(values.values())})
+
+    def _dropped(self):
+        if self.drop:
+            self.drop -= 1
+            return True
+        return False
+
+    def _msg(self, cipher, pack, i=0):
+        return {'t': 'pack', 'i': i, 'uid': 0, 'cid': self.mac, 'tcid': 'app', **cipher.encrypt(pack)}
+
+
+class FakeListener(GreeListener):
+    """The shared listener, with fake devices in place of the UDP port."""
+
+    def __init__(self, max_exchanges=MAX_EXCHANGES_IN_FLIGHT):
+        super().__init__(max_exchanges)
+        self.fakes = {}
+        self.sent = []
+
+    def add_device(self, host, device):
+        """Answer datagrams sent to host with device."""
+        self.fakes[host] = device
+        return device
+
+    async def async_start(self):
+        """Nothing to bind."""
+
+    def sendto(self, data, host):
+        """Hand a datagram to the fake devices it is addressed to and deliver their replies."""
+        msg = json.loads(data)
+        self.sent.append((host, msg))
+        targets = self.fakes.items() if host == '255.255.255.255' else [(host, self.fakes.get(host))]
+        loop = asyncio.get_running_loop()
+        for target, device in targets:
+            if device is None:
+                continue
+            for reply in device.handle(msg):
+                loop.call_later(device.delay, self.deliver, target, reply)
+
+    def deliver(self, host, msg):
+        """Receive msg from host as the UDP port would."""
+        self.datagram_received(json.dumps(msg).encode('utf-8'), (host, DEFAULT_PORT))
+
+
+class FakeClock:
+    """Stand-in for the time module of the protocol layer, advanced by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def no_retransmits(monkeypatch):
+    """Fail an attempt on its first lost datagram, so each loss climbs one step."""
+    monkeypatch.setattr(gree_hp, 'MAX_RETRANSMITS', 0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Control the clock the caches and keepalives read, the event loop keeps real time."""
+    fake = FakeClock()
+    monkeypatch.setattr(gree_hp, 'time', fake)
+    return fake
+
+
+def make_heat_pump(version='ecb', host=HOST, values=None):
+    """Return a heat pump on a fake listener, the listener and the fake device behind it."""
+    listener = FakeListener()
+    device = listener.add_device(host, FakeDevice(version=version, values=values))
+    return gree_hp.GreeHeatPump(host, listener), listener, device
@@ -0,0 +1,111 @@
+"""Gree heat pump protocol daemon.
+
+Owns UDP port 7000 and one session per heat pump, and serves any number of
+local clients over a Unix socket (or a localhost TCP port), so tools no longer
+fight over the port or reset each other's bindings.
+
+Clients send one JSON request per line and get one JSON reply per line, the
+protocol of custom_components/gree_hp/local_api.py, which Home Assistant serves
+too (see the README). tests/daemon_client.py is a client for scripts.
+
+Status requests from every client are served from the values the regular poll
+already fetched while they are fresh, and requests arriving together share one
+status exchange. Commands go out one packet at a time per device, and commands
+issued within the batch window are merged into one cmd packet.
+
+Usage: python daemon.py [--socket PATH | --port PORT] [--interval SECONDS] [HOST ...]
+Example: echo '{"op": "status", "device": "192.168.5.204"}' | socat - UNIX-CONNECT:/tmp/gree_hp.sock
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+import types
+
+HP_IP = '192.168.5.204'
+POLL_INTERVAL = 10
+
+# Load the protocol layer without the Home Assistant parts of the package
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'custom_components', 'gree_hp')
+package = types.ModuleType('gree_hp_protocol')
+package.__path__ = [PACKAGE_DIR]
+sys.modules['gree_hp_protocol'] = package
+
+from gree_hp_protocol.gree_hp import GreeHeatPump  # noqa: E402
+from gree_hp_protocol.listener import GreeListener  # noqa: E402
+from gree_hp_protocol.local_api import GreeLocalApi  # noqa: E402
+from daemon_client import SOCKET_PATH  # noqa: E402
+
+_LOGGER = logging.getLogger('gree_hp_daemon')
+
+
+class GreeDaemon:
+    """Share one session per heat pump between every connected client."""
+
+    def __init__(self, hosts, interval):
+        self._listener = GreeListener()
+        capabilities = {}
+        self._heat_pumps = {
+            host: GreeHeatPump(host, self._listener, capabilities) for host in hosts
+        }
+        self._interval = interval
+        self._poll_task = None
+        self.api = GreeLocalApi(lambda: self._heat_pumps)
+
+    async def start(self):
+        """Bind the UDP port and start the regular poll."""
+        await self._listener.async_start()
+        if self._interval:
+            self._poll_task = asyncio.get_running_loop().create_task(self._poll())
+
+    async def close(self):
+        """Stop serving and polling, then release the sessions and the UDP port."""
+        await self.api.async_close()
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        for heat_pump in self._heat_pumps.values():
+            heat_pump.close()
+        self._listener.close()
+
+    async def _poll(self):
+        """Poll every device so client requests find fresh values."""
+        while True:
+            started = time.monotonic()
+            await asyncio.gather(*(hp.async_update() for hp in self._heat_pumps.values()))
+            await asyncio.sleep(max(0.0, self._interval - (time.monotonic() - started)))
+
+
+async def main(args):
+    daemon = GreeDaemon(args.hosts or [HP_IP], args.interval)
+    await daemon.start()
+    try:
+        await daemon.api.async_start(args.socket, args.port)
+        _LOGGER.info("Serving on %s", f"127.0.0.1:{args.port}" if args.port else args.socket)
+        await asyncio.Event().wait()
+    finally:
+        await daemon.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Share Gree heat pump sessions with local clients')
+    parser.add_argument('hosts', nargs='*', help=f'heat pump addresses (default {HP_IP})')
+    parser.add_argument('--socket', default=SOCKET_PATH, help='Unix socket to serve on')
+    parser.add_argument('--port', type=int, help='serve on this localhost TCP port instead')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                        help='seconds between regular polls, 0 to only poll on request')
+    parser.add_argument('-v', '--verbose', action='store_true', help='log protocol details')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
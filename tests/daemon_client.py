@@ -0,0 +1,110 @@
+"""Client for the local API served by daemon.py or by Home Assistant.
+
+Tools use it instead of binding UDP port 7000 themselves whenever a server is
+running, so they share its sessions instead of resetting them:
+
+    client = DaemonClient.connect()  # None if nothing is serving
+    if client:
+        print(client.status('192.168.5.204', ['Pow', 'AllErr']))
+
+The address is a Unix socket path, a localhost TCP port or HOST:PORT, by
+default $GREE_HP_SOCKET or /tmp/gree_hp.sock. Home Assistant serves on
+gree_hp.sock in its configuration directory once local_api is enabled.
+"""
+import json
+import os
+import socket
+
+SOCKET_PATH = os.environ.get('GREE_HP_SOCKET', '/tmp/gree_hp.sock')
+REQUEST_TIMEOUT = 15
+
+
+class DaemonError(Exception):
+    """A request the server answered with an error."""
+
+
+def parse_address(address):
+    """Return a Unix socket path, or a (host, port) pair for TCP addresses."""
+    address = str(address)
+    if address.isdigit():
+        return ('127.0.0.1', int(address))
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and '/' not in address:
+        return (host or '127.0.0.1', int(port))
+    return address
+
+
+class DaemonClient:
+    """Send requests to a running server, one connection per request."""
+
+    def __init__(self, address=SOCKET_PATH, timeout=REQUEST_TIMEOUT):
+        self.address = parse_address(address)
+        self._timeout = timeout
+
+    @classmethod
+    def connect(cls, address=SOCKET_PATH, timeout=REQUEST_TIMEOUT):
+        """Return a client if a server answers at address, else None."""
+        client = cls(address, timeout)
+        try:
+            client.devices()
+        except OSError:
+            return None
+        return client
+
+    def _open(self):
+        if isinstance(self.address, tuple):
+            sock = socket.create_connection(self.address, self._timeout)
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self._timeout)
+            try:
+                sock.connect(self.address)
+            except OSError:
+                sock.close()
+                raise
+        return sock
+
+    @staticmethod
+    def _send(sock, request):
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+
+    @staticmethod
+    def _result(reply):
+        if not reply:
+            raise ConnectionError("The server closed the connection")
+        reply = json.loads(reply)
+        if not reply.get('ok'):
+            raise DaemonError(reply.get('error'))
+        return reply.get('result')
+
+    def request(self, op, **fields):
+        """Run one request and return its result, raising DaemonError if it failed."""
+        with self._open() as sock, sock.makefile('rb') as lines:
+            self._send(sock, {'id': 1, 'op': op, **fields})
+            return self._result(lines.readline())
+
+    def devices(self):
+        """Return the served heat pumps and their statistics, keyed by address."""
+        return self.request('devices')
+
+    def status(self, device, cols=None, max_age=None):
+        """Return the values of cols, or of the regular poll columns.
+
+        Values cached for up to their TTL are served, or up to max_age seconds if given.
+        """
+        return self.request('status', device=device, cols=cols, max_age=max_age)
+
+    def set(self, device, values, force=False):
+        """Send values in one command and return the values the device confirmed."""
+        return self.request('set', device=device, values=values, force=force)
+
+    def watch(self, device, cols=None):
+        """Yield (time, values) for every sample the server decodes, until closed."""
+        with self._open() as sock, sock.makefile('rb') as lines:
+            # Samples only arrive as often as the server polls
+            sock.settimeout(None)
+            self._send(sock, {'id': 1, 'op': 'watch', 'device': device, 'cols': cols})
+            self._result(lines.readline())
+            for line in lines:
+                event = json.loads(line)['event']
+                yield event['time'], event['values']
@@ -0,0 +1,317 @@
+"""Gree heat pump command line tool.
+
+Binds once per heat pump and talks to every device given in parallel.
+
+    python gree_cli.py status [--cols Pow,AllErr] [HOST ...]
+    python gree_cli.py set HOST power=on shower=50 Quiet=1
+    python gree_cli.py apply site.yaml
+    python gree_cli.py watch [--cols WatBoxTemHi] [--interval 2] [HOST ...]
+
+`set` and `apply` send all the changes of a device in one multi-parameter cmd
+packet and print the values the device confirmed. An `apply` file maps each
+heat pump address to its settings, as YAML (needs PyYAML) or JSON:
+
+    192.168.5.204:
+      power: on
+      mode: 4
+      hot: 40
+      shower: 50
+      Quiet: 0
+
+Settings take a column name or one of the aliases below, values take a number
+or on/off. Values the device already holds are not sent again.
+
+When a daemon.py or Home Assistant local API answers at --daemon (default
+$GREE_HP_SOCKET or /tmp/gree_hp.sock), every request goes through it and its
+sessions. Otherwise, or with --no-daemon, the tool binds UDP port 7000 itself.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import types
+
+HP_IP = '192.168.5.204'
+DEVICE_TIMEOUT = 10
+
+# Load the protocol layer without the Home Assistant parts of the package
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'custom_components', 'gree_hp')
+package = types.ModuleType('gree_hp_protocol')
+package.__path__ = [PACKAGE_DIR]
+sys.modules['gree_hp_protocol'] = package
+
+from gree_hp_protocol.gree_hp import GreeHeatPump, DeviceOfflineError  # noqa: E402
+from gree_hp_protocol.listener import GreeListener  # noqa: E402
+from daemon_client import DaemonClient, SOCKET_PATH  # noqa: E402
+
+ALIASES = {
+    'power': 'Pow',
+    'mode': 'Mod',
+    'cold': 'CoWatOutTemSet',
+    'hot': 'HeWatOutTemSet',
+    'shower': 'WatBoxTemSet',
+}
+
+SWITCH_VALUES = {'on': 1, 'off': 0, 'true': 1, 'false': 0}
+
+
+def parse_setting(name, value):
+    """Return the column and integer value of one setting."""
+    col = ALIASES.get(name, name)
+    if isinstance(value, bool):
+        return col, int(value)
+    if isinstance(value, str) and value.lower() in SWITCH_VALUES:
+        return col, SWITCH_VALUES[value.lower()]
+    try:
+        return col, int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid value {value!r} for {name}") from None
+
+
+def parse_assignment(item):
+    """Return the column and integer value of a NAME=VALUE argument."""
+    name, sep, value = item.partition('=')
+    if not sep:
+        raise ValueError(f"Expected NAME=VALUE, got {item!r}")
+    return parse_setting(name, value)
+
+
+def load_settings(path):
+    """Read a settings file mapping each heat pump address to its settings."""
+    with open(path, encoding='utf-8') as settings_file:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                sys.exit("Reading YAML needs PyYAML (pip install pyyaml), or use a JSON file")
+            settings = yaml.safe_load(settings_file)
+        else:
+            settings = json.load(settings_file)
+
+    if not isinstance(settings, dict):
+        raise ValueError(f"{path} must map heat pump addresses to settings")
+    return {
+        str(host): dict(parse_setting(name, value) for name, value in device.items())
+        for host, device in settings.items()
+    }
+
+
+class Session:
+    """One shared UDP port and one bound session per heat pump."""
+
+    def __init__(self, hosts, timeout=DEVICE_TIMEOUT):
+        self._timeout = timeout
+        self._listener = GreeListener()
+        capabilities = {}
+        self.heat_pumps = {host: GreeHeatPump(host, self._listener, capabilities) for host in hosts}
+
+    async def start(self):
+        """Bind the UDP port."""
+        await self._listener.async_start()
+
+    def close(self):
+        """Release the sessions and the UDP port."""
+        for heat_pump in self.heat_pumps.values():
+            heat_pump.close()
+        self._listener.close()
+
+    async def run(self, operation):
+        """Run operation(host, heat_pump) for every device in parallel."""
+        results = await asyncio.gather(
+            *(asyncio.wait_for(operation(host, hp), self._timeout) for host, hp in self.heat_pumps.items()),
+            return_exceptions=True,
+        )
+        return {
+            host: {'error': describe_error(result, self._timeout)} if isinstance(result, Exception) else result
+            for host, result in zip(self.heat_pumps, results)
+        }
+
+
+class DaemonHeatPump:
+    """A heat pump whose session a running daemon owns, with the methods the commands use."""
+
+    def __init__(self, client, host):
+        self.host = host
+        self._client = client
+        self.command_stats = {}
+
+    async def _call(self, method, *args):
+        # The client blocks, each request runs in a worker thread
+        return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+
+    async def refresh_stats(self):
+        """Fetch the daemon's command counters of the device."""
+        devices = await self._call(self._client.devices)
+        self.command_stats = devices[self.host]['commands']
+
+    async def async_query(self, cols, max_age=None):
+        return await self._call(self._client.status, self.host, cols, max_age)
+
+    async def async_update(self):
+        return await self.async_query(None, 0)
+
+    async def async_set_values(self, values):
+        await self._call(self._client.set, self.host, values)
+        await self.refresh_stats()
+
+
+class DaemonSession(Session):
+    """Every heat pump reached through a running daemon instead of the UDP port."""
+
+    def __init__(self, client, hosts, timeout=DEVICE_TIMEOUT):
+        self._timeout = timeout
+        self._client = client
+        self.heat_pumps = {host: DaemonHeatPump(client, host) for host in hosts}
+
+    async def start(self):
+        """Check that the daemon serves every device."""
+        served = await asyncio.get_running_loop().run_in_executor(None, self._client.devices)
+        missing = [host for host in self.heat_pumps if host not in served]
+        if missing:
+            raise ValueError(f"The daemon at {self._client.address} does not serve {', '.join(missing)}, "
+                             f"only {', '.join(served) or 'no devices'}")
+        for heat_pump in self.heat_pumps.values():
+            heat_pump.command_stats = served[heat_pump.host]['commands']
+
+    def close(self):
+        """Nothing to release, the daemon keeps the sessions."""
+
+
+def open_session(hosts, args):
+    """Return a session through the daemon if one answers, or one binding the port."""
+    if not args.no_daemon:
+        client = DaemonClient.connect(args.daemon or SOCKET_PATH, args.timeout)
+        if client:
+            print(f"Using the daemon at {client.address}", file=sys.stderr)
+            return DaemonSession(client, hosts, args.timeout)
+        if args.daemon:
+            raise ValueError(f"No daemon answers at {args.daemon}")
+    return Session(hosts, args.timeout)
+
+
+def describe_error(error, timeout):
+    """Return a readable reason for a failed device."""
+    if isinstance(error, asyncio.TimeoutError):
+        return f"No answer within {timeout:g} seconds"
+    return str(error) or repr(error)
+
+
+async def status(heat_pump, cols, max_age=None):
+    """Read cols, or the regular poll columns."""
+    if cols:
+        values = await heat_pump.async_query(cols, max_age)
+    else:
+        values = await heat_pump.async_update()
+    if not values:
+        raise DeviceOfflineError(f"Heat pump {heat_pump.host} did not answer")
+    return values
+
+
+async def apply(heat_pump, values):
+    """Send the settings that differ from the device in one cmd packet, return what it confirmed."""
+    started = time.monotonic()
+    # Read the current values first so unchanged settings are skipped
+    await status(heat_pump, list(values))
+    sent_before = heat_pump.command_stats['fields']
+    await heat_pump.async_set_values(values)
+    confirmed = await heat_pump.async_query(list(values))
+    return {
+        'sent': heat_pump.command_stats['fields'] - sent_before,
+        'confirmed': confirmed,
+        'mismatched': {col: value for col, value in values.items() if confirmed.get(col) != value},
+        'seconds': round(time.monotonic() - started, 3),
+    }
+
+
+async def watch(session, cols, interval):
+    """Print every change until interrupted."""
+    last = {}
+
+    def printer(host):
+        def print_sample(values):
+            changed = {
+                col: value for col, value in values.items()
+                if (not cols or col in cols) and last.get((host, col)) != value
+            }
+            if changed:
+                last.update({(host, col): value for col, value in changed.items()})
+                print(time.strftime('%H:%M:%S'), host, json.dumps(changed), flush=True)
+        return print_sample
+
+    printers = {host: printer(host) for host in session.heat_pumps}
+    for host, heat_pump in session.heat_pumps.items():
+        if isinstance(heat_pump, GreeHeatPump):
+            # Values the device pushes between polls show up too
+            heat_pump.add_sample_listener(printers[host])
+    while True:
+        started = time.monotonic()
+        # Every poll asks the device, cached values would hide changes for up to their TTL
+        results = await session.run(lambda host, hp: status(hp, cols, max_age=0))
+        for host, values in results.items():
+            if 'error' not in values:
+                printers[host](values)
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+async def main(args):
+    if args.command == 'apply':
+        settings = load_settings(args.file)
+    elif args.command == 'set':
+        settings = {args.host: dict(parse_assignment(item) for item in args.settings)}
+    else:
+        settings = {host: None for host in args.hosts or [HP_IP]}
+    cols = args.cols.split(',') if getattr(args, 'cols', None) else None
+
+    session = open_session(settings, args)
+    try:
+        await session.start()
+        if args.command == 'watch':
+            await watch(session, cols, args.interval)
+            return 0
+        if args.command == 'status':
+            results = await session.run(lambda host, hp: status(hp, cols))
+        else:
+            results = await session.run(lambda host, hp: apply(hp, settings[host]))
+    finally:
+        session.close()
+
+    print(json.dumps(results, indent=2))
+    failed = [host for host, result in results.items() if 'error' in result or result.get('mismatched')]
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Read and write Gree heat pump settings')
+    parser.add_argument('--timeout', type=float, default=DEVICE_TIMEOUT,
+                        help='seconds to wait for each heat pump')
+    parser.add_argument('--daemon', metavar='ADDRESS',
+                        help=f'socket path or [HOST:]PORT of a running daemon (default {SOCKET_PATH} if it answers)')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='bind the UDP port even if a daemon is running')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    status_parser = commands.add_parser('status', help='print the current values')
+    status_parser.add_argument('hosts', nargs='*', help=f'heat pump addresses (default {HP_IP})')
+    status_parser.add_argument('--cols', help='comma separated columns (default: the regular poll)')
+
+    set_parser = commands.add_parser('set', help='change settings of one heat pump')
+    set_parser.add_argument('host', help='heat pump address')
+    set_parser.add_argument('settings', nargs='+', metavar='NAME=VALUE',
+                            help=f"column or alias ({', '.join(ALIASES)}) and value")
+
+    apply_parser = commands.add_parser('apply', help='apply a YAML or JSON settings file')
+    apply_parser.add_argument('file', help='file mapping heat pump addresses to settings')
+
+    watch_parser = commands.add_parser('watch', help='print values as they change')
+    watch_parser.add_argument('hosts', nargs='*', help=f'heat pump addresses (default {HP_IP})')
+    watch_parser.add_argument('--cols', help='comma separated columns (default: the regular poll)')
+    watch_parser.add_argument('--interval', type=float, default=2.0, help='seconds between polls')
+
+    try:
+        sys.exit(asyncio.run(main(parser.parse_args())))
+    except ValueError as e:
+        sys.exit(str(e))
+    except KeyboardInterrupt:
+        pass
@@ -7,6 +7,8 @@ from datetime import datetime
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
 
+from daemon_client import DaemonClient
+
 HP_IP = '192.168.5.204'
 HP_PORT = 7000
 
@@ -173,15 +175,24 @@ def main():
     print("Gree Heat Pump Monitor")
     print("Monitoring fields:", ", ".join(MONITORED_FIELDS))
     print("Polling every 10 seconds...")
+
+    # A running daemon (or Home Assistant) shares its session instead of having it reset
+    client = DaemonClient.connect()
+    if client:
+        print(f"Reading through the daemon at {client.address}")
     print("=" * 60)
     
     try:
-        sock, device_cipher, mac_address = initialize_connection()
+        if client is None:
+            sock, device_cipher, mac_address = initialize_connection()
         previous_values = {}
         
         while True:
             try:
-                current_values = get_status(sock, device_cipher, mac_address)
+                if client is None:
+                    current_values = get_status(sock, device_cipher, mac_address)
+                else:
+                    current_values = client.status(HP_IP, MONITORED_FIELDS)
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 
                 # Display current values and check for changes
@@ -218,8 +229,9 @@ def main():
                 
             except socket.timeout:
                 print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Timeout - retrying connection...")
-                sock.close()
-                sock, device_cipher, mac_address = initialize_connection()
+                if client is None:
+                    sock.close()
+                    sock, device_cipher, mac_address = initialize_connection()
             except Exception as e:
                 print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Error: {e}")
                 time.sleep(10)
@@ -5,6 +5,8 @@ import socket
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
 
+from daemon_client import DaemonClient
+
 HP_IP = '192.168.5.204'
 HP_PORT = 7000
 
@@ -37,10 +39,15 @@ STATUS_MSG = {
     'uid': 0
 }
 
-### Initialization
-sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-sock.settimeout(10.0)  # 10 second timeout
-sock.bind(('0.0.0.0', HP_PORT))
+STATUS_COLS = [
+    'Pow',
+    'Mod',
+    'CoWatOutTemSet',
+    'HeWatOutTemSet',
+    'WatBoxTemSet',
+    'TemUn'
+]
+
 cipher = AES.new(AES_KEY.encode('utf-8'), AES.MODE_ECB)
 
 ### Decoding pack embedded in device's response
@@ -56,7 +63,7 @@ def enc_msg(msg, _cipher = cipher):
     return base64.b64encode(encoded_pack).decode()
 
 ### Sending sock message
-def send_msg(msg):
+def send_msg(sock, msg):
     b_msg = json.dumps(msg).encode('utf-8')
     sock.sendto(b_msg, (HP_IP, HP_PORT))
 
@@ -66,65 +73,68 @@ def receive_msg(sock):
     decoded_data = json.loads(data)
     return decoded_data
 
-# 1. Find message and reply
-send_msg(FIND_MSG)
-msg = receive_msg(sock)
-pack = parse_msg(msg['pack'])
-
-# 2. Binding to device
-final_bind_pack = BIND_PACK.copy()
-final_bind_pack['mac'] = pack['mac']
-
-final_bind_msg = BIND_MSG.copy()
-final_bind_msg['tcid'] = pack['mac']
-final_bind_msg['pack'] = enc_msg(final_bind_pack)
-
-send_msg(final_bind_msg)
-msg = receive_msg(sock)
-pack = parse_msg(msg['pack'])
-
-### Device specific encryption
-DEVICE_KEY = pack['key']
-device_cipher = AES.new(DEVICE_KEY.encode('utf-8'), AES.MODE_ECB)
-
-# 3. Get status
-status_pack = {
-    'mac': pack['mac'],
-    't': 'status',
-    'cols': [
-        'Pow',
-        'Mod',
-        'CoWatOutTemSet',
-        'HeWatOutTemSet',
-        'WatBoxTemSet',
-        'TemUn'
-    ]
-}
-
-final_status_msg = STATUS_MSG.copy()
-final_status_msg['tcid'] = pack['mac']
-final_status_msg['pack'] = enc_msg(status_pack, device_cipher)
-
-send_msg(final_status_msg)
-msg = receive_msg(sock)
-pack = parse_msg(msg['pack'], device_cipher)
+### Binding and asking the device directly, only when no daemon shares its session
+def read_status_directly():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(10.0)  # 10 second timeout
+    sock.bind(('0.0.0.0', HP_PORT))
+
+    # 1. Find message and reply
+    send_msg(sock, FIND_MSG)
+    msg = receive_msg(sock)
+    pack = parse_msg(msg['pack'])
+
+    # 2. Binding to device
+    final_bind_pack = BIND_PACK.copy()
+    final_bind_pack['mac'] = pack['mac']
+
+    final_bind_msg = BIND_MSG.copy()
+    final_bind_msg['tcid'] = pack['mac']
+    final_bind_msg['pack'] = enc_msg(final_bind_pack)
+
+    send_msg(sock, final_bind_msg)
+    msg = receive_msg(sock)
+    pack = parse_msg(msg['pack'])
+
+    ### Device specific encryption
+    device_key = pack['key']
+    device_cipher = AES.new(device_key.encode('utf-8'), AES.MODE_ECB)
+
+    # 3. Get status
+    status_pack = {
+        'mac': pack['mac'],
+        't': 'status',
+        'cols': STATUS_COLS
+    }
+
+    final_status_msg = STATUS_MSG.copy()
+    final_status_msg['tcid'] = pack['mac']
+    final_status_msg['pack'] = enc_msg(status_pack, device_cipher)
+
+    send_msg(sock, final_status_msg)
+    msg = receive_msg(sock)
+    pack = parse_msg(msg['pack'], device_cipher)
+    sock.close()
+
+    # Handle different response structures
+    dat = pack.get('dat', pack)
+    if isinstance(dat, list):
+        # If dat is a list, convert it to a dict using cols as keys
+        dat_dict = {}
+        for i, col in enumerate(STATUS_COLS):
+            if i < len(dat):
+                dat_dict[col] = dat[i]
+        dat = dat_dict
+    return dat
+
+client = DaemonClient.connect()
+dat = client.status(HP_IP, STATUS_COLS) if client else read_status_directly()
 
 # Pretty print status
 print("=" * 40)
 print("    GREE HEAT PUMP STATUS")
 print("=" * 40)
 
-# Handle different response structures
-dat = pack.get('dat', pack)
-if isinstance(dat, list):
-    # If dat is a list, convert it to a dict using cols as keys
-    cols = status_pack['cols']
-    dat_dict = {}
-    for i, col in enumerate(cols):
-        if i < len(dat):
-            dat_dict[col] = dat[i]
-    dat = dat_dict
-
 # Power status
 power_status = "ON" if dat.get('Pow', 0) == 1 else "OFF"
 print(f"Power:           {power_status}")
@@ -155,5 +165,3 @@ print(f"Hot Water:       {hot_temp}{temp_unit if hot_temp != 'N/A' else ''}")
 print(f"Shower Water:    {shower_temp}{temp_unit if shower_temp != 'N/A' else ''}")
 
 print("=" * 40)
-
-sock.close()
\ No newline at end of file
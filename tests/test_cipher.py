@@ -0,0 +1,92 @@
+"""Tests for the ECB and GCM protocol versions and their detection."""
+import asyncio
+import base64
+import json
+
+import pytest
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad
+
+from conftest import DEVICE_KEY, MAC, make_heat_pump
+from gree_hp_protocol import gree_hp
+from gree_hp_protocol.cipher import GenericCipher, device_cipher, generic_cipher
+from gree_hp_protocol.const import AES_KEY, BLOCK_SIZE, GCM_AAD, GCM_KEY, GCM_NONCE
+
+PACK = {'t': 'status', 'mac': MAC, 'cols': ['Pow', 'WatBoxTemSet']}
+
+
+@pytest.mark.parametrize('version', ['ecb', 'gcm'])
+def test_round_trip(version):
+    cipher = device_cipher(version, DEVICE_KEY)
+    assert cipher.decrypt(cipher.encrypt(PACK)) == PACK
+
+
+def test_ecb_matches_plain_aes():
+    expected = AES.new(AES_KEY.encode(), AES.MODE_ECB).encrypt(pad(json.dumps(PACK).encode(), BLOCK_SIZE))
+    assert generic_cipher('ecb').encrypt(PACK) == {'pack': base64.b64encode(expected).decode()}
+
+
+def test_gcm_matches_plain_aes():
+    aes = AES.new(GCM_KEY.encode(), AES.MODE_GCM, nonce=GCM_NONCE)
+    aes.update(GCM_AAD)
+    encrypted, tag = aes.encrypt_and_digest(json.dumps(PACK).encode())
+    assert generic_cipher('gcm').encrypt(PACK) == {
+        'pack': base64.b64encode(encrypted).decode(),
+        'tag': base64.b64encode(tag).decode(),
+    }
+
+
+def test_gcm_rejects_a_wrong_tag():
+    cipher = device_cipher('gcm', DEVICE_KEY)
+    msg = cipher.encrypt(PACK)
+    msg['tag'] = base64.b64encode(bytes(16)).decode()
+    with pytest.raises(ValueError):
+        cipher.decrypt(msg)
+
+
+@pytest.mark.parametrize('version', ['ecb', 'gcm'])
+def test_generic_cipher_detects_the_version(version):
+    cipher = GenericCipher()
+    assert cipher.decrypt(generic_cipher(version).encrypt(PACK)) == PACK
+    assert cipher.version == version
+
+
+@pytest.mark.parametrize('version', ['ecb', 'gcm'])
+def test_bind_uses_the_version_of_the_scan_reply(version):
+    heat_pump, _, device = make_heat_pump(version)
+
+    async def scenario():
+        await heat_pump.async_verify()
+        return await heat_pump.async_query(['WatBoxTemSet'])
+
+    assert asyncio.run(scenario()) == {'WatBoxTemSet': 50}
+    assert heat_pump.binding['cipher'] == version
+    assert device.count('bind') == 1
+
+
+def test_bind_falls_back_to_the_other_version(monkeypatch):
+    monkeypatch.setattr(gree_hp, 'MAX_RETRANSMITS', 0)
+    heat_pump, listener, device = make_heat_pump('gcm')
+    handle = device.handle
+
+    def handle_scan_under_ecb(msg):
+        # Firmware answering scans under ECB while binding only with GCM
+        if msg.get('t') == 'scan':
+            return [device._msg(generic_cipher('ecb'), {'t': 'dev', 'mac': device.mac, 'mid': '10001'}, i=1)]
+        return handle(msg)
+
+    device.handle = handle_scan_under_ecb
+    assert asyncio.run(heat_pump.async_verify()) == MAC
+    assert heat_pump.binding['cipher'] == 'gcm'
+    bind_versions = ['gcm' if 'tag' in msg else 'ecb' for _, msg in listener.sent if msg.get('i') == 1]
+    assert bind_versions == ['ecb', 'gcm']
+
+
+@pytest.mark.parametrize('version', ['ecb', 'gcm'])
+def test_restored_binding_skips_detection(version):
+    heat_pump, listener, _ = make_heat_pump(version)
+    heat_pump.restore_binding({'mac': MAC, 'model': '10001', 'columns': ['Pow'], 'cipher': version})
+    assert asyncio.run(heat_pump.async_query(['Pow'])) == {'Pow': 1}
+    bind_msgs = [msg for _, msg in listener.sent if msg.get('i') == 1]
+    assert len(bind_msgs) == 1
+    assert ('tag' in bind_msgs[0]) == (version == 'gcm')
@@ -0,0 +1,48 @@
+"""Tests for the global limit on exchanges in flight."""
+import asyncio
+
+from conftest import FakeDevice, FakeListener
+from gree_hp_protocol.gree_hp import GreeHeatPump
+
+
+class CountingListener(FakeListener):
+    """A fake listener tracking how many requests await their reply."""
+
+    def __init__(self, max_exchanges):
+        super().__init__(max_exchanges)
+        self.in_flight = 0
+        self.peak = 0
+
+    def sendto(self, data, host):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        super().sendto(data, host)
+
+    def deliver(self, host, msg):
+        self.in_flight -= 1
+        super().deliver(host, msg)
+
+
+def test_exchanges_of_all_kinds_share_the_limit():
+    listener = CountingListener(max_exchanges=3)
+    heat_pumps = []
+    for index in range(10):
+        host = f'192.0.2.{index + 1}'
+        device = listener.add_device(host, FakeDevice(mac=f'aabbccddee{index:02x}'))
+        device.delay = 0.02
+        heat_pumps.append(GreeHeatPump(host, listener))
+
+    async def scenario():
+        # Binds, queries and commands started together
+        await asyncio.gather(*(heat_pump.async_verify() for heat_pump in heat_pumps))
+        return await asyncio.gather(
+            *(heat_pump.async_query(['AllErr']) for heat_pump in heat_pumps),
+            *(heat_pump.async_set_values({'Quiet': 1}) for heat_pump in heat_pumps),
+        )
+
+    results = asyncio.run(scenario())
+    assert results[:10] == [{'AllErr': 0}] * 10
+    assert results[10:] == [True] * 10
+    # The capability probe pipelines two requests in one exchange
+    assert listener.peak <= 3 * 2
+    assert listener.in_flight == 0
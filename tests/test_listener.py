@@ -0,0 +1,42 @@
+"""Tests for routing datagrams between scans and registered devices."""
+import asyncio
+
+from conftest import MAC, make_heat_pump
+from gree_hp_protocol.const import BROADCAST_ADDRESS
+from gree_hp_protocol.discovery import async_scan
+
+
+def test_scan_does_not_swallow_a_binding_devices_replies():
+    heat_pump, listener, device = make_heat_pump()
+    device.delay = 0.01
+
+    async def scenario():
+        return await asyncio.gather(
+            async_scan(listener, [BROADCAST_ADDRESS], 0.2),
+            heat_pump.async_verify(),
+        )
+
+    found, mac = asyncio.run(scenario())
+    assert mac == MAC
+    assert MAC in found
+    # Neither the scan nor the bind of the device had to be retransmitted
+    assert device.count('scan') == 2
+    assert device.count('bind') == 1
+    assert heat_pump.recovery_stats['retransmit'] == 0
+
+
+def test_scan_reply_does_not_break_a_status_exchange():
+    heat_pump, listener, device = make_heat_pump()
+
+    async def scenario():
+        await heat_pump.async_verify()
+        device.delay = 0.01
+        scan = asyncio.ensure_future(async_scan(listener, [BROADCAST_ADDRESS], 0.1))
+        # The broadcast is answered while the query waits for its status reply
+        values = await heat_pump.async_query(['HepOutWatTemHi'])
+        return values, await scan
+
+    values, found = asyncio.run(scenario())
+    assert values == {'HepOutWatTemHi': 70}
+    assert MAC in found
+    assert heat_pump.recovery_stats == {key: 0 for key in heat_pump.recovery_stats}
@@ -0,0 +1,77 @@
+"""Tests for the local API sharing device sessions with tools."""
+import asyncio
+import json
+
+from conftest import HOST, make_heat_pump
+from gree_hp_protocol.local_api import GreeLocalApi
+
+
+def run_session(tmp_path, heat_pump, requests, on_set=None, api=None):
+    """Send requests over one connection and return every reply."""
+    path = str(tmp_path / 'gree_hp.sock')
+    api = api or GreeLocalApi(lambda: {heat_pump.host: heat_pump}, on_set)
+
+    async def scenario():
+        await api.async_start(path)
+        reader, writer = await asyncio.open_unix_connection(path)
+        replies = []
+        for request in requests:
+            writer.write(json.dumps(request).encode('utf-8') + b'\n')
+            replies.append(json.loads(await reader.readline()))
+        writer.close()
+        await api.async_close()
+        return replies
+
+    return asyncio.run(scenario())
+
+
+def test_status_and_set_share_the_session(tmp_path):
+    heat_pump, _, device = make_heat_pump()
+    changed = []
+    replies = run_session(tmp_path, heat_pump, [
+        {'id': 1, 'op': 'status', 'device': HOST, 'cols': ['Pow', 'AllErr']},
+        {'id': 2, 'op': 'set', 'device': HOST, 'values': {'WatBoxTemSet': 45}},
+        {'id': 3, 'op': 'devices'},
+    ], changed.append)
+    assert replies[0] == {'id': 1, 'ok': True, 'result': {'Pow': 1, 'AllErr': 0}}
+    assert replies[1] == {'id': 2, 'ok': True, 'result': {'WatBoxTemSet': 45}}
+    assert replies[2]['result'][HOST]['mac'] == device.mac
+    assert changed == [HOST]
+    assert device.count('bind') == 1
+
+
+def test_failed_request_keeps_the_connection(tmp_path):
+    heat_pump, _, _ = make_heat_pump()
+
+    async def no_answer(cols, max_age=None):
+        raise asyncio.TimeoutError()
+
+    heat_pump.async_query = no_answer
+    replies = run_session(tmp_path, heat_pump, [
+        {'id': 1, 'op': 'status', 'device': HOST},
+        {'id': 2, 'op': 'status', 'device': '192.0.2.99'},
+        {'id': 3, 'op': 'reboot', 'device': HOST},
+        {'id': 4, 'op': 'devices'},
+    ])
+    assert [reply['ok'] for reply in replies] == [False, False, False, True]
+    assert replies[0]['error'] == "The device did not answer in time"
+    assert 'Unknown device' in replies[1]['error']
+    assert 'Unknown op' in replies[2]['error']
+
+
+def test_set_is_checked_by_the_validator(tmp_path):
+    heat_pump, _, device = make_heat_pump()
+
+    def validate(values):
+        if set(values) - {'WatBoxTemSet'}:
+            raise ValueError("Only WatBoxTemSet can be set")
+        return {param: int(value) for param, value in values.items()}
+
+    api = GreeLocalApi(lambda: {heat_pump.host: heat_pump}, validate_values=validate)
+    replies = run_session(tmp_path, heat_pump, [
+        {'id': 1, 'op': 'set', 'device': HOST, 'values': {'AllErr': 1}},
+        {'id': 2, 'op': 'set', 'device': HOST, 'values': {'WatBoxTemSet': '45'}},
+    ], api=api)
+    assert replies[0] == {'id': 1, 'ok': False, 'error': "Only WatBoxTemSet can be set"}
+    assert replies[1] == {'id': 2, 'ok': True, 'result': {'WatBoxTemSet': 45}}
+    assert device.count('cmd') == 1
@@ -0,0 +1,107 @@
+"""Tests for on-demand column queries and their cache."""
+import asyncio
+
+from conftest import DEVICE_VALUES, make_heat_pump
+from gree_hp_protocol.const import DEFAULT_QUERY_TTL, QUERY_TTL
+from gree_hp_protocol.gree_hp import DeviceOfflineError
+
+
+def status_requests(device):
+    """Return the columns of every status request received."""
+    return [tuple(pack['cols']) for operation, pack in device.requests if operation == 'status']
+
+
+def test_concurrent_queries_share_one_exchange(clock):
+    heat_pump, _, device = make_heat_pump()
+
+    async def scenario():
+        await heat_pump.async_verify()
+        device.requests.clear()
+        return await asyncio.gather(
+            heat_pump.async_query(['TemUn']),
+            heat_pump.async_query(['AllErr', 'TemUn']),
+            heat_pump.async_query(['HepOutWatTemHi']),
+        )
+
+    results = asyncio.run(scenario())
+    assert status_requests(device) == [('AllErr', 'HepOutWatTemHi', 'TemUn')]
+    assert results == [{'TemUn': 0}, {'AllErr': 0, 'TemUn': 0}, {'HepOutWatTemHi': 70}]
+
+
+def test_query_is_served_from_cache_within_ttl(clock):
+    heat_pump, _, device = make_heat_pump()
+
+    async def scenario():
+        await heat_pump.async_verify()
+        device.requests.clear()
+        await heat_pump.async_query(['TemUn', 'AllErr'])
+        clock.advance(QUERY_TTL['AllErr'] + 1)
+        # AllErr is a measurement and expired, TemUn is a setting and did not
+        await heat_pump.async_query(['TemUn', 'AllErr'])
+        clock.advance(DEFAULT_QUERY_TTL)
+        await heat_pump.async_query(['TemUn'])
+
+    asyncio.run(scenario())
+    assert status_requests(device) == [('AllErr', 'TemUn'), ('AllErr',), ('TemUn',)]
+
+
+def test_poll_fills_the_query_cache(clock):
+    heat_pump, _, device = make_heat_pump()
+
+    async def scenario():
+        await heat_pump.async_update()
+        device.requests.clear()
+        return await heat_pump.async_query(['Pow', 'WatBoxTemHi'])
+
+    assert asyncio.run(scenario()) == {'Pow': 1, 'WatBoxTemHi': 141}
+    assert status_requests(device) == []
+
+
+def test_columns_the_probe_did_not_test_are_passed_through(clock):
+    values = {col: value for col, value in DEVICE_VALUES.items() if col != 'TemUn'}
+    values['SvVer'] = 3
+    heat_pump, _, device = make_heat_pump(values=values)
+
+    async def scenario():
+        await heat_pump.async_verify()
+        device.requests.clear()
+        return await heat_pump.async_query(['TemUn', 'SvVer'])
+
+    # TemUn was probed and found empty, SvVer is not a known column
+    assert asyncio.run(scenario()) == {'SvVer': 3}
+    assert status_requests(device) == [('SvVer',)]
+    assert not heat_pump.supports('TemUn')
+    assert heat_pump.supports('SvVer')
+
+
+def test_max_age_bypasses_the_cache(clock):
+    heat_pump, _, device = make_heat_pump()
+
+    async def scenario():
+        await heat_pump.async_update()
+        device.requests.clear()
+        device.values['WatBoxTemHi'] = 145
+        cached = await heat_pump.async_query(['WatBoxTemHi'])
+        fresh = await heat_pump.async_query(['WatBoxTemHi'], max_age=0)
+        return cached, fresh
+
+    assert asyncio.run(scenario()) == ({'WatBoxTemHi': 141}, {'WatBoxTemHi': 145})
+    assert status_requests(device) == [('WatBoxTemHi',)]
+
+
+def test_failed_fetch_does_not_serve_expired_values(clock, no_retransmits):
+    heat_pump, _, device = make_heat_pump()
+
+    async def scenario():
+        await heat_pump.async_query(['AllErr'])
+        clock.advance(3600)
+        device.drop = 1000
+        return await asyncio.gather(
+            heat_pump.async_query(['AllErr']),
+            heat_pump.async_query(['AllErr', 'TemUn']),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, DeviceOfflineError) for result in results)
+    assert heat_pump.is_offline
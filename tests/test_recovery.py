@@ -0,0 +1,80 @@
+"""Tests for the recovery ladder of failed exchanges."""
+import asyncio
+
+import pytest
+
+from conftest import MAC, make_heat_pump
+from gree_hp_protocol import gree_hp
+
+
+def bound_heat_pump():
+    """Return a bound heat pump with its fake device."""
+    heat_pump, _, device = make_heat_pump()
+    assert asyncio.run(heat_pump.async_verify()) == MAC
+    device.requests.clear()
+    return heat_pump, device
+
+
+def test_lost_datagram_is_recovered_by_retransmission():
+    heat_pump, device = bound_heat_pump()
+    device.drop = 1
+    assert asyncio.run(heat_pump.async_query(['AllErr'])) == {'AllErr': 0}
+    assert device.count('status') == 2
+    assert device.count('bind') == 0
+    assert heat_pump.recovery_stats['retransmit'] == 1
+
+
+def test_new_device_key_is_recovered_by_binding_again(no_retransmits):
+    heat_pump, device = bound_heat_pump()
+    device.rekey('0123456789abcdef')
+    assert asyncio.run(heat_pump.async_query(['AllErr'])) == {'AllErr': 0}
+    # The known MAC is bound again without scanning
+    assert device.count('scan') == 0
+    assert device.count('bind') == 1
+    assert heat_pump.recovery_stats['rebind'] == 1
+    assert heat_pump.mac == MAC
+
+
+def test_failed_rebind_is_recovered_by_scanning(no_retransmits):
+    heat_pump, device = bound_heat_pump()
+    # The status request, then the bind of the second step
+    device.drop = 2
+    assert asyncio.run(heat_pump.async_query(['AllErr'])) == {'AllErr': 0}
+    assert device.count('scan') == 1
+    assert device.count('bind') == 2
+    assert heat_pump.recovery_stats['scan'] == 1
+    assert not heat_pump.is_offline
+
+
+def test_device_is_offline_once_every_step_failed(no_retransmits):
+    heat_pump, device = bound_heat_pump()
+    device.drop = 100
+    with pytest.raises(gree_hp.DeviceOfflineError):
+        asyncio.run(heat_pump.async_query(['AllErr']))
+    assert heat_pump.recovery_stats['failed'] == 1
+    assert heat_pump.is_offline
+
+    # The next exchange starts from the bottom of the ladder again
+    device.drop = 0
+    assert asyncio.run(heat_pump.async_query(['AllErr'])) == {'AllErr': 0}
+    assert not heat_pump.is_offline
+
+
+def test_setup_cut_short_by_a_deadline_leaves_no_half_bound_session():
+    heat_pump, _, device = make_heat_pump()
+    # Bound, but the capability probe never answers
+    device.ignore.add('status')
+
+    async def cut_short():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(heat_pump.async_verify(), 0.5)
+
+    asyncio.run(cut_short())
+    assert heat_pump.binding['columns'] is None
+    assert heat_pump.mac == MAC
+
+    # The next attempt binds and probes again
+    device.ignore.clear()
+    assert asyncio.run(heat_pump.async_verify()) == MAC
+    assert device.count('bind') == 2
+    assert heat_pump.binding['columns']
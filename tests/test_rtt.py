@@ -0,0 +1,80 @@
+"""Tests for the adaptive retransmission timeout."""
+import asyncio
+
+import pytest
+
+from conftest import make_heat_pump
+from gree_hp_protocol.const import INITIAL_RTO, MAX_RTO, MIN_RTO
+from gree_hp_protocol.rtt import RTT_GRANULARITY, RttEstimator
+
+
+def test_first_sample_sets_srtt_and_variance():
+    estimator = RttEstimator(INITIAL_RTO, 0.0, MAX_RTO)
+    estimator.sample(0.1)
+    assert estimator.srtt == pytest.approx(0.1)
+    assert estimator.rttvar == pytest.approx(0.05)
+    # RTO = SRTT + max(G, 4 * RTTVAR)
+    assert estimator.rto == pytest.approx(0.3)
+
+
+def test_later_samples_are_smoothed():
+    estimator = RttEstimator(INITIAL_RTO, 0.0, MAX_RTO)
+    estimator.sample(0.1)
+    estimator.sample(0.2)
+    # RTTVAR is updated from the previous SRTT, then SRTT moves by alpha
+    assert estimator.rttvar == pytest.approx(0.75 * 0.05 + 0.25 * 0.1)
+    assert estimator.srtt == pytest.approx(0.875 * 0.1 + 0.125 * 0.2)
+    assert estimator.rto == pytest.approx(estimator.srtt + 4 * estimator.rttvar)
+    assert estimator.samples == 2
+
+
+def test_granularity_floors_the_variance_term():
+    estimator = RttEstimator(INITIAL_RTO, 0.0, MAX_RTO)
+    for _ in range(50):
+        estimator.sample(0.05)
+    assert estimator.rto == pytest.approx(0.05 + RTT_GRANULARITY, abs=1e-3)
+
+
+def test_rto_is_clamped_and_backs_off():
+    estimator = RttEstimator(INITIAL_RTO, MIN_RTO, MAX_RTO)
+    estimator.sample(0.001)
+    assert estimator.rto == MIN_RTO
+
+    for _ in range(10):
+        estimator.backoff()
+    assert estimator.rto == MAX_RTO
+    assert estimator.timeouts == 10
+
+
+def test_exchange_samples_first_transmissions():
+    heat_pump, _, device = make_heat_pump()
+
+    async def scenario():
+        await heat_pump.async_update()
+        return heat_pump.rtt_stats
+
+    stats = asyncio.run(scenario())
+    # One scan, one bind, then the capability probe and the poll
+    assert stats['scan']['samples'] == 1
+    assert stats['bind']['samples'] == 1
+    # The probe is pipelined in several requests, only the first reply of a burst is sampled
+    assert device.count('status') > 2
+    assert stats['status']['samples'] == 2
+    assert stats['status']['timeouts'] == 0
+
+
+def test_karn_ignores_replies_to_retransmissions():
+    heat_pump, _, device = make_heat_pump()
+
+    async def scenario():
+        await heat_pump.async_update()
+        before = heat_pump.rtt_stats['status']
+        # The next request is lost, only the retransmission is answered
+        device.drop = 1
+        assert await heat_pump.async_update()
+        return before, heat_pump.rtt_stats['status']
+
+    before, after = asyncio.run(scenario())
+    assert after['samples'] == before['samples']
+    assert after['timeouts'] == before['timeouts'] + 1
+    assert heat_pump.recovery_stats['retransmit'] == 1
@@ -0,0 +1,94 @@
+"""Tests for splitting status requests and matching their pipelined replies."""
+import asyncio
+import json
+
+from conftest import make_heat_pump
+from gree_hp_protocol.const import MAX_REPLY_SIZE
+from gree_hp_protocol.gree_hp import KNOWN_COLS, GreeHeatPump
+
+
+def bound_heat_pump(version='ecb', values=None):
+    """Return a bound heat pump with its fake device."""
+    heat_pump, _, device = make_heat_pump(version, values=values)
+    assert asyncio.run(heat_pump.async_verify())
+    device.requests.clear()
+    return heat_pump, device
+
+
+def test_estimate_covers_the_largest_reply():
+    for version in ('ecb', 'gcm'):
+        heat_pump, device = bound_heat_pump(version)
+        overhead = heat_pump._device_cipher.overhead
+        for count in range(1, len(KNOWN_COLS) + 1):
+            cols = KNOWN_COLS[:count]
+            # Values of 5 characters, the widest the estimate allows for
+            reply = device._msg(device._cipher, {'t': 'dat', 'mac': device.mac, 'r': 200,
+                                                 'cols': cols, 'dat': [99999] * count})
+            assert len(json.dumps(reply)) <= GreeHeatPump._estimate_reply_size(cols, overhead)
+
+
+def test_split_replies_fit_and_keep_every_column():
+    for version in ('ecb', 'gcm'):
+        heat_pump, _ = bound_heat_pump(version)
+        overhead = heat_pump._device_cipher.overhead
+        chunks = heat_pump._split_cols(KNOWN_COLS)
+        assert len(chunks) > 1
+        assert [col for chunk in chunks for col in chunk] == KNOWN_COLS
+        assert all(GreeHeatPump._estimate_reply_size(chunk, overhead) <= MAX_REPLY_SIZE for chunk in chunks)
+
+
+def test_gcm_tag_leaves_less_room_per_reply():
+    ecb, _ = bound_heat_pump('ecb')
+    gcm, _ = bound_heat_pump('gcm')
+    ecb_sizes = [len(chunk) for chunk in ecb._split_cols(KNOWN_COLS)]
+    gcm_sizes = [len(chunk) for chunk in gcm._split_cols(KNOWN_COLS)]
+    assert gcm_sizes[0] <= ecb_sizes[0]
+
+
+def test_chunks_are_pipelined_in_one_exchange():
+    heat_pump, device = bound_heat_pump()
+    values = asyncio.run(heat_pump._status_exchange(KNOWN_COLS))
+    assert device.count('status') == len(heat_pump._split_cols(KNOWN_COLS))
+    assert values['HepOutWatTemHi'] == 70
+    assert values['AnFrzzRunSta'] == 0
+
+
+def test_reordered_echo_is_matched_by_its_columns():
+    heat_pump, device = bound_heat_pump()
+
+    def reverse(reply):
+        return {**reply, 'cols': reply['cols'][::-1], 'dat': reply['dat'][::-1]}
+
+    device.rewrite_status = reverse
+    values = asyncio.run(heat_pump._status_exchange(KNOWN_COLS))
+    assert values['Pow'] == 1
+    assert values['WatBoxTemHi'] == 141
+    assert values['RmoHomTemHi'] == 100
+
+
+def test_partial_echo_is_matched_by_overlap():
+    heat_pump, device = bound_heat_pump()
+
+    def drop_first(reply):
+        return {**reply, 'cols': reply['cols'][1:], 'dat': reply['dat'][1:]}
+
+    device.rewrite_status = drop_first
+    chunks = heat_pump._split_cols(KNOWN_COLS)
+    values = asyncio.run(heat_pump._status_exchange(KNOWN_COLS))
+    # Every chunk was answered once, without retransmissions
+    assert device.count('status') == len(chunks)
+    assert 'Pow' not in values
+    assert values['Mod'] == 2
+    assert values['HepOutWatTemHi'] == 70
+
+
+def test_reply_without_columns_answers_in_request_order():
+    heat_pump, device = bound_heat_pump()
+
+    def strip_cols(reply):
+        return {key: value for key, value in reply.items() if key != 'cols'}
+
+    device.rewrite_status = strip_cols
+    values = asyncio.run(heat_pump._status_exchange(KNOWN_COLS))
+    assert values['Pow'] == 1
+    assert values['AnFrzzRunSta'] == 0
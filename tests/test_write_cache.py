@@ -0,0 +1,88 @@
+"""Tests for skipping writes the device already confirmed."""
+import asyncio
+
+from conftest import make_heat_pump
+from gree_hp_protocol.const import WRITE_CACHE_WINDOW
+
+
+def test_write_of_confirmed_value_is_skipped(clock):
+    heat_pump, _, device = make_heat_pump()
+
+    async def scenario():
+        await heat_pump.async_update()
+        # The poll just confirmed Pow=1
+        assert await heat_pump.async_set_power(True)
+
+    asyncio.run(scenario())
+    assert device.count('cmd') == 0
+    assert heat_pump.command_stats == {'sent': 0, 'fields': 0, 'skipped': 1}
+
+
+def test_write_is_sent_once_the_window_expired(clock):
+    heat_pump, _, device = make_heat_pump()
+
+    async def scenario():
+        await heat_pump.async_update()
+        clock.advance(WRITE_CACHE_WINDOW + 1)
+        assert await heat_pump.async_set_power(True)
+
+    asyncio.run(scenario())
+    assert device.count('cmd') == 1
+
+
+def test_write_of_different_value_or_forced_is_sent(clock):
+    heat_pump, _, device = make_heat_pump()
+
+    async def scenario():
+        await heat_pump.async_update()
+        assert await heat_pump.async_set_power(False)
+        assert await heat_pump.async_set_power(False, force=True)
+
+    asyncio.run(scenario())
+    assert device.count('cmd') == 2
+    assert device.values['Pow'] == 0
+
+
+def test_command_response_confirms_the_value(clock):
+    heat_pump, _, device = make_heat_pump()
+
+    async def scenario():
+        await heat_pump.async_update()
+        await heat_pump.async_set_temperature('shower', 45)
+        # Confirmed by the response, a repeat is not sent
+        await heat_pump.async_set_temperature('shower', 45)
+
+    asyncio.run(scenario())
+    assert device.count('cmd') == 1
+    assert heat_pump.data['WatBoxTemSet'] == 45
+
+
+def test_set_values_skips_confirmed_columns_only(clock):
+    heat_pump, _, device = make_heat_pump()
+
+    async def scenario():
+        await heat_pump.async_update()
+        await heat_pump.async_set_values({'Pow': 1, 'WatBoxTemSet': 45, 'Quiet': 1})
+
+    asyncio.run(scenario())
+    _, cmd = [request for request in device.requests if request[0] == 'cmd'][0]
+    assert dict(zip(cmd['opt'], cmd['p'])) == {'WatBoxTemSet': 45, 'Quiet': 1}
+    assert heat_pump.command_stats['skipped'] == 1
+
+
+def test_confirmed_since_reports_only_what_the_command_confirmed(clock):
+    heat_pump, _, _ = make_heat_pump()
+    values = {'Pow': 1, 'WatBoxTemSet': 45}
+
+    async def scenario():
+        await heat_pump.async_update()
+        clock.advance(1)
+        skipped = heat_pump.recently_confirmed(values)
+        started = clock.now
+        await heat_pump.async_set_values(values)
+        return skipped, heat_pump.confirmed_since(list(values), started)
+
+    skipped, confirmed = asyncio.run(scenario())
+    assert skipped == {'Pow': 1}
+    # Pow was confirmed by the earlier poll, not by this command
+    assert confirmed == {'WatBoxTemSet': 45}